@@ -17,6 +17,7 @@ from dotenv import load_dotenv
 import sys
 import platform
 import webbrowser
+import uuid
 
 # Load environment variables
 load_dotenv()
@@ -237,6 +238,8 @@ class MonitoringAgent:
                 monitor = sct.monitors[1]
                 screenshot = sct.grab(monitor)
                 
+                captured_at = datetime.utcnow().isoformat() + 'Z'
+                
                 # Convert to PIL Image
                 img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
                 
@@ -260,7 +263,10 @@ class MonitoringAgent:
             files = {'file': ('screenshot.png', img_bytes, 'image/png')}
             data = {
                 'folder_name': folder_name,
-                'activity_name': activity_name
+                'activity_name': activity_name,
+                'captured_at': captured_at,
+                'idempotency_key': str(uuid.uuid4()),
+                'sent_at': datetime.utcnow().isoformat() + 'Z'
             }
             
             response = requests.post(
@@ -462,8 +468,11 @@ class MonitoringAgent:
         try:
             data = {
                 'activity_type': activity_type,
+                'captured_at': datetime.utcnow().isoformat() + 'Z',
+                'idempotency_key': str(uuid.uuid4()),
                 **kwargs
             }
+            data['sent_at'] = datetime.utcnow().isoformat() + 'Z'
             response = requests.post(
                 f'{self.api_url}/monitoring/activities',
                 headers=self.get_headers(),
@@ -541,6 +550,7 @@ class MonitoringAgent:
         try:
             response = requests.get(
                 f'{self.api_url}/monitoring/sessions/current',
+                params={'view': 'summary'},  # Only the session fields, not its activities and screenshots
                 headers=self.get_headers(),
                 timeout=10
             )
@@ -552,6 +562,7 @@ class MonitoringAgent:
                     # Retry with new token
                     response = requests.get(
                         f'{self.api_url}/monitoring/sessions/current',
+                        params={'view': 'summary'},
                         headers=self.get_headers(),
                         timeout=10
                     )
@@ -0,0 +1,70 @@
+"""
+Access Control
+Who may read monitoring data: an admin sees every session in their organization,
+anyone else only their own sessions.
+
+The rule is a filter on a query joined screenshot -> session -> employee, so
+checking one row costs one query (the row together with its owner) and
+authorizing a list of ids costs one query however long the list is.
+"""
+
+from flask import jsonify
+from models import db, Employee, MonitoringSession, Screenshot
+
+
+def can_access(viewer, owner_id, owner_organization_id):
+    """True if viewer may read data owned by the given employee"""
+    if viewer.role == 'admin':
+        return owner_organization_id == viewer.organization_id
+    return owner_id == viewer.id
+
+
+def access_filter(viewer):
+    """SQL condition over MonitoringSession and Employee (joined on the owner) matching can_access"""
+    if viewer.role == 'admin':
+        return Employee.organization_id == viewer.organization_id
+    return MonitoringSession.employee_id == viewer.id
+
+
+def _with_owner(query):
+    return query.join(Employee, Employee.id == MonitoringSession.employee_id)
+
+
+def visible_sessions(viewer):
+    """Query of the sessions viewer may read"""
+    return _with_owner(MonitoringSession.query).filter(access_filter(viewer))
+
+
+def authorize_session(viewer, session_id):
+    """(session, None) if viewer may read it, else (None, error response)"""
+    row = _with_owner(db.session.query(MonitoringSession, Employee.organization_id)).filter(
+        MonitoringSession.id == session_id
+    ).first()
+    if not row:
+        return None, (jsonify({'error': 'Session not found'}), 404)
+    session, owner_organization_id = row
+    if not can_access(viewer, session.employee_id, owner_organization_id):
+        return None, (jsonify({'error': 'Access denied'}), 403)
+    return session, None
+
+
+def authorize_screenshot(viewer, screenshot_id):
+    """(screenshot, None) if viewer may read it, else (None, error response)"""
+    row = _with_owner(
+        db.session.query(Screenshot, MonitoringSession.employee_id, Employee.organization_id).join(
+            MonitoringSession, MonitoringSession.id == Screenshot.session_id
+        )
+    ).filter(Screenshot.id == screenshot_id).first()
+    if not row:
+        return None, (jsonify({'error': 'Screenshot not found'}), 404)
+    screenshot, owner_id, owner_organization_id = row
+    if not can_access(viewer, owner_id, owner_organization_id):
+        return None, (jsonify({'error': 'Access denied'}), 403)
+    return screenshot, None
+
+
+def accessible_screenshots(viewer, screenshot_ids):
+    """The screenshots among screenshot_ids that viewer may read (ids they may not are left out)"""
+    return _with_owner(
+        Screenshot.query.join(MonitoringSession, MonitoringSession.id == Screenshot.session_id)
+    ).filter(Screenshot.id.in_(screenshot_ids), access_filter(viewer)).all()
@@ -0,0 +1,52 @@
+"""
+Alembic environment
+Migrations run against Config.SQLALCHEMY_DATABASE_URI (DATABASE_URL) with the
+Flask-SQLAlchemy metadata from models.py as the autogenerate target.
+"""
+
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import create_engine, pool
+from config import Config
+from models import db
+
+config = context.config
+
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = db.metadata
+
+
+def get_url():
+    return config.get_main_option('sqlalchemy.url') or Config.SQLALCHEMY_DATABASE_URI
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout instead of running it (alembic upgrade head --sql)"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={'paramstyle': 'named'},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = create_engine(get_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=connection.dialect.name == 'sqlite',
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
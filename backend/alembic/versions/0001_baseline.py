@@ -0,0 +1,122 @@
+"""baseline schema
+
+The schema as created by db.create_all() and the one-off scripts in migrations/
+before Alembic was introduced. Existing databases are adopted with
+`alembic stamp 0001_baseline`; new ones start from here.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-19 09:10:34.131168
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('organizations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('screenshot_interval', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('screenshot_blobs',
+    sa.Column('digest', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('digest')
+    )
+    op.create_index('ix_screenshot_blobs_updated_at', 'screenshot_blobs', ['updated_at'])
+
+    op.create_table('employees',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(length=200), nullable=False),
+    sa.Column('name', sa.String(length=200), nullable=False),
+    sa.Column('password_hash', sa.String(length=255), nullable=False),
+    sa.Column('role', sa.String(length=50), nullable=True),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('manager_id', sa.Integer(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('agent_credentials_encrypted', sa.Text(), nullable=True),
+    sa.ForeignKeyConstraint(['manager_id'], ['employees.id'], ),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('monitoring_configs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('config_type', sa.String(length=20), nullable=False),
+    sa.Column('pattern', sa.String(length=500), nullable=False),
+    sa.Column('folder_name', sa.String(length=100), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('monitoring_sessions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('start_time', sa.DateTime(), nullable=True),
+    sa.Column('end_time', sa.DateTime(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('uq_monitoring_sessions_active_employee', 'monitoring_sessions', ['employee_id'], unique=True,
+                    postgresql_where=sa.text('is_active'), sqlite_where=sa.text('is_active'))
+
+    op.create_table('activities',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('activity_type', sa.String(length=50), nullable=True),
+    sa.Column('application_name', sa.String(length=200), nullable=True),
+    sa.Column('window_title', sa.String(length=500), nullable=True),
+    sa.Column('url', sa.String(length=1000), nullable=True),
+    sa.Column('duration_seconds', sa.Integer(), nullable=True),
+    sa.Column('in_allowlist', sa.Boolean(), nullable=True),
+    sa.Column('idempotency_key', sa.String(length=128), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['monitoring_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_activities_idempotency_key', 'activities', ['session_id', 'idempotency_key'], unique=True)
+
+    op.create_table('screenshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('timestamp', sa.DateTime(), nullable=True),
+    sa.Column('file_path', sa.String(length=500), nullable=False),
+    sa.Column('file_size', sa.Integer(), nullable=True),
+    sa.Column('width', sa.Integer(), nullable=True),
+    sa.Column('height', sa.Integer(), nullable=True),
+    sa.Column('extracted_text', sa.Text(), nullable=True),
+    sa.Column('extraction_data', sa.JSON(), nullable=True),
+    sa.Column('is_processed', sa.Boolean(), nullable=True),
+    sa.Column('folder_name', sa.String(length=100), nullable=True),
+    sa.Column('activity_name', sa.String(length=200), nullable=True),
+    sa.Column('idempotency_key', sa.String(length=128), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['monitoring_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_screenshots_idempotency_key', 'screenshots', ['session_id', 'idempotency_key'], unique=True)
+
+
+def downgrade():
+    op.drop_table('screenshots')
+    op.drop_table('activities')
+    op.drop_table('monitoring_sessions')
+    op.drop_table('monitoring_configs')
+    op.drop_table('employees')
+    op.drop_table('screenshot_blobs')
+    op.drop_table('organizations')
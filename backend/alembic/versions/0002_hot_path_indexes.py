@@ -0,0 +1,42 @@
+"""indexes for the hot query paths
+
+Session timelines (activities/screenshots by session and time), the unprocessed
+screenshot queue, per-employee session history and manager/org employee lists.
+On PostgreSQL the indexes are built CONCURRENTLY so large tables stay writable.
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-19 09:20:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_path_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_activities_session_id_timestamp', 'activities', ['session_id', 'timestamp'], {}),
+    ('ix_screenshots_session_id_timestamp', 'screenshots', ['session_id', 'timestamp'], {}),
+    ('ix_screenshots_unprocessed', 'screenshots', ['session_id'],
+     {'postgresql_where': sa.text('NOT is_processed'), 'sqlite_where': sa.text('NOT is_processed')}),
+    ('ix_monitoring_sessions_employee_id_start_time', 'monitoring_sessions', ['employee_id', 'start_time'], {}),
+    ('ix_employees_organization_id_manager_id', 'employees', ['organization_id', 'manager_id'], {}),
+]
+
+
+def upgrade():
+    concurrently = op.get_context().dialect.name == 'postgresql'
+    with op.get_context().autocommit_block():
+        for name, table, columns, options in INDEXES:
+            if concurrently:
+                options = dict(options, postgresql_concurrently=True)
+            op.create_index(name, table, columns, if_not_exists=True, **options)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table, if_exists=True)
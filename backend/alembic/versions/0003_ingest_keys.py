@@ -0,0 +1,52 @@
+"""move idempotency key uniqueness into ingest_keys
+
+A unique index on activities/screenshots.idempotency_key can't survive range
+partitioning (unique indexes must include the partition key), so uniqueness
+moves to a small ingest_keys table and the event columns keep a plain index.
+Keys are chosen by the agents, so they are unique per employee: ingest_keys is
+keyed on (employee_id, key).
+
+Revision ID: 0003_ingest_keys
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-19 10:05:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_ingest_keys'
+down_revision = '0002_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+EVENT_TABLES = {'activities': 'activity', 'screenshots': 'screenshot'}
+
+
+def upgrade():
+    op.create_table('ingest_keys',
+    sa.Column('employee_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('key', sa.String(length=128), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('employee_id', 'key')
+    )
+    op.create_index('ix_ingest_keys_created_at', 'ingest_keys', ['created_at'])
+
+    for table, kind in EVENT_TABLES.items():
+        op.execute(sa.text(f"""
+            INSERT INTO ingest_keys (employee_id, key, kind, created_at)
+            SELECT s.employee_id, e.idempotency_key, '{kind}', MAX(e.timestamp)
+            FROM {table} e JOIN monitoring_sessions s ON s.id = e.session_id
+            WHERE e.idempotency_key IS NOT NULL
+            GROUP BY s.employee_id, e.idempotency_key
+        """))
+        op.drop_index(f'ix_{table}_idempotency_key', table_name=table)
+        op.create_index(f'ix_{table}_idempotency_key', table, ['session_id', 'idempotency_key'])
+
+
+def downgrade():
+    for table in EVENT_TABLES:
+        op.drop_index(f'ix_{table}_idempotency_key', table_name=table)
+        op.create_index(f'ix_{table}_idempotency_key', table, ['session_id', 'idempotency_key'], unique=True)
+    op.drop_table('ingest_keys')
@@ -0,0 +1,120 @@
+"""partition activities and screenshots by month (PostgreSQL)
+
+Each table is rebuilt as a RANGE (timestamp) partitioned parent with monthly
+partitions covering its existing rows plus the next few months and a default
+partition, then the rows are copied over month by month. The primary key
+becomes (id, timestamp) since it must include the partition key; the ORM still
+identifies rows by id alone, which the shared id sequence keeps unique.
+timestamp becomes NOT NULL.
+
+This rewrites both tables: schedule it in a maintenance window on large
+databases. Other databases are left unpartitioned. Afterwards run
+`python maintain_partitions.py` daily to keep partitions created ahead.
+
+Revision ID: 0004_partition_event_tables
+Revises: 0003_ingest_keys
+Create Date: 2026-10-19 10:30:00.000000
+"""
+from datetime import date, datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_partition_event_tables'
+down_revision = '0003_ingest_keys'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+PARTITIONED_TABLES = ['activities', 'screenshots']
+
+INDEXES = {
+    'activities': [
+        'CREATE INDEX ix_activities_session_id_timestamp ON activities (session_id, timestamp)',
+        'CREATE INDEX ix_activities_idempotency_key ON activities (session_id, idempotency_key)',
+    ],
+    'screenshots': [
+        'CREATE INDEX ix_screenshots_session_id_timestamp ON screenshots (session_id, timestamp)',
+        'CREATE INDEX ix_screenshots_unprocessed ON screenshots (session_id) WHERE NOT is_processed',
+        'CREATE INDEX ix_screenshots_idempotency_key ON screenshots (session_id, idempotency_key)',
+    ],
+}
+
+
+# Frozen copies of the partitions.py helpers this revision was written against
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def create_partition(table, month):
+    op.execute(
+        f"CREATE TABLE IF NOT EXISTS {table}_p{month.year:04d}_{month.month:02d} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def rename_out_of_the_way(conn, table, old):
+    """Rename a table, its indexes and its id sequence so the new parent can take their names"""
+    op.execute(f'ALTER TABLE {table} RENAME TO {old}')
+    for index in sa.inspect(conn).get_indexes(old):
+        op.execute(f"ALTER INDEX {index['name']} RENAME TO {index['name']}_old")
+    op.execute(f'ALTER INDEX IF EXISTS {table}_pkey RENAME TO {old}_pkey')
+
+
+def rebuild(conn, table, old, partitioned):
+    """Create the new table shape from old, copy the rows and drop old"""
+    sequence = conn.execute(sa.text(f"SELECT pg_get_serial_sequence('{old}', 'id')")).scalar()
+
+    op.execute(f'UPDATE {old} SET timestamp = CURRENT_TIMESTAMP WHERE timestamp IS NULL')
+    if partitioned:
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (timestamp)')
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN timestamp SET NOT NULL')
+        op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, timestamp)')
+
+        first = conn.execute(sa.text(f'SELECT MIN(timestamp) FROM {old}')).scalar() or datetime.utcnow()
+        month = month_start(first)
+        last = add_months(month_start(datetime.utcnow()), MONTHS_AHEAD)
+        while month <= last:
+            create_partition(table, month)
+            month = add_months(month, 1)
+        op.execute(f'CREATE TABLE {table}_default PARTITION OF {table} DEFAULT')
+    else:
+        op.execute(f'CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)')
+        op.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id)')
+
+    op.execute(f'ALTER TABLE {table} ADD FOREIGN KEY (session_id) REFERENCES monitoring_sessions (id)')
+    for ddl in INDEXES[table]:
+        op.execute(ddl)
+
+    op.execute(f'INSERT INTO {table} SELECT * FROM {old}')
+    if sequence:
+        op.execute(f'ALTER SEQUENCE {sequence} OWNED BY {table}.id')
+    op.execute(f'DROP TABLE {old}')
+
+
+def upgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    for table in PARTITIONED_TABLES:
+        rename_out_of_the_way(conn, table, f'{table}_unpartitioned')
+        rebuild(conn, table, f'{table}_unpartitioned', partitioned=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+    for table in PARTITIONED_TABLES:
+        op.execute(f'ALTER TABLE {table} RENAME TO {table}_partitioned')
+        for index in sa.inspect(conn).get_indexes(f'{table}_partitioned'):
+            op.execute(f"ALTER INDEX {index['name']} RENAME TO {index['name']}_old")
+        op.execute(f'ALTER INDEX IF EXISTS {table}_pkey RENAME TO {table}_partitioned_pkey')
+        rebuild(conn, table, f'{table}_partitioned', partitioned=False)
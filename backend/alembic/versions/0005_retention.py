@@ -0,0 +1,59 @@
+"""retention policies and session archives
+
+Per-organization retention days, the archive bundle record of each archived
+session and monitoring_sessions.archived_at (see retention.py).
+
+Revision ID: 0005_retention
+Revises: 0004_partition_event_tables
+Create Date: 2026-10-19 09:29:13.044030
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_retention'
+down_revision = '0004_partition_event_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('retention_policies',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('screenshot_days', sa.Integer(), nullable=True),
+    sa.Column('thumbnail_days', sa.Integer(), nullable=True),
+    sa.Column('activity_days', sa.Integer(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('organization_id')
+    )
+    op.create_table('session_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('bundle_ref', sa.String(length=80), nullable=False),
+    sa.Column('bundle_size', sa.Integer(), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=True),
+    sa.Column('screenshot_count', sa.Integer(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.Column('restored_at', sa.DateTime(), nullable=True),
+    sa.Column('hold_until', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['monitoring_sessions.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('session_id')
+    )
+    with op.batch_alter_table('monitoring_sessions', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_monitoring_sessions_end_time', ['end_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('monitoring_sessions', schema=None) as batch_op:
+        batch_op.drop_index('ix_monitoring_sessions_end_time')
+        batch_op.drop_column('archived_at')
+
+    op.drop_table('session_archives')
+    op.drop_table('retention_policies')
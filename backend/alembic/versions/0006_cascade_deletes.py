@@ -0,0 +1,77 @@
+"""cascade deletes of sessions and their rows; deletion jobs
+
+Foreign keys from sessions to employees and from activities, screenshots and
+session_archives to sessions become ON DELETE CASCADE (a manager's deletion sets
+manager_id to NULL), so bulk deletes don't have to load child rows. Adds the
+deletion_jobs progress table (see deletion.py).
+
+Revision ID: 0006_cascade_deletes
+Revises: 0005_retention
+Create Date: 2026-10-19 11:40:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_cascade_deletes'
+down_revision = '0005_retention'
+branch_labels = None
+depends_on = None
+
+# (table, column, referred table, ON DELETE action)
+FOREIGN_KEYS = [
+    ('employees', 'manager_id', 'employees', 'SET NULL'),
+    ('monitoring_sessions', 'employee_id', 'employees', 'CASCADE'),
+    ('activities', 'session_id', 'monitoring_sessions', 'CASCADE'),
+    ('screenshots', 'session_id', 'monitoring_sessions', 'CASCADE'),
+    ('session_archives', 'session_id', 'monitoring_sessions', 'CASCADE'),
+]
+
+# SQLite reflects foreign keys without names; batch mode names them by this convention
+SQLITE_NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def replace_foreign_key(table, column, referred, ondelete):
+    conn = op.get_bind()
+    if conn.dialect.name == 'sqlite':
+        name = f'fk_{table}_{column}_{referred}'
+        with op.batch_alter_table(table, naming_convention=SQLITE_NAMING) as batch_op:
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+        return
+
+    name = next(fk['name'] for fk in sa.inspect(conn).get_foreign_keys(table)
+                if fk['constrained_columns'] == [column])
+    op.drop_constraint(name, table, type_='foreignkey')
+    op.create_foreign_key(name, table, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    op.create_table('deletion_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('target_type', sa.String(length=20), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=False),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('total_sessions', sa.Integer(), nullable=True),
+    sa.Column('deleted_sessions', sa.Integer(), nullable=True),
+    sa.Column('deleted_activities', sa.Integer(), nullable=True),
+    sa.Column('deleted_screenshots', sa.Integer(), nullable=True),
+    sa.Column('released_files', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    for table, column, referred, ondelete in FOREIGN_KEYS:
+        replace_foreign_key(table, column, referred, ondelete)
+
+
+def downgrade():
+    for table, column, referred, _ in reversed(FOREIGN_KEYS):
+        replace_foreign_key(table, column, referred, None)
+    op.drop_table('deletion_jobs')
@@ -0,0 +1,42 @@
+"""screenshot renditions
+
+Blob references and sizes of the thumbnail/preview JPEG renditions of each
+screenshot, and the thumbnails held by session archives (see renditions.py).
+
+Revision ID: 0007_screenshot_renditions
+Revises: 0006_cascade_deletes
+Create Date: 2026-10-19 14:02:41.518337
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_screenshot_renditions'
+down_revision = '0006_cascade_deletes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('screenshots', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumb_path', sa.String(length=80), nullable=True))
+        batch_op.add_column(sa.Column('thumb_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('preview_path', sa.String(length=80), nullable=True))
+        batch_op.add_column(sa.Column('preview_size', sa.Integer(), nullable=True))
+
+    with op.batch_alter_table('session_archives', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('thumbnail_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('thumbnails_expired_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('session_archives', schema=None) as batch_op:
+        batch_op.drop_column('thumbnails_expired_at')
+        batch_op.drop_column('thumbnail_count')
+
+    with op.batch_alter_table('screenshots', schema=None) as batch_op:
+        batch_op.drop_column('preview_size')
+        batch_op.drop_column('preview_path')
+        batch_op.drop_column('thumb_size')
+        batch_op.drop_column('thumb_path')
@@ -0,0 +1,37 @@
+"""session summaries
+
+Per-session counts, top applications and folder totals materialized at session
+stop and refreshed for active sessions (see session_summaries.py).
+
+Revision ID: 0008_session_summaries
+Revises: 0007_screenshot_renditions
+Create Date: 2026-10-19 16:02:41.518204
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_session_summaries'
+down_revision = '0007_screenshot_renditions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('session_summaries',
+    sa.Column('session_id', sa.Integer(), nullable=False),
+    sa.Column('activity_count', sa.Integer(), nullable=True),
+    sa.Column('screenshot_count', sa.Integer(), nullable=True),
+    sa.Column('active_seconds', sa.Integer(), nullable=True),
+    sa.Column('applications', sa.JSON(), nullable=True),
+    sa.Column('folders', sa.JSON(), nullable=True),
+    sa.Column('is_final', sa.Boolean(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['session_id'], ['monitoring_sessions.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('session_id')
+    )
+
+
+def downgrade():
+    op.drop_table('session_summaries')
@@ -0,0 +1,52 @@
+"""usage rollups
+
+Daily per-employee usage by application, url and screenshot folder, and the
+watermarks of the incremental job that maintains it (see usage_rollups.py).
+
+Revision ID: 0009_usage_rollups
+Revises: 0008_session_summaries
+Create Date: 2026-10-19 17:11:06.204917
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_usage_rollups'
+down_revision = '0008_session_summaries'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('rollup_watermarks',
+    sa.Column('source', sa.String(length=20), nullable=False),
+    sa.Column('last_id', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('source')
+    )
+    op.create_table('usage_rollups',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('organization_id', sa.Integer(), nullable=True),
+    sa.Column('employee_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('dimension', sa.String(length=20), nullable=False),
+    sa.Column('name', sa.String(length=1000), nullable=False),
+    sa.Column('total_seconds', sa.Integer(), nullable=True),
+    sa.Column('switch_count', sa.Integer(), nullable=True),
+    sa.Column('screenshot_count', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['organization_id'], ['organizations.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('employee_id', 'day', 'dimension', 'name', name='uq_usage_rollups_employee_day_name')
+    )
+    with op.batch_alter_table('usage_rollups', schema=None) as batch_op:
+        batch_op.create_index('ix_usage_rollups_organization_id_day', ['organization_id', 'day'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('usage_rollups', schema=None) as batch_op:
+        batch_op.drop_index('ix_usage_rollups_organization_id_day')
+
+    op.drop_table('usage_rollups')
+    op.drop_table('rollup_watermarks')
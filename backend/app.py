@@ -3,8 +3,15 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from config import Config
 from models import db
+from sqlalchemy import event
 import os
 
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite only enforces foreign keys (and ON DELETE CASCADE) when enabled per connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
 def create_app(config_class=Config):
     """Application factory"""
     app = Flask(__name__)
@@ -19,9 +26,13 @@ def create_app(config_class=Config):
          origins=["*"],
          methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
          allow_headers=["Content-Type", "Authorization"],
+         expose_headers=["X-Next-Cursor"],
          supports_credentials=False,
          max_age=3600)
     db.init_app(app)
+    if app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        with app.app_context():
+            event.listen(db.engine, 'connect', enable_sqlite_foreign_keys)
     JWTManager(app)
     
     # Create screenshot folder
@@ -35,6 +46,7 @@ def create_app(config_class=Config):
     from routes.screenshots import screenshot_bp
     from routes.workflow import workflow_bp
     from routes.monitoring_config import config_bp
+    from routes.analytics import analytics_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(org_bp, url_prefix='/api/organizations')
@@ -43,6 +55,7 @@ def create_app(config_class=Config):
     app.register_blueprint(screenshot_bp, url_prefix='/api/screenshots')
     app.register_blueprint(workflow_bp, url_prefix='/api/workflow')
     app.register_blueprint(config_bp, url_prefix='/api/monitoring-config')
+    app.register_blueprint(analytics_bp, url_prefix='/api/analytics')
     
     # Error handlers
     @app.errorhandler(404)
@@ -58,9 +71,10 @@ def create_app(config_class=Config):
     def health():
         return jsonify({'status': 'healthy'})
     
-    # Create tables
-    with app.app_context():
-        db.create_all()
+    # Create tables (disabled where Alembic manages the schema)
+    if app.config['AUTO_CREATE_TABLES']:
+        with app.app_context():
+            db.create_all()
     
     return app
 
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Retention Job
+Run daily (cron / systemd timer). Archives closed sessions past their
+organization's screenshot retention into compressed bundles, deletes their hot
+rows in batches, releases archived thumbnails past their retention and expires
+sessions past their activity retention (see retention.py). Released screenshot files are removed by gc_screenshot_blobs.py.
+"""
+
+import argparse
+from app import create_app
+from retention import run_retention
+
+def main():
+    parser = argparse.ArgumentParser(description='Apply per-organization retention policies')
+    parser.add_argument('--organization', type=int, default=None, help='only this organization id')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='rows deleted per transaction (default: RETENTION_BATCH_SIZE)')
+    parser.add_argument('--session-limit', type=int, default=1000,
+                        help='sessions archived/expired per organization and run')
+    parser.add_argument('--dry-run', action='store_true', help='report what would be archived or expired')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        batch_size = args.batch_size or app.config['RETENTION_BATCH_SIZE']
+        stats = run_retention(organization_id=args.organization, batch_size=batch_size,
+                              session_limit=args.session_limit, dry_run=args.dry_run)
+        verb = 'Would archive' if args.dry_run else 'Archived'
+        print(f"✓ {verb} {stats['sessions_archived']} session(s) "
+              f"({stats['activities']} activities, {stats['screenshots']} screenshots moved out of hot tables)")
+        verb = 'Would release' if args.dry_run else 'Released'
+        print(f"✓ {verb} the thumbnails of {stats['sessions_thumbnails_expired']} archived session(s) "
+              f"({stats['thumbnails']} thumbnails)")
+        verb = 'Would expire' if args.dry_run else 'Expired'
+        print(f"✓ {verb} {stats['sessions_expired']} session(s) past activity retention")
+
+if __name__ == '__main__':
+    main()
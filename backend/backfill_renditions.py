@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Rendition Backfill
+Renders the thumbnail/preview JPEGs of existing screenshots ahead of time, so
+galleries don't wait for the first request to render them (see renditions.py).
+Safe to re-run and to run next to live traffic: screenshots that already have a
+rendition are skipped.
+"""
+
+import argparse
+from app import create_app
+from models import Screenshot, MonitoringSession
+from renditions import RENDITIONS, render_missing
+
+def main():
+    parser = argparse.ArgumentParser(description='Render screenshot thumbnails/previews ahead of time')
+    parser.add_argument('--sizes', nargs='+', choices=list(RENDITIONS), default=['thumb'])
+    parser.add_argument('--session', type=int, default=None, help='only this session id')
+    parser.add_argument('--batch-size', type=int, default=100, help='screenshots per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        query = Screenshot.query.join(MonitoringSession).filter(MonitoringSession.archived_at.is_(None))
+        if args.session is not None:
+            query = query.filter(Screenshot.session_id == args.session)
+        for size in args.sizes:
+            rendered = render_missing(query, size, args.batch_size)
+            print(f"✓ Rendered {rendered} {size} rendition(s)")
+
+if __name__ == '__main__':
+    main()
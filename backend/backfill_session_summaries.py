@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Session Summary Backfill
+Computes the summary of closed sessions that don't have a final one yet (sessions
+that ended before summaries existed, or whose stop was never recorded), and with
+--active recomputes the summaries of running sessions, e.g. from cron every few
+minutes: nothing else refreshes them while a session runs (see
+session_summaries.py). Safe to re-run.
+"""
+
+import argparse
+from app import create_app
+from models import MonitoringSession, SessionSummary
+from session_summaries import summarize_sessions
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute or refresh monitoring session summaries')
+    parser.add_argument('--active', action='store_true', help='refresh the summaries of active sessions instead')
+    parser.add_argument('--session', type=int, default=None, help='only this session id')
+    parser.add_argument('--batch-size', type=int, default=100, help='sessions per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        query = MonitoringSession.query.filter(MonitoringSession.archived_at.is_(None),
+                                               MonitoringSession.is_active == args.active)
+        if not args.active:
+            query = query.outerjoin(SessionSummary).filter(SessionSummary.is_final.isnot(True))
+        if args.session is not None:
+            query = query.filter(MonitoringSession.id == args.session)
+        summarized = summarize_sessions(query, batch_size=args.batch_size)
+        print(f"✓ {'Refreshed' if args.active else 'Summarized'} {summarized} session(s)")
+
+if __name__ == '__main__':
+    main()
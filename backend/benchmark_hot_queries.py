@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Hot Query Benchmark
+Seeds a synthetic dataset (millions of activity/screenshot rows by default) and
+prints the query plan and timings of the hot dashboard/ingest queries, with and
+without the indexes added by alembic revision 0002_hot_path_indexes.
+
+  python benchmark_hot_queries.py                                   # SQLite file, default size
+  python benchmark_hot_queries.py --database-url postgresql+psycopg://postgres:pw@localhost/monitor_bench
+  python benchmark_hot_queries.py --skip-seed --repeat 50           # reuse a seeded database
+
+Use a scratch database: the benchmark creates tables and drops/recreates indexes.
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, text, insert, func, select
+from models import db, Organization, Employee, MonitoringSession, Activity, Screenshot
+
+HOT_INDEXES = [
+    ('ix_activities_session_id_timestamp', 'CREATE INDEX {name} ON activities (session_id, timestamp)'),
+    ('ix_screenshots_session_id_timestamp', 'CREATE INDEX {name} ON screenshots (session_id, timestamp)'),
+    ('ix_screenshots_unprocessed', 'CREATE INDEX {name} ON screenshots (session_id) WHERE NOT is_processed'),
+    ('ix_monitoring_sessions_employee_id_start_time',
+     'CREATE INDEX {name} ON monitoring_sessions (employee_id, start_time)'),
+    ('ix_employees_organization_id_manager_id', 'CREATE INDEX {name} ON employees (organization_id, manager_id)'),
+]
+
+QUERIES = [
+    ('session activity timeline',
+     'SELECT * FROM activities WHERE session_id = :session_id ORDER BY timestamp'),
+    ('session screenshot timeline',
+     'SELECT * FROM screenshots WHERE session_id = :session_id ORDER BY timestamp'),
+    ('unprocessed screenshots of a session',
+     'SELECT id FROM screenshots WHERE session_id = :session_id AND NOT is_processed'),
+    ('employee session history',
+     'SELECT * FROM monitoring_sessions WHERE employee_id = :employee_id ORDER BY start_time DESC LIMIT 50'),
+    ('manager team listing',
+     'SELECT * FROM employees WHERE organization_id = :organization_id AND manager_id = :manager_id'),
+]
+
+
+def seed(engine, organizations, employees_per_org, sessions_per_employee, events_per_session, batch_size):
+    """Insert the synthetic dataset in batches"""
+    rng = random.Random(42)
+    start = datetime(2025, 1, 1)
+    started = time.time()
+
+    def flush(model, rows):
+        if rows:
+            with engine.begin() as conn:
+                conn.execute(insert(model.__table__), rows)
+            rows.clear()
+
+    with engine.begin() as conn:
+        conn.execute(insert(Organization.__table__), [
+            {'id': o, 'name': f'Benchmark Org {o}', 'screenshot_interval': 10, 'created_at': start}
+            for o in range(1, organizations + 1)
+        ])
+
+    employees, sessions, activities, screenshots = [], [], [], []
+    employee_id = session_id = 0
+    for org_id in range(1, organizations + 1):
+        manager_ids = []
+        for e in range(employees_per_org):
+            employee_id += 1
+            is_manager = e < max(1, employees_per_org // 20)
+            if is_manager:
+                manager_ids.append(employee_id)
+            employees.append({
+                'id': employee_id, 'email': f'bench{employee_id}@example.com', 'name': f'Bench {employee_id}',
+                'password_hash': 'x', 'role': 'admin' if is_manager else 'employee', 'organization_id': org_id,
+                'manager_id': None if is_manager else rng.choice(manager_ids), 'is_active': True,
+                'created_at': start
+            })
+        flush(Employee, employees)
+
+        for emp in range(employee_id - employees_per_org + 1, employee_id + 1):
+            for s in range(sessions_per_employee):
+                session_id += 1
+                session_start = start + timedelta(days=s, hours=rng.randint(7, 10))
+                sessions.append({
+                    'id': session_id, 'employee_id': emp, 'start_time': session_start,
+                    'end_time': session_start + timedelta(hours=8), 'is_active': False
+                })
+                for i in range(events_per_session):
+                    at = session_start + timedelta(seconds=i * 10)
+                    activities.append({
+                        'session_id': session_id, 'timestamp': at, 'activity_type': 'application',
+                        'application_name': rng.choice(['Chrome', 'Slack', 'Excel', 'VS Code']),
+                        'window_title': f'Window {i}', 'url': None, 'duration_seconds': 10, 'in_allowlist': True
+                    })
+                    screenshots.append({
+                        'session_id': session_id, 'timestamp': at, 'file_path': f'sha256:{session_id:032x}{i:032x}',
+                        'file_size': 200_000, 'is_processed': rng.random() < 0.98,
+                        'folder_name': 'bench', 'activity_name': 'bench'
+                    })
+                if len(activities) >= batch_size:
+                    flush(MonitoringSession, sessions)
+                    flush(Activity, activities)
+                    flush(Screenshot, screenshots)
+        print(f"  ... seeded {session_id} sessions ({time.time() - started:.0f}s)")
+
+    flush(MonitoringSession, sessions)
+    flush(Activity, activities)
+    flush(Screenshot, screenshots)
+
+
+def explain(conn, sql, params):
+    if conn.dialect.name == 'postgresql':
+        rows = conn.execute(text(f'EXPLAIN (ANALYZE, BUFFERS) {sql}'), params).fetchall()
+        return '\n'.join(row[0] for row in rows)
+    rows = conn.execute(text(f'EXPLAIN QUERY PLAN {sql}'), params).fetchall()
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def time_query(conn, sql, params_list):
+    timings = []
+    for params in params_list:
+        begin = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        timings.append((time.perf_counter() - begin) * 1000)
+    return statistics.median(timings), max(timings)
+
+
+def sample_params(conn, repeat):
+    """Random existing ids to query with"""
+    rng = random.Random(7)
+    max_session = conn.execute(select(func.max(MonitoringSession.id))).scalar()
+    max_employee = conn.execute(select(func.max(Employee.id))).scalar()
+    managers = conn.execute(text(
+        "SELECT organization_id, id FROM employees WHERE role = 'admin'"
+    )).fetchall()
+    params = []
+    for _ in range(repeat):
+        organization_id, manager_id = rng.choice(managers)
+        params.append({
+            'session_id': rng.randint(1, max_session),
+            'employee_id': rng.randint(1, max_employee),
+            'organization_id': organization_id,
+            'manager_id': manager_id
+        })
+    return params
+
+
+def run(engine, repeat, label):
+    print(f"\n--- {label} ---")
+    with engine.connect() as conn:
+        params = sample_params(conn, repeat)
+        for name, sql in QUERIES:
+            median, worst = time_query(conn, sql, params)
+            print(f"\n{name}: median {median:.2f} ms, max {worst:.2f} ms")
+            for line in explain(conn, sql, params[0]).splitlines():
+                print(f"    {line}")
+
+
+def set_hot_indexes(engine, present):
+    with engine.begin() as conn:
+        for name, ddl in HOT_INDEXES:
+            conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+            if present:
+                conn.execute(text(ddl.format(name=name)))
+        conn.execute(text('ANALYZE'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query plans and timings of the hot queries on a seeded dataset')
+    parser.add_argument('--database-url', default='sqlite:///hot_query_benchmark.db',
+                        help='scratch database to seed and query (default: local SQLite file)')
+    parser.add_argument('--organizations', type=int, default=10)
+    parser.add_argument('--employees-per-org', type=int, default=100)
+    parser.add_argument('--sessions-per-employee', type=int, default=20)
+    parser.add_argument('--events-per-session', type=int, default=100,
+                        help='activities and screenshots per session (default: 2M of each)')
+    parser.add_argument('--batch-size', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=20, help='executions per query')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse an already seeded database')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    print("=" * 70)
+    print(f"HOT QUERY BENCHMARK ({engine.dialect.name})")
+    print("=" * 70)
+
+    if not args.skip_seed:
+        db.metadata.drop_all(engine)
+        db.metadata.create_all(engine)
+        set_hot_indexes(engine, present=False)  # faster bulk load
+        total = args.organizations * args.employees_per_org * args.sessions_per_employee * args.events_per_session
+        print(f"Seeding {total:,} activities and {total:,} screenshots...")
+        seed(engine, args.organizations, args.employees_per_org, args.sessions_per_employee,
+             args.events_per_session, args.batch_size)
+
+    set_hot_indexes(engine, present=False)
+    run(engine, args.repeat, 'without hot-path indexes')
+
+    set_hot_indexes(engine, present=True)
+    run(engine, args.repeat, 'with hot-path indexes')
+
+    print("\n✓ Benchmark complete")
+
+
+if __name__ == '__main__':
+    main()
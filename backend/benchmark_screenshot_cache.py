@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Screenshot Cache Benchmark
+Uploads a gallery's worth of synthetic screenshots to an in-process app and
+compares repeat views of the gallery:
+
+  before    no validators: every view downloads every image again
+  after     views revalidate with If-None-Match and get 304s (browsers that
+            honour `immutable` don't even send these until max-age runs out)
+
+  python benchmark_screenshot_cache.py
+  python benchmark_screenshot_cache.py --screenshots 100 --views 20 --image-kb 800
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark repeat screenshot gallery views')
+    parser.add_argument('--screenshots', type=int, default=50, help='images in the gallery')
+    parser.add_argument('--views', type=int, default=10, help='repeat views to time')
+    parser.add_argument('--image-kb', type=int, default=500, help='size of each synthetic PNG')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='cache_bench_')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['SCREENSHOT_FOLDER'] = os.path.join(workdir, 'screenshots')
+    os.environ['OCR_ENABLED'] = 'false'
+    from io import BytesIO
+    from app import app
+
+    client = app.test_client()
+    client.post('/api/auth/register', json={
+        'email': 'bench@example.com', 'password': 'password123', 'name': 'Cache Bench'
+    })
+    token = client.post('/api/auth/login', json={
+        'email': 'bench@example.com', 'password': 'password123'
+    }).get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post('/api/monitoring/sessions/start', headers=headers, json={})
+
+    urls = []
+    for i in range(args.screenshots):
+        image = b'\x89PNG\r\n\x1a\n' + os.urandom(args.image_kb * 1024)
+        screenshot = client.post('/api/screenshots/upload', headers=headers, data={
+            'file': (BytesIO(image), 'screenshot.png'), 'folder_name': 'bench'
+        }).get_json()['screenshot']
+        urls.append(f"/api/screenshots/{screenshot['id']}/file")
+
+    # First view fills the browser cache: remember each ETag
+    etags = {url: client.get(url, headers=headers).headers['ETag'] for url in urls}
+
+    def view(revalidate):
+        transferred = 0
+        begin = time.perf_counter()
+        for url in urls:
+            request_headers = dict(headers, **({'If-None-Match': etags[url]} if revalidate else {}))
+            transferred += len(client.get(url, headers=request_headers).get_data())
+        return transferred, (time.perf_counter() - begin) * 1000
+
+    print(f"Gallery of {args.screenshots} x {args.image_kb} KB screenshots, {args.views} repeat views\n")
+    for label, revalidate in (('before (full downloads)', False), ('after (If-None-Match -> 304)', True)):
+        results = [view(revalidate) for _ in range(args.views)]
+        transferred = statistics.median(r[0] for r in results)
+        latency = statistics.median(r[1] for r in results)
+        print(f"{label:30s} {transferred / 1024:10.0f} KB/view  {latency:8.1f} ms/view (median)")
+
+
+if __name__ == '__main__':
+    main()
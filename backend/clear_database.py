@@ -4,7 +4,7 @@ Clears all data from the database tables
 """
 
 from app import create_app
-from models import db, Organization, Employee, MonitoringSession, Activity, Screenshot
+from models import db, Organization, Employee, MonitoringSession, Activity, Screenshot, ScreenshotBlob
 import os
 import shutil
 
@@ -20,6 +20,9 @@ def clear_database():
         print("Deleting screenshots...")
         Screenshot.query.delete()
         
+        print("Deleting screenshot blobs...")
+        ScreenshotBlob.query.delete()
+        
         print("Deleting activities...")
         Activity.query.delete()
         
@@ -44,6 +47,8 @@ def clear_database():
                 try:
                     if os.path.isfile(file_path):
                         os.unlink(file_path)
+                    elif filename == 'blobs':
+                        shutil.rmtree(file_path)
                 except Exception as e:
                     print(f"Error deleting {file_path}: {e}")
             print("✓ Screenshot files cleared")
@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Screenshot Packfile Compactor
+Rewrites old packfile segments without their deleted entries (SCREENSHOT_STORAGE=packfile)
+"""
+
+import argparse
+from app import create_app
+from storage import get_storage
+from storage.packfile import PackfileStorage
+
+def main():
+    parser = argparse.ArgumentParser(description='Reclaim space from deleted screenshots in packfile segments')
+    parser.add_argument('--older-than-days', type=int, default=1,
+                        help='only compact segments from days at least this old (today is never compacted)')
+    parser.add_argument('--min-garbage-ratio', type=float, default=0.25,
+                        help='rewrite a segment once this fraction of it is deleted entries')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        storage = get_storage()
+        if not isinstance(storage, PackfileStorage):
+            print(f"SCREENSHOT_STORAGE is '{storage.name}', not 'packfile'; nothing to compact")
+            return
+
+        rewritten, reclaimed = storage.compact(older_than_days=max(args.older_than_days, 1),
+                                               min_garbage_ratio=args.min_garbage_ratio)
+        print(f"✓ Rewrote {rewritten} segment(s), reclaimed {reclaimed / (1024 * 1024):.1f} MB")
+
+if __name__ == '__main__':
+    main()
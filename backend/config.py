@@ -11,9 +11,81 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_ACCESS_TOKEN_EXPIRES = 24 * 3600  # 24 hours
     
+    # Create missing tables on startup (development convenience). Production schemas
+    # are managed by Alembic instead: AUTO_CREATE_TABLES=false and `alembic upgrade head`
+    AUTO_CREATE_TABLES = os.getenv('AUTO_CREATE_TABLES', 'true').lower() == 'true'
+    
     # Screenshot settings
-    SCREENSHOT_FOLDER = os.path.join(os.path.dirname(__file__), 'screenshots')
-    MAX_SCREENSHOT_SIZE = 5 * 1024 * 1024  # 5MB
+    SCREENSHOT_FOLDER = os.getenv('SCREENSHOT_FOLDER', os.path.join(os.path.dirname(__file__), 'screenshots'))
+    MAX_SCREENSHOT_SIZE = int(os.getenv('MAX_SCREENSHOT_SIZE', str(5 * 1024 * 1024)))  # 5MB, enforced while streaming
+    
+    # Screenshot storage backend: 'local' (sharded blobs under SCREENSHOT_FOLDER),
+    # 'packfile' (per-day append-only segments under SCREENSHOT_FOLDER) or 's3'
+    SCREENSHOT_STORAGE = os.getenv('SCREENSHOT_STORAGE', 'local')
+    PACKFILE_SEGMENT_MAX_BYTES = int(os.getenv('PACKFILE_SEGMENT_MAX_BYTES', str(1024 * 1024 * 1024)))  # 1GB
+    S3_BUCKET = os.getenv('S3_BUCKET', 'monitor-screenshots')
+    S3_PREFIX = os.getenv('S3_PREFIX', 'screenshots')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')  # e.g. http://localhost:9000 for MinIO
+    S3_REGION = os.getenv('S3_REGION', 'us-east-1')
+    S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY')
+    
+    # Browsers may keep downloaded screenshots this long (they never change once stored)
+    SCREENSHOT_CACHE_MAX_AGE = int(os.getenv('SCREENSHOT_CACHE_MAX_AGE', str(365 * 24 * 3600)))
+    
+    # Signed screenshot URLs in list responses (see signed_urls.py): valid for at least
+    # SCREENSHOT_URL_TTL seconds, signed with SCREENSHOT_URL_SECRET (default SECRET_KEY).
+    # SCREENSHOT_URL_BASE is the origin they point at (default: the API's own host);
+    # behind nginx, SCREENSHOT_ACCEL_REDIRECT names its internal location for local blobs
+    SCREENSHOT_URL_SECRET = os.getenv('SCREENSHOT_URL_SECRET')
+    SCREENSHOT_URL_TTL = int(os.getenv('SCREENSHOT_URL_TTL', '3600'))
+    SCREENSHOT_URL_BASE = os.getenv('SCREENSHOT_URL_BASE')
+    SCREENSHOT_ACCEL_REDIRECT = os.getenv('SCREENSHOT_ACCEL_REDIRECT')
+    
+    # Thumbnail/preview renditions are resized in this many worker processes per app
+    # process (0 resizes in the request thread); see renditions.py
+    RENDITION_WORKERS = int(os.getenv('RENDITION_WORKERS', '2'))
+    
+    # Ingest: 'sync' commits each event before answering 201; 'async' answers 202 and a
+    # background writer inserts rows in batches (see ingest_writer.py for durability)
+    INGEST_MODE = os.getenv('INGEST_MODE', 'sync')
+    INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', '500'))
+    INGEST_FLUSH_INTERVAL_MS = int(os.getenv('INGEST_FLUSH_INTERVAL_MS', '20'))
+    INGEST_QUEUE_MAX = int(os.getenv('INGEST_QUEUE_MAX', '10000'))
+    
+    # Monthly partitions of activities/screenshots (PostgreSQL, see maintain_partitions.py).
+    # PARTITION_RETENTION_MONTHS=0 keeps every month; idempotency keys only need to
+    # outlive the agents' retry window
+    PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+    PARTITION_RETENTION_MONTHS = int(os.getenv('PARTITION_RETENTION_MONTHS', '0'))
+    INGEST_KEY_RETENTION_DAYS = int(os.getenv('INGEST_KEY_RETENTION_DAYS', '7'))
+    
+    # Default retention of organizations without their own policy (see retention.py),
+    # in days after a session ends; 0 keeps forever. apply_retention.py enforces them
+    RETENTION_SCREENSHOT_DAYS = int(os.getenv('RETENTION_SCREENSHOT_DAYS', '0'))
+    RETENTION_THUMBNAIL_DAYS = int(os.getenv('RETENTION_THUMBNAIL_DAYS', '0'))
+    RETENTION_ACTIVITY_DAYS = int(os.getenv('RETENTION_ACTIVITY_DAYS', '0'))
+    RETENTION_RESTORE_HOLD_DAYS = int(os.getenv('RETENTION_RESTORE_HOLD_DAYS', '7'))
+    RETENTION_BATCH_SIZE = int(os.getenv('RETENTION_BATCH_SIZE', '1000'))
+    
+    # Employee/session deletions run in the background, this many sessions per transaction
+    DELETION_BATCH_SIZE = int(os.getenv('DELETION_BATCH_SIZE', '50'))
+    
+    # Active session lookups on the ingest path are cached per employee; set REDIS_URL
+    # to share the cache (and its start/stop invalidation) across workers
+    ACTIVE_SESSION_CACHE_TTL = int(os.getenv('ACTIVE_SESSION_CACHE_TTL', '10'))  # seconds
+    REDIS_URL = os.getenv('REDIS_URL')
+    
+    # The caller's id/role/organization/manager, cached per employee in each worker;
+    # role and manager changes apply in other workers once their entry expires
+    PRINCIPAL_CACHE_TTL = int(os.getenv('PRINCIPAL_CACHE_TTL', '30'))  # seconds
+    PRINCIPAL_CACHE_SIZE = int(os.getenv('PRINCIPAL_CACHE_SIZE', '10000'))
+    
+    # Listing sessions recomputes an active session's summary once it is this old
+    SESSION_SUMMARY_MAX_AGE = int(os.getenv('SESSION_SUMMARY_MAX_AGE', '60'))  # seconds
+    
+    # Bulk exports read this many rows per query, each in its own short transaction
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '5000'))
     
     # OCR/Extraction API settings (Mistral)
     MISTRAL_API_KEY = os.getenv('MISTRAL_API_KEY', 'CNYRMJHhgFHMJQQBqgKKNX6zjwXzFmQ0')
@@ -0,0 +1,77 @@
+"""
+Shared pytest fixtures: the app on a throwaway SQLite database, a test client,
+registered logins and a recorder for the SQL statements a block runs.
+Set DATABASE_URL to run the tests against another database (e.g. PostgreSQL
+migrated with `alembic upgrade head` and AUTO_CREATE_TABLES=false)
+"""
+import os
+import tempfile
+from collections import namedtuple
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+from models import db
+
+# Config reads the environment when the app is first imported
+_workdir = tempfile.mkdtemp(prefix='monitor_test_')
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(_workdir, 'test.db')}")
+os.environ.setdefault('SCREENSHOT_FOLDER', os.path.join(_workdir, 'screenshots'))
+os.environ.setdefault('OCR_ENABLED', 'false')
+os.environ.setdefault('RENDITION_WORKERS', '0')  # Resize in the request thread
+
+Login = namedtuple('Login', 'headers employee session_id')
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def login(client):
+    """login(email, org=None, role='employee', start=False): register (once) and log in,
+    starting a monitoring session when start is set"""
+    def login(email, org=None, role='employee', start=False):
+        registration = {'email': email, 'password': 'password123', 'name': 'Test User', 'role': role}
+        if org:
+            registration['organization_name'] = org
+        client.post('/api/auth/register', json=registration)
+        response = client.post('/api/auth/login', json={'email': email, 'password': 'password123'}).get_json()
+        headers = {'Authorization': f"Bearer {response['access_token']}"}
+        session_id = None
+        if start:
+            session_id = client.post('/api/monitoring/sessions/start', headers=headers,
+                                     json={}).get_json()['session']['id']
+        return Login(headers, response['employee'], session_id)
+    return login
+
+
+@pytest.fixture
+def statements(app):
+    """statements(*tables): the SQL run while the block runs, only statements reading
+    FROM or JOINing one of tables when any are given"""
+    with app.app_context():
+        engine = db.engine
+
+    @contextmanager
+    def statements(*tables):
+        recorded = []
+
+        def record(conn, cursor, statement, *args):
+            if not tables or any(f'FROM {t}' in statement or f'JOIN {t}' in statement for t in tables):
+                recorded.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield recorded
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+    return statements
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Database Creation Script
-Creates the PostgreSQL database and all required tables
+Verifies the PostgreSQL database and migrates it to the latest schema (Alembic)
 """
 
 import os
@@ -59,30 +59,36 @@ def create_database():
         return False
 
 def create_tables():
-    """Create all required tables using SQLAlchemy models"""
+    """Bring the schema up to date with Alembic migrations"""
     try:
-        print("\nCreating database tables...")
+        print("\nApplying database migrations...")
         
-        # Import Flask app and models
-        from app import create_app
-        from models import db
+        from alembic import command
+        from alembic.config import Config as AlembicConfig
+        from sqlalchemy import create_engine, inspect
+        from config import Config
         
-        # Create app and tables
-        app = create_app()
-        with app.app_context():
-            db.create_all()
-            print("✓ All tables created successfully")
-            
-            # Print created tables
-            from sqlalchemy import inspect
-            inspector = inspect(db.engine)
-            tables = inspector.get_table_names()
-            print(f"\nCreated tables: {', '.join(tables)}")
+        alembic_cfg = AlembicConfig(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'alembic.ini'))
+        engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+        tables = inspect(engine).get_table_names()
+        engine.dispose()
+        
+        # Databases created by db.create_all() before Alembic: adopt them at the baseline
+        if tables and 'alembic_version' not in tables:
+            print("  Existing schema without migration history, stamping 0001_baseline")
+            command.stamp(alembic_cfg, '0001_baseline')
+        
+        command.upgrade(alembic_cfg, 'head')
+        print("✓ Schema is at the latest migration")
+        
+        engine = create_engine(Config.SQLALCHEMY_DATABASE_URI)
+        print(f"\nTables: {', '.join(inspect(engine).get_table_names())}")
+        engine.dispose()
             
         return True
         
     except Exception as e:
-        print(f"✗ Error creating tables: {e}")
+        print(f"✗ Error migrating database: {e}")
         import traceback
         traceback.print_exc()
         return False
@@ -0,0 +1,186 @@
+"""
+Bulk Deletion
+Deleting an employee or a session creates a DeletionJob and answers right away;
+a background thread per worker process then deletes the sessions a batch at a
+time. Each batch is one transaction made of set-based statements:
+
+    release the screenshot blobs, renditions and archive bundles the batch references
+        (one UPDATE ... FROM an aggregate over the batch's screenshots per column)
+    DELETE FROM monitoring_sessions WHERE id IN (...)
+        (activities, screenshots and session_archives follow by ON DELETE CASCADE)
+
+so no child row is loaded into Python (an archive still holding thumbnails has
+its bundle read for their references). Blob files are removed later by
+gc_screenshot_blobs.py; legacy screenshot files are unlinked after each batch
+commits. Job counters are updated per batch for progress polling, and jobs
+interrupted by a restart are resumed with `python run_deletion_jobs.py`.
+"""
+
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, func, select, update
+from models import db, Employee, MonitoringSession, Activity, Screenshot, ScreenshotBlob, SessionArchive, DeletionJob
+from renditions import BLOB_REF_COLUMNS
+from retention import release_archived_thumbnails
+from session_cache import invalidate_active_session
+from principal import invalidate_principal
+from storage import get_storage
+from storage.blobs import BLOB_REF_PREFIX
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = ['pending', 'running']
+
+
+def _release_refs(ref_column, filter_clause):
+    """Release every blob referenced by ref_column in the filtered rows, in one UPDATE"""
+    released = select(
+        func.substr(ref_column, len(BLOB_REF_PREFIX) + 1).label('digest'),
+        func.count().label('n')
+    ).where(filter_clause, ref_column.like(f'{BLOB_REF_PREFIX}%')).group_by(ref_column).subquery()
+
+    return db.session.execute(
+        update(ScreenshotBlob).where(ScreenshotBlob.digest == released.c.digest).values(
+            ref_count=case((ScreenshotBlob.ref_count > released.c.n, ScreenshotBlob.ref_count - released.c.n),
+                           else_=0),
+            updated_at=datetime.utcnow()
+        ).execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def delete_sessions(session_ids):
+    """
+    Delete sessions and everything under them inside the current transaction
+
+    Returns (counts, legacy_paths): counts has the activities and screenshots
+    deleted and the blobs released; legacy_paths are screenshot files outside blob
+    storage, to unlink once the transaction has committed.
+    """
+    in_batch = Screenshot.session_id.in_(session_ids)
+    counts = {
+        'activities': db.session.query(func.count(Activity.id)).filter(
+            Activity.session_id.in_(session_ids)).scalar(),
+        'screenshots': db.session.query(func.count(Screenshot.id)).filter(in_batch).scalar(),
+        'files': sum(_release_refs(getattr(Screenshot, column), in_batch) for column in BLOB_REF_COLUMNS)
+                 + _release_refs(SessionArchive.bundle_ref, SessionArchive.session_id.in_(session_ids))
+    }
+    # Thumbnails kept by an archive are only listed in its bundle
+    held = SessionArchive.query.filter(SessionArchive.session_id.in_(session_ids),
+                                       SessionArchive.thumbnail_count > 0,
+                                       SessionArchive.thumbnails_expired_at.is_(None)).all()
+    if held:
+        storage = get_storage()
+        counts['files'] += sum(release_archived_thumbnails(archive, storage) for archive in held)
+    legacy_paths = [path for (path,) in db.session.query(Screenshot.file_path).filter(
+        in_batch, Screenshot.file_path.notlike(f'{BLOB_REF_PREFIX}%')
+    ).distinct()]
+
+    MonitoringSession.query.filter(MonitoringSession.id.in_(session_ids)).delete(synchronize_session=False)
+    return counts, legacy_paths
+
+
+def _target_sessions(job):
+    query = db.session.query(MonitoringSession.id)
+    if job.target_type == 'employee':
+        return query.filter(MonitoringSession.employee_id == job.target_id)
+    return query.filter(MonitoringSession.id == job.target_id)
+
+
+def create_deletion_job(target_type, target_id, organization_id, requested_by=None):
+    """
+    Record a deletion and stop new data arriving for its target
+
+    The target's active session is closed first so the agent can't keep adding
+    rows while the job runs. An open job for the same target is returned as is.
+    """
+    job = DeletionJob.query.filter(
+        DeletionJob.target_type == target_type,
+        DeletionJob.target_id == target_id,
+        DeletionJob.status.in_(OPEN_STATUSES)
+    ).first()
+    if job:
+        return job
+
+    if target_type == 'employee':
+        employee_id = target_id
+        db.session.get(Employee, employee_id).is_active = False
+        open_sessions = MonitoringSession.query.filter_by(employee_id=employee_id, is_active=True)
+    else:
+        employee_id = db.session.get(MonitoringSession, target_id).employee_id
+        open_sessions = MonitoringSession.query.filter_by(id=target_id, is_active=True)
+    open_sessions.update({MonitoringSession.is_active: False, MonitoringSession.end_time: datetime.utcnow()},
+                         synchronize_session=False)
+
+    job = DeletionJob(target_type=target_type, target_id=target_id,
+                      organization_id=organization_id, requested_by=requested_by)
+    db.session.add(job)
+    db.session.flush()
+    job.total_sessions = _target_sessions(job).count()
+    db.session.commit()
+    invalidate_active_session(employee_id)
+    if target_type == 'employee':
+        invalidate_principal(employee_id)
+    return job
+
+
+def run_deletion_job(job_id, batch_size=50):
+    """Delete a job's sessions batch by batch, then its target; safe to re-run after a crash"""
+    job = db.session.get(DeletionJob, job_id)
+    job.status = 'running'
+    job.error = None
+    db.session.commit()
+
+    try:
+        while True:
+            session_ids = [session_id for (session_id,) in _target_sessions(job).limit(batch_size)]
+            if not session_ids:
+                break
+            counts, legacy_paths = delete_sessions(session_ids)
+            job.deleted_sessions += len(session_ids)
+            job.deleted_activities += counts['activities']
+            job.deleted_screenshots += counts['screenshots']
+            job.released_files += counts['files'] + len(legacy_paths)
+            db.session.commit()
+            for path in legacy_paths:
+                if path and os.path.exists(path):
+                    os.unlink(path)
+
+        if job.target_type == 'employee':
+            Employee.query.filter_by(id=job.target_id).delete(synchronize_session=False)
+        job.status = 'completed'
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        if job.target_type == 'employee':
+            invalidate_principal(job.target_id)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Deletion job %s failed", job_id)
+        job = db.session.get(DeletionJob, job_id)
+        job.status = 'failed'
+        job.error = str(e)
+        db.session.commit()
+    return job
+
+
+def get_deletion_executor():
+    """Single background thread running this process's deletion jobs one after another"""
+    executor = current_app.extensions.get('deletion_executor')
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='deletion')
+        current_app.extensions['deletion_executor'] = executor
+    return executor
+
+
+def submit_deletion_job(job_id):
+    """Run a job in the background; returns the future"""
+    app = current_app._get_current_object()
+    batch_size = app.config.get('DELETION_BATCH_SIZE', 50)
+
+    def run():
+        with app.app_context():
+            run_deletion_job(job_id, batch_size)
+
+    return get_deletion_executor().submit(run)
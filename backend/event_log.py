@@ -0,0 +1,178 @@
+"""
+Columnar Event Logs
+The events of many sessions and employees as an Arrow or Parquet file for
+process-mining tools (pm4py, pandas, DuckDB), with the columns
+generate_pm4py_diagram uses:
+
+    case:concept:name   session_<id>, one case per monitoring session
+    concept:name        the activity: a screenshot's activity_name (allowlisted
+                        screenshots, as in the process map) or an activity's
+                        application_name / url
+    time:timestamp      UTC, microseconds
+    org:resource        the employee id
+
+plus event_id, session_id, employee_id and folder (screenshots) or application
+and url (activities). String columns are dictionary-encoded: the few distinct
+activity and application names are stored once instead of on every row.
+
+Rows are read like the NDJSON exports (exports.py, EXPORT_BATCH_SIZE per query)
+and written as record batches, zstd-compressed; Parquet row groups collect
+ROW_GROUP_SIZE rows. Needs the optional pyarrow package.
+"""
+
+from datetime import timezone
+from exports import EXPORT_BATCH_SIZE, export_query, iter_row_batches
+from models import Screenshot
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed for event log exports
+    pa = pq = None
+
+EVENT_LOG_FORMATS = {'parquet': 'application/vnd.apache.parquet', 'arrow': 'application/vnd.apache.arrow.file'}
+ROW_GROUP_SIZE = 100000
+
+# Per kind: the columns read and, of each row's (employee_id, id, session_id, timestamp, *rest),
+# the activity name and the extra string columns as (name, position in rest)
+EVENT_SOURCES = {
+    'screenshots': (['id', 'session_id', 'timestamp', 'activity_name', 'folder_name'],
+                    lambda rest: rest[0], [('folder', 1)]),
+    'activities': (['id', 'session_id', 'timestamp', 'application_name', 'url'],
+                   lambda rest: rest[0] or rest[1] or 'Unknown', [('application', 0), ('url', 1)]),
+}
+
+
+def pyarrow_available():
+    return pa is not None
+
+
+def event_log_schema(kind):
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        pa.field('case:concept:name', dictionary),
+        pa.field('concept:name', dictionary),
+        pa.field('time:timestamp', pa.timestamp('us', tz='UTC')),
+        pa.field('org:resource', dictionary),
+        pa.field('event_id', pa.int64()),
+        pa.field('session_id', pa.int64()),
+        pa.field('employee_id', pa.int64()),
+    ]
+    return pa.schema(fields + [pa.field(name, dictionary) for name, _ in EVENT_SOURCES[kind][2]])
+
+
+class _Dictionary:
+    """A string column's dictionary, only ever appended to so every batch extends the previous one"""
+
+    def __init__(self):
+        self.index = {}
+        self.values = []
+
+    def encode(self, values):
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            position = self.index.get(value)
+            if position is None:
+                position = self.index[value] = len(self.values)
+                self.values.append(value)
+            indices.append(position)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+
+def iter_record_batches(kind, scope, batch_size=EXPORT_BATCH_SIZE):
+    """The event log of the kind's rows in scope as record batches of at most batch_size rows"""
+    columns, activity, extras = EVENT_SOURCES[kind]
+    schema = event_log_schema(kind)
+    query = export_query(kind, scope, columns)
+    if kind == 'screenshots':
+        query = query.filter(Screenshot.activity_name.isnot(None))  # Allowlisted screenshots only
+    dictionaries = {field.name: _Dictionary() for field in schema if pa.types.is_dictionary(field.type)}
+
+    for rows in iter_row_batches(kind, query, batch_size=batch_size):
+        values = {
+            'case:concept:name': [f'session_{row[2]}' for row in rows],
+            'concept:name': [activity(row[4:]) for row in rows],
+            'org:resource': [str(row[0]) for row in rows],
+        }
+        for name, position in extras:
+            values[name] = [row[4 + position] for row in rows]
+        arrays = {name: dictionaries[name].encode(column) for name, column in values.items()}
+        arrays['time:timestamp'] = pa.array([row[3].replace(tzinfo=timezone.utc) if row[3] else None
+                                             for row in rows], pa.timestamp('us', tz='UTC'))
+        arrays['event_id'] = pa.array([row[1] for row in rows], pa.int64())
+        arrays['session_id'] = pa.array([row[2] for row in rows], pa.int64())
+        arrays['employee_id'] = pa.array([row[0] for row in rows], pa.int64())
+        yield pa.RecordBatch.from_arrays([arrays[field.name] for field in schema], schema=schema)
+
+
+def _write(sink, kind, scope, format, batch_size):
+    """Write the event log to sink, yielding the rows written after each write"""
+    schema = event_log_schema(kind)
+    if format == 'arrow':
+        # Dictionaries only grow, so later batches are written as dictionary deltas
+        options = pa.ipc.IpcWriteOptions(compression='zstd', emit_dictionary_deltas=True)
+        with pa.ipc.new_file(sink, schema, options=options) as writer:
+            for batch in iter_record_batches(kind, scope, batch_size):
+                writer.write_batch(batch)
+                yield batch.num_rows
+    else:
+        with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+            pending = []
+            for batch in iter_record_batches(kind, scope, batch_size):
+                pending.append(batch)
+                if sum(b.num_rows for b in pending) >= ROW_GROUP_SIZE:
+                    writer.write_table(pa.Table.from_batches(pending, schema))
+                    yield sum(b.num_rows for b in pending)
+                    pending = []
+            if pending:
+                writer.write_table(pa.Table.from_batches(pending, schema))
+                yield sum(b.num_rows for b in pending)
+    yield 0  # The footer is written once the writer closes
+
+
+def write_event_log(sink, kind, scope, format='parquet', batch_size=EXPORT_BATCH_SIZE):
+    """Write the event log of the kind's rows in scope to a path or file; returns the rows written"""
+    return sum(_write(sink, kind, scope, format, batch_size))
+
+
+class _ChunkSink:
+    """Write-only file that hands out what was written since the last take()"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def iter_event_log(kind, scope, format='parquet', batch_size=EXPORT_BATCH_SIZE):
+    """The event log file's bytes, produced as its batches (Parquet: row groups) are written"""
+    sink = _ChunkSink()
+    for _ in _write(pa.PythonFile(sink, mode='w'), kind, scope, format, batch_size):
+        data = sink.take()
+        if data:
+            yield data
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Bulk Export
+Writes an organization's activities or screenshot metadata as NDJSON (gzip'd
+when the output ends in .gz) for a time range and set of employees (see
+exports.py). After every batch the output is flushed and <output>.resume records
+where it stopped; --resume continues an interrupted export from there.
+
+With --format parquet or arrow (the default for .parquet / .arrow outputs) it
+writes their process-mining event log instead (see event_log.py; needs pyarrow).
+"""
+
+import argparse
+import gzip
+import json
+import os
+from app import create_app
+from event_log import EVENT_LOG_FORMATS, pyarrow_available, write_event_log
+from exports import EXPORT_KINDS, ExportScope, decode_resume_token, encode_resume_token, iter_batches
+from ingest import parse_client_timestamp
+from streaming import dumps
+
+def main():
+    parser = argparse.ArgumentParser(description="Export an organization's activities or screenshots as NDJSON or a Parquet/Arrow event log")
+    parser.add_argument('--organization', type=int, required=True, help='organization id')
+    parser.add_argument('--kind', choices=list(EXPORT_KINDS), default='activities')
+    parser.add_argument('--from', dest='start', default=None, help='only rows at or after this time (ISO 8601)')
+    parser.add_argument('--to', dest='end', default=None, help='only rows before this time')
+    parser.add_argument('--employee', type=int, nargs='+', default=None, help='only these employee ids')
+    parser.add_argument('--output', required=True, help='file to write (.ndjson, .ndjson.gz, .parquet or .arrow)')
+    parser.add_argument('--format', choices=['ndjson'] + list(EVENT_LOG_FORMATS), default=None,
+                        help='default: from the output extension, else ndjson')
+    parser.add_argument('--resume', action='store_true', help='continue the export recorded in <output>.resume')
+    parser.add_argument('--batch-size', type=int, default=None, help='rows per query (default EXPORT_BATCH_SIZE)')
+    args = parser.parse_args()
+
+    export_format = args.format or next(
+        (f for f in EVENT_LOG_FORMATS if args.output.endswith('.' + f)), 'ndjson')
+    if export_format != 'ndjson':
+        if args.resume:
+            parser.error('--resume only applies to ndjson exports')
+        if not pyarrow_available():
+            parser.error(f'{export_format} exports need pyarrow (pip install pyarrow)')
+
+    scope = ExportScope(args.organization, args.employee,
+                        parse_client_timestamp(args.start), parse_client_timestamp(args.end))
+    state_path = args.output + '.resume'
+    compress = args.output.endswith('.gz')
+    after_id, written, offset = 0, 0, None
+    if args.resume and os.path.exists(state_path):
+        with open(state_path) as f:
+            state = json.load(f)
+        after_id, written, offset = decode_resume_token(args.kind, state['cursor']), state['rows'], state['bytes']
+        print(f"Resuming after {written} row(s)")
+
+    app = create_app()
+    with app.app_context():
+        batch_size = args.batch_size or app.config['EXPORT_BATCH_SIZE']
+        if export_format != 'ndjson':
+            written = write_event_log(args.output, args.kind, scope, export_format, batch_size)
+            print(f"✓ Exported the event log of {written} {args.kind} to {args.output}")
+            return
+        with open(args.output, 'r+b' if offset is not None else 'wb') as output:
+            if offset is not None:
+                output.truncate(offset)  # Drop anything written after the last recorded batch
+                output.seek(offset)
+            for batch in iter_batches(args.kind, scope, after_id, batch_size=batch_size):
+                data = b''.join(dumps(record) + b'\n' for record in batch)
+                output.write(gzip.compress(data) if compress else data)  # One gzip member per batch
+                output.flush()
+                os.fsync(output.fileno())
+                written += len(batch)
+                with open(state_path, 'w') as f:
+                    json.dump({'cursor': encode_resume_token(args.kind, batch[-1]['id']),
+                               'rows': written, 'bytes': output.tell()}, f)
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        print(f"✓ Exported {written} {args.kind} to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Bulk Exports
+An organization's activities or screenshot metadata (with the extracted text and
+extraction fields) for any time range and set of employees, as NDJSON records:
+
+    GET /api/organizations/<id>/exports/activities?from=...&to=...&employee_id=3,7&gzip=true
+    python export_data.py --organization 1 --kind screenshots --output shots.ndjson.gz
+
+Rows are read in id order on a connection of the export's own, EXPORT_BATCH_SIZE
+per query, and each batch is its own short transaction that continues after the
+last id of the previous one, so a multi-GB export holds at most one batch in
+memory and never keeps one transaction (and its snapshot) open for hours.
+
+Resume tokens mark where an export stopped: pass one back as cursor= (from the
+last line of a page the endpoint was given a limit for, or the CLI's .resume
+file) to continue after the last row written.
+"""
+
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from models import db, Activity, Employee, MonitoringSession, Screenshot
+
+EXPORT_BATCH_SIZE = 5000
+
+EXPORT_KINDS = {
+    'activities': (Activity, ['id', 'session_id', 'timestamp', 'activity_type', 'application_name',
+                              'window_title', 'url', 'duration_seconds', 'in_allowlist']),
+    'screenshots': (Screenshot, ['id', 'session_id', 'timestamp', 'folder_name', 'activity_name', 'file_size',
+                                 'width', 'height', 'is_processed', 'extracted_text', 'extraction_data']),
+}
+
+ExportScope = namedtuple('ExportScope', ['organization_id', 'employee_ids', 'start', 'end'])
+
+
+def encode_resume_token(kind, last_id):
+    payload = json.dumps([kind, last_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode()
+
+
+def decode_resume_token(kind, token):
+    """Last exported id a resume token of this kind points after; raises ValueError if malformed"""
+    try:
+        token_kind, last_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        last_id = int(last_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+    if token_kind != kind:
+        raise ValueError(f'Cursor is not for a {kind} export')
+    return last_id
+
+
+def export_query(kind, scope, columns=None):
+    """Query of (employee_id, *columns) of the kind's rows in scope, in no particular order"""
+    model, names = EXPORT_KINDS[kind]
+    query = db.session.query(
+        MonitoringSession.employee_id, *(getattr(model, name) for name in (columns or names))
+    ).select_from(model).join(
+        MonitoringSession, MonitoringSession.id == model.session_id
+    ).join(Employee, Employee.id == MonitoringSession.employee_id).filter(
+        Employee.organization_id == scope.organization_id
+    )
+    if scope.employee_ids:
+        query = query.filter(MonitoringSession.employee_id.in_(scope.employee_ids))
+    if scope.start is not None:
+        query = query.filter(model.timestamp >= scope.start)
+    if scope.end is not None:
+        query = query.filter(model.timestamp < scope.end)
+    return query
+
+
+def _record(names, row):
+    record = {'employee_id': row[0]}
+    for name, value in zip(names, row[1:]):
+        record[name] = value.isoformat() + 'Z' if isinstance(value, datetime) else value
+    return record
+
+
+def iter_row_batches(kind, query, after_id=0, limit=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Rows of an export_query (whose first column after employee_id is the id) past
+    after_id, in id order, a list per batch
+
+    The batches are read on a dedicated connection, each in its own transaction;
+    at most limit rows in all.
+    """
+    model, _ = EXPORT_KINDS[kind]
+    remaining = limit
+    with db.engine.connect() as connection:
+        while remaining is None or remaining > 0:
+            size = batch_size if remaining is None else min(batch_size, remaining)
+            with connection.begin():
+                batch = connection.execute(
+                    query.filter(model.id > after_id).order_by(model.id).limit(size).statement
+                ).all()
+            if not batch:
+                return
+            yield batch
+            after_id = batch[-1][1]
+            if remaining is not None:
+                remaining -= len(batch)
+            if len(batch) < size:
+                return
+
+
+def iter_batches(kind, scope, after_id=0, limit=None, batch_size=EXPORT_BATCH_SIZE):
+    """Records of the kind's rows in scope past after_id, in id order, a list per batch"""
+    _, names = EXPORT_KINDS[kind]
+    for batch in iter_row_batches(kind, export_query(kind, scope), after_id, limit, batch_size):
+        yield [_record(names, row) for row in batch]
+
+
+def iter_records(kind, scope, after_id=0, limit=None, batch_size=EXPORT_BATCH_SIZE):
+    for batch in iter_batches(kind, scope, after_id, limit, batch_size):
+        yield from batch
+
+
+def iter_page(kind, scope, after_id, limit, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Records of the first limit rows past after_id, then {'next_cursor': token}:
+    the resume token of the last record sent, None if no rows follow it
+    """
+    last_id = None
+    sent = 0
+    # One row past the page tells whether another page follows
+    for batch in iter_batches(kind, scope, after_id, limit + 1, batch_size):
+        for record in batch:
+            if sent == limit:
+                yield {'next_cursor': encode_resume_token(kind, last_id)}
+                return
+            yield record
+            last_id = record['id']
+            sent += 1
+    yield {'next_cursor': None}
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Screenshot Blob Garbage Collector
+Deletes content-addressed screenshot blobs that nothing has referenced for a while
+"""
+
+import argparse
+from app import create_app
+from storage import get_storage, collect_garbage
+
+def main():
+    parser = argparse.ArgumentParser(description='Delete unreferenced screenshot blobs')
+    parser.add_argument('--grace-seconds', type=int, default=3600,
+                        help='only delete blobs unreferenced for at least this long')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        storage = get_storage()
+        total = 0
+        while True:
+            removed = collect_garbage(storage, grace_seconds=args.grace_seconds, limit=args.batch_size)
+            total += removed
+            if removed < args.batch_size:
+                break
+        print(f"✓ Removed {total} unreferenced blob(s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Ingest helpers shared by the agent-facing endpoints
+Client capture timestamps (with clock-skew correction) and idempotency keys
+"""
+
+from datetime import datetime, timezone
+from flask import request
+from models import db, IngestKey, MonitoringSession
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+MAX_IDEMPOTENCY_KEY_LENGTH = 128
+
+
+def parse_client_timestamp(value):
+    """
+    Parse a client supplied timestamp into a naive UTC datetime
+
+    Accepts ISO 8601 strings (with 'Z' or an offset; naive values are taken as UTC)
+    or Unix epoch seconds. Returns None for empty values, raises ValueError otherwise.
+    """
+    if value is None or value == '':
+        return None
+
+    if isinstance(value, (int, float)) or (isinstance(value, str) and value.replace('.', '', 1).isdigit()):
+        return datetime.fromtimestamp(float(value), tz=timezone.utc).replace(tzinfo=None)
+
+    if not isinstance(value, str):
+        raise ValueError(f"Invalid timestamp: {value!r}")
+
+    parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def resolve_event_timestamp(captured_at=None, sent_at=None, now=None):
+    """
+    Work out the server-clock time an event was captured at
+
+    The agent reports when it captured the event (captured_at) and, by its own
+    clock, when it sent the request (sent_at). The difference between our clock
+    and sent_at is the client's skew, which is applied to captured_at so buffered
+    or retried events land where they happened on the server timeline.
+    Events can never be placed in the future.
+    """
+    now = now or datetime.utcnow()
+    captured = parse_client_timestamp(captured_at)
+    if captured is None:
+        return now
+
+    sent = parse_client_timestamp(sent_at)
+    if sent is not None:
+        captured = captured + (now - sent)
+
+    return min(captured, now)
+
+
+def get_idempotency_key(payload=None):
+    """
+    Idempotency key for the current request
+
+    Taken from the Idempotency-Key header, falling back to an 'idempotency_key'
+    field in the JSON body or form. Raises ValueError if it is too long.
+    """
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key and payload is not None:
+        key = payload.get('idempotency_key')
+
+    if not key:
+        return None
+
+    key = str(key).strip()
+    if len(key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        raise ValueError(f"Idempotency key longer than {MAX_IDEMPOTENCY_KEY_LENGTH} characters")
+    return key or None
+
+
+def find_replayed_event(model, employee_id, key):
+    """The employee's stored Activity or Screenshot with this idempotency key, if any"""
+    if not key:
+        return None
+    return model.query.join(MonitoringSession, model.session_id == MonitoringSession.id).filter(
+        MonitoringSession.employee_id == employee_id,
+        model.idempotency_key == key
+    ).first()
+
+
+def idempotency_key_seen(employee_id, key):
+    """Whether the employee sent an event with this key before (see IngestKey)"""
+    return bool(key) and db.session.get(IngestKey, (employee_id, key)) is not None
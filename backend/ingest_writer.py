@@ -0,0 +1,275 @@
+"""
+Batched Ingest Writer
+With INGEST_MODE=async the agent endpoints validate the request, stage any file
+and enqueue the metadata row, then answer 202. A background thread per worker
+process drains the queue and writes rows in one transaction per batch (a
+multi-row INSERT, skipping events whose idempotency key is already in
+ingest_keys via INSERT ... ON CONFLICT DO NOTHING RETURNING), flushing every
+INGEST_FLUSH_INTERVAL_MS or as soon as INGEST_BATCH_SIZE rows are waiting.
+
+Durability: a 202 means the event is held in this process's memory, not yet on
+disk in the database. Rows are written within one flush interval; a graceful
+shutdown drains the queue first (atexit), but a crash loses whatever is still
+queued. Agents send idempotency keys, so resending an event is always safe, and
+the sync mode (201 after commit) remains the default.
+"""
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import insert as generic_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, MonitoringSession, Screenshot, IngestKey
+from session_cache import get_active_session_id, invalidate_active_session
+from storage import get_storage, parse_ref, acquire_blob
+
+logger = logging.getLogger(__name__)
+
+UPSERT_INSERTS = {'postgresql': postgresql_insert, 'sqlite': sqlite_insert}
+MAX_ATTEMPTS = 3
+
+
+class IngestQueueFull(Exception):
+    """The writer is behind; the client should retry later"""
+
+
+class BatchWriter:
+    """Queue of pending rows and the thread that writes them in batches"""
+
+    def __init__(self, app, batch_size=500, flush_interval=0.02, max_queue=10000):
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    # ----- Producer side -----
+
+    def enqueue(self, model, row, temp_path=None, employee_id=None):
+        """
+        Queue a row for insertion; temp_path is a staged screenshot file and
+        employee_id the sender, whose idempotency keys the row's key is checked against
+
+        The file is published only after its row is committed, as in sync mode.
+        Raises IngestQueueFull if the queue stays full for a moment.
+        """
+        self.start()
+        try:
+            self._queue.put((model, row, temp_path, employee_id), timeout=1)
+        except queue.Full:
+            raise IngestQueueFull("Ingest queue is full")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+            self._thread.start()
+            atexit.register(self.stop)
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        self._queue.join()
+
+    def stop(self):
+        """Drain the queue and stop the writer thread"""
+        self._stopping.set()
+        if self._thread:
+            self._thread.join()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    # ----- Writer thread -----
+
+    def _run(self):
+        with self.app.app_context():
+            while not (self._stopping.is_set() and self._queue.empty()):
+                batch = self._take_batch()
+                if not batch:
+                    continue
+                try:
+                    self._write_with_retry(batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+
+    def _take_batch(self):
+        """Wait for a first row, then collect more until the interval or batch size is hit"""
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_with_retry(self, batch):
+        """Commit a batch (retrying the transaction only), then publish its staged files"""
+        by_model, temp_paths = self._group(batch)
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                if attempt > 1:
+                    self._repoint_deleted_sessions(by_model)
+                inserted_refs = self._commit(by_model)
+                break
+            except Exception:
+                db.session.rollback()
+                if attempt == MAX_ATTEMPTS:
+                    logger.exception("Dropping ingest batch of %d row(s) after %d attempts", len(batch), attempt)
+                    storage = get_storage()
+                    for paths in temp_paths.values():
+                        for path in paths:
+                            storage.discard(path)
+                    return
+                logger.warning("Ingest batch failed (attempt %d), retrying", attempt, exc_info=True)
+                time.sleep(0.1 * attempt)
+        self._publish(temp_paths, {parse_ref(ref) for ref in inserted_refs})
+
+    def _group(self, batch):
+        """
+        (employee_id, row) pairs per model (the same event queued twice before a
+        flush only once) and staged files per digest
+        """
+        by_model = {}
+        temp_paths = {}
+        for model, row, temp_path, employee_id in batch:
+            key = row.get('idempotency_key')
+            rows = by_model.setdefault(model, {})
+            if key and (employee_id, key) in rows:
+                if temp_path:
+                    get_storage().discard(temp_path)
+                continue
+            rows[(employee_id, key) if key else object()] = (employee_id, row)
+            if temp_path:
+                temp_paths.setdefault(parse_ref(row['file_path']), []).append(temp_path)
+        return {model: list(rows.values()) for model, rows in by_model.items()}, temp_paths
+
+    def _repoint_deleted_sessions(self, by_model):
+        """
+        Move rows queued for a session that was deleted meanwhile (a stale cached
+        id) to the sender's active session, dropping them if there is none
+        (their staged files are discarded with the other rows not inserted)
+        """
+        session_ids = {row['session_id'] for rows in by_model.values() for _, row in rows}
+        existing = {session_id for (session_id,) in db.session.query(MonitoringSession.id).filter(
+            MonitoringSession.id.in_(session_ids))}
+        for model, rows in by_model.items():
+            kept = []
+            for employee_id, row in rows:
+                if row['session_id'] not in existing:
+                    invalidate_active_session(employee_id)
+                    row['session_id'] = get_active_session_id(employee_id)
+                    if row['session_id'] is None:
+                        logger.warning("Dropping %s for employee %s: its session was deleted",
+                                       model.__name__, employee_id)
+                        continue
+                kept.append((employee_id, row))
+            by_model[model] = kept
+
+    def _commit(self, by_model):
+        """Insert the rows in one transaction; returns the file_path of every screenshot inserted"""
+        inserted_refs = []
+        for model, rows in by_model.items():
+            inserted_refs += insert_ignoring_replays(model, rows)
+
+        # Screenshot rows hold blob references; count only the rows actually inserted
+        sizes = {parse_ref(row['file_path']): row['file_size']
+                 for rows in by_model.values() for _, row in rows if 'file_path' in row}
+        for digest, count in Counter(parse_ref(ref) for ref in inserted_refs).items():
+            acquire_blob(digest, sizes[digest], count)
+        db.session.commit()
+        return inserted_refs
+
+    def _publish(self, temp_paths, inserted_digests):
+        """
+        Publish one staged file per committed digest and discard the rest
+
+        The rows are already committed, so a failed publish is never answered by
+        inserting again: it is retried, then logged with the staged file kept.
+        """
+        storage = get_storage()
+        for digest, paths in temp_paths.items():
+            first, rest = paths[0], paths[1:]
+            if digest in inserted_digests:
+                for attempt in range(1, MAX_ATTEMPTS + 1):
+                    try:
+                        storage.publish(first, digest)
+                        break
+                    except Exception:
+                        if attempt == MAX_ATTEMPTS:
+                            logger.exception("Screenshot blob %s is committed but could not be stored; "
+                                             "staged file kept at %s", digest, first)
+                        else:
+                            time.sleep(0.1 * attempt)
+            else:
+                rest.append(first)
+            for path in rest:
+                storage.discard(path)
+
+
+def insert_ignoring_replays(model, rows):
+    """
+    Multi-row INSERT of a batch of (employee_id, row) pairs, skipping events whose
+    idempotency key the employee sent before
+
+    The (employee_id, key) pairs are claimed first with INSERT ... ON CONFLICT DO
+    NOTHING RETURNING, and only rows whose pair came back (or that have no key)
+    are inserted. Runs in the current session transaction. Returns the file_path
+    of every inserted row for Screenshot (empty for other models).
+    """
+    kind = 'screenshot' if model is Screenshot else 'activity'
+    keys = [(employee_id, row['idempotency_key']) for employee_id, row in rows if row.get('idempotency_key')]
+    if keys:
+        now = datetime.utcnow()
+        dialect = db.session.get_bind().dialect.name
+        make_insert = UPSERT_INSERTS.get(dialect)
+        stmt = make_insert(IngestKey.__table__).on_conflict_do_nothing() if make_insert \
+            else generic_insert(IngestKey.__table__)
+        claimed = set(db.session.execute(
+            stmt.returning(IngestKey.__table__.c.employee_id, IngestKey.__table__.c.key),
+            [{'employee_id': employee_id, 'key': key, 'kind': kind, 'created_at': now} for employee_id, key in keys]
+        ).tuples())
+        rows = [(employee_id, row) for employee_id, row in rows
+                if not row.get('idempotency_key') or (employee_id, row['idempotency_key']) in claimed]
+
+    rows = [row for _, row in rows]
+    if not rows:
+        return []
+    db.session.execute(generic_insert(model.__table__), rows)
+    return [row['file_path'] for row in rows] if model is Screenshot else []
+
+
+def async_ingest_enabled():
+    return current_app.config.get('INGEST_MODE', 'sync') == 'async'
+
+
+def get_ingest_writer():
+    """Batch writer for the current app (created once per worker process)"""
+    writer = current_app.extensions.get('ingest_writer')
+    if writer is None:
+        writer = BatchWriter(
+            current_app._get_current_object(),
+            batch_size=current_app.config.get('INGEST_BATCH_SIZE', 500),
+            flush_interval=current_app.config.get('INGEST_FLUSH_INTERVAL_MS', 20) / 1000,
+            max_queue=current_app.config.get('INGEST_QUEUE_MAX', 10000)
+        )
+        current_app.extensions['ingest_writer'] = writer
+    return writer
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Agent Fleet Load Simulator
+Simulates N monitoring agents hitting the backend concurrently and reports
+per-endpoint latency percentiles, error rates and throughput.
+
+Each simulated agent registers (if needed), logs in, starts a session and then,
+at agent-like cadences, posts activities, uploads synthetic screenshots, polls
+the current session and refreshes the allowlist. Sessions are stopped on exit.
+
+Examples:
+    # Run the Flask app in-process against a local SQLite file
+    python load_test_agents.py --in-process --agents 20 --duration 60
+
+    # Hit an already running backend (local Postgres behind it)
+    python load_test_agents.py --api-url http://localhost:3535/api --agents 50
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from io import BytesIO
+
+import requests
+
+DEFAULT_PASSWORD = 'LoadTest123!'
+
+
+class LatencyRecorder:
+    """Thread-safe per-endpoint latency and error bookkeeping"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.status_codes = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint, elapsed, status_code, ok):
+        with self._lock:
+            self.latencies[endpoint].append(elapsed)
+            self.status_codes[endpoint][status_code] += 1
+            if not ok:
+                self.errors[endpoint] += 1
+
+    @staticmethod
+    def percentile(sorted_values, pct):
+        """Nearest-rank percentile of an already sorted list"""
+        if not sorted_values:
+            return 0.0
+        rank = max(0, min(len(sorted_values) - 1, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+        return sorted_values[rank]
+
+    def report(self, wall_seconds):
+        """Build a per-endpoint summary"""
+        rows = []
+        with self._lock:
+            for endpoint in sorted(self.latencies):
+                values = sorted(self.latencies[endpoint])
+                count = len(values)
+                rows.append({
+                    'endpoint': endpoint,
+                    'count': count,
+                    'errors': self.errors[endpoint],
+                    'error_rate': self.errors[endpoint] / count if count else 0.0,
+                    'rps': count / wall_seconds if wall_seconds else 0.0,
+                    'p50_ms': self.percentile(values, 50) * 1000,
+                    'p90_ms': self.percentile(values, 90) * 1000,
+                    'p95_ms': self.percentile(values, 95) * 1000,
+                    'p99_ms': self.percentile(values, 99) * 1000,
+                    'max_ms': values[-1] * 1000 if values else 0.0,
+                    'status_codes': dict(self.status_codes[endpoint])
+                })
+        return rows
+
+
+def make_synthetic_screenshot(width, height, image_format, seed=None):
+    """Render a synthetic 'desktop' image so compression behaves like real captures"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    img = Image.new('RGB', (width, height), (rng.randint(200, 255),) * 3)
+    draw = ImageDraw.Draw(img)
+
+    # Window chrome and content blocks
+    for _ in range(rng.randint(8, 20)):
+        x0 = rng.randint(0, width - 1)
+        y0 = rng.randint(0, height - 1)
+        x1 = min(width - 1, x0 + rng.randint(40, max(41, width // 2)))
+        y1 = min(height - 1, y0 + rng.randint(20, max(21, height // 3)))
+        draw.rectangle([x0, y0, x1, y1], fill=tuple(rng.randint(0, 255) for _ in range(3)))
+
+    # Text-like noise lines
+    for _ in range(rng.randint(30, 80)):
+        x = rng.randint(0, width - 1)
+        y = rng.randint(0, height - 1)
+        draw.line([x, y, min(width - 1, x + rng.randint(20, 300)), y], fill=(20, 20, 20), width=2)
+
+    buf = BytesIO()
+    pil_format = 'JPEG' if image_format == 'jpeg' else 'PNG'
+    img.save(buf, format=pil_format)
+    return buf.getvalue()
+
+
+class SimulatedAgent(threading.Thread):
+    """One fake monitoring agent with its own HTTP session and cadences"""
+
+    APPLICATIONS = ['Google Chrome', 'Visual Studio Code', 'Slack', 'Microsoft Excel', 'Terminal', 'Outlook']
+    URLS = ['https://github.com/org/repo', 'https://mail.google.com', 'https://docs.example.com/page']
+
+    def __init__(self, index, args, recorder, stop_event):
+        super().__init__(name=f'agent-{index}', daemon=True)
+        self.index = index
+        self.args = args
+        self.recorder = recorder
+        self.stop_event = stop_event
+        self.http = requests.Session()
+        self.email = f"{args.email_prefix}{index}@loadtest.local"
+        self.rng = random.Random(args.seed + index if args.seed is not None else None)
+        self.screenshot_bytes = None
+        self.allowlist = []
+
+    # ----- HTTP helpers -----
+
+    def call(self, method, path, label=None, expected=(200, 201, 202), **kwargs):
+        """Perform a request and record its latency under a stable endpoint label"""
+        label = label or f"{method} {path}"
+        start = time.perf_counter()
+        try:
+            response = self.http.request(method, f"{self.args.api_url}{path}", timeout=self.args.timeout, **kwargs)
+        except requests.RequestException:
+            self.recorder.record(label, time.perf_counter() - start, 'exception', False)
+            return None
+        self.recorder.record(label, time.perf_counter() - start, response.status_code,
+                             response.status_code in expected)
+        return response
+
+    # ----- Agent lifecycle -----
+
+    def setup(self):
+        """Register, log in and start a fresh monitoring session"""
+        self.call('POST', '/auth/register', expected=(201, 400), json={
+            'email': self.email,
+            'password': DEFAULT_PASSWORD,
+            'name': f'Load Agent {self.index}',
+            'organization_name': self.args.organization
+        })
+
+        response = self.call('POST', '/auth/login', json={'email': self.email, 'password': DEFAULT_PASSWORD})
+        if response is None or response.status_code != 200:
+            return False
+        self.http.headers['Authorization'] = f"Bearer {response.json()['access_token']}"
+
+        # A previous run may have left a session open
+        self.call('POST', '/monitoring/sessions/stop', expected=(200, 404), json={})
+        response = self.call('POST', '/monitoring/sessions/start', json={})
+        if response is None or response.status_code != 201:
+            return False
+
+        self.refresh_allowlist()
+        self.screenshot_bytes = make_synthetic_screenshot(
+            self.args.screenshot_width, self.args.screenshot_height,
+            self.args.screenshot_format, seed=self.rng.random()
+        )
+        return True
+
+    def refresh_allowlist(self):
+        response = self.call('GET', '/monitoring-config/active')
+        if response is not None and response.status_code == 200:
+            self.allowlist = response.json()
+
+    def post_activity(self):
+        if self.rng.random() < 0.3:
+            payload = {'activity_type': 'website', 'url': self.rng.choice(self.URLS),
+                       'application_name': 'Google Chrome'}
+        else:
+            app = self.rng.choice(self.APPLICATIONS)
+            payload = {'activity_type': 'application', 'application_name': app,
+                       'window_title': f'{app} - document {self.rng.randint(1, 50)}'}
+        payload['duration_seconds'] = int(self.args.activity_interval)
+        payload['in_allowlist'] = True
+        payload['idempotency_key'] = str(uuid.uuid4())
+        self.call('POST', '/monitoring/activities', json=payload)
+
+    def upload_screenshot(self):
+        folder = self.allowlist[0]['folder_name'] if self.allowlist else self.args.folder_name
+        extension = 'jpg' if self.args.screenshot_format == 'jpeg' else 'png'
+        files = {'file': (f'screenshot.{extension}', BytesIO(self.screenshot_bytes), f'image/{self.args.screenshot_format}')}
+        self.call('POST', '/screenshots/upload', files=files,
+                  data={'folder_name': folder, 'activity_name': folder,
+                        'idempotency_key': str(uuid.uuid4())})
+
+    def poll_status(self):
+        self.call('GET', '/monitoring/sessions/current', params={'view': 'summary'})
+
+    def run(self):
+        if not self.setup():
+            return
+
+        # Stagger agents so they don't fire in lockstep
+        now = time.monotonic()
+        cadences = [
+            (self.args.activity_interval, self.post_activity),
+            (self.args.screenshot_interval, self.upload_screenshot),
+            (self.args.status_interval, self.poll_status),
+            (self.args.allowlist_interval, self.refresh_allowlist),
+        ]
+        next_due = [now + self.rng.uniform(0, interval) for interval, _ in cadences]
+
+        while not self.stop_event.is_set():
+            index = min(range(len(next_due)), key=next_due.__getitem__)
+            wait = next_due[index] - time.monotonic()
+            if wait > 0 and self.stop_event.wait(wait):
+                break
+            interval, action = cadences[index]
+            action()
+            # +/-10% jitter around the configured cadence
+            next_due[index] = time.monotonic() + interval * self.rng.uniform(0.9, 1.1)
+
+        self.call('POST', '/monitoring/sessions/stop', expected=(200, 404), json={})
+
+
+def start_in_process_server(port):
+    """Serve the Flask app from this process (SQLite and a scratch screenshot folder by default)"""
+    os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.abspath('loadtest.db')}")
+    os.environ.setdefault('SCREENSHOT_FOLDER', os.path.abspath('loadtest_screenshots'))
+    os.environ.setdefault('OCR_ENABLED', 'false')
+
+    import logging
+    from werkzeug.serving import make_server
+    from app import app
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_port}/api"
+
+
+def print_report(rows, wall_seconds, agents):
+    print("\n" + "=" * 118)
+    print(f"LOAD TEST RESULTS  ({agents} agents, {wall_seconds:.1f}s)")
+    print("=" * 118)
+    header = f"{'endpoint':<38}{'count':>8}{'err%':>8}{'rps':>9}{'p50ms':>9}{'p90ms':>9}{'p95ms':>9}{'p99ms':>9}{'maxms':>10}"
+    print(header)
+    print("-" * 118)
+    total = errors = 0
+    for row in rows:
+        total += row['count']
+        errors += row['errors']
+        print(f"{row['endpoint']:<38}{row['count']:>8}{row['error_rate'] * 100:>7.1f}%{row['rps']:>9.1f}"
+              f"{row['p50_ms']:>9.1f}{row['p90_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{row['max_ms']:>10.1f}")
+        non_ok = {code: n for code, n in row['status_codes'].items() if code not in (200, 201, 202)}
+        if non_ok:
+            print(f"{'':<38}status codes: {non_ok}")
+    print("-" * 118)
+    print(f"{'TOTAL':<38}{total:>8}{(errors / total * 100 if total else 0):>7.1f}%{total / wall_seconds if wall_seconds else 0:>9.1f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate a fleet of monitoring agents against the backend')
+    parser.add_argument('--agents', type=int, default=10, help='number of simulated agents')
+    parser.add_argument('--duration', type=float, default=60, help='test duration in seconds')
+    parser.add_argument('--api-url', default=os.getenv('API_URL'), help='backend API base URL, e.g. http://localhost:3535/api')
+    parser.add_argument('--in-process', action='store_true', help='serve the Flask app from this process (uses DATABASE_URL, defaults to SQLite)')
+    parser.add_argument('--port', type=int, default=0, help='port for --in-process (0 = ephemeral)')
+    parser.add_argument('--organization', default='Load Test Organization')
+    parser.add_argument('--email-prefix', default='agent')
+    parser.add_argument('--folder-name', default='LoadTest', help='folder used when the org has no allowlist')
+    parser.add_argument('--activity-interval', type=float, default=5, help='seconds between activity posts')
+    parser.add_argument('--screenshot-interval', type=float, default=10, help='seconds between screenshot uploads')
+    parser.add_argument('--status-interval', type=float, default=30, help='seconds between session status polls')
+    parser.add_argument('--allowlist-interval', type=float, default=60, help='seconds between allowlist refreshes')
+    parser.add_argument('--screenshot-width', type=int, default=1920)
+    parser.add_argument('--screenshot-height', type=int, default=1080)
+    parser.add_argument('--screenshot-format', choices=['png', 'jpeg'], default='png')
+    parser.add_argument('--ramp-up', type=float, default=5, help='seconds over which agents are started')
+    parser.add_argument('--timeout', type=float, default=30, help='per-request timeout in seconds')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for reproducible runs')
+    args = parser.parse_args(argv)
+
+    if not args.in_process and not args.api_url:
+        parser.error('either --api-url (or API_URL) or --in-process is required')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    server = None
+    if args.in_process:
+        server, args.api_url = start_in_process_server(args.port)
+        print(f"In-process backend listening at {args.api_url}")
+    args.api_url = args.api_url.rstrip('/')
+
+    recorder = LatencyRecorder()
+    stop_event = threading.Event()
+    agents = [SimulatedAgent(i, args, recorder, stop_event) for i in range(args.agents)]
+
+    print(f"Starting {args.agents} agents for {args.duration:.0f}s against {args.api_url} ...")
+    started = time.monotonic()
+    delay = args.ramp_up / args.agents if args.agents else 0
+    for agent in agents:
+        agent.start()
+        time.sleep(delay)
+
+    try:
+        remaining = args.duration - (time.monotonic() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+    except KeyboardInterrupt:
+        print("\nInterrupted, stopping agents...")
+
+    stop_event.set()
+    for agent in agents:
+        agent.join(timeout=args.timeout)
+    wall_seconds = time.monotonic() - started
+
+    if server is not None:
+        server.shutdown()
+
+    rows = recorder.report(wall_seconds)
+    print_report(rows, wall_seconds, args.agents)
+    return 1 if any(row['errors'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Partition Maintenance
+Run daily (cron / systemd timer). Creates the monthly activities/screenshots
+partitions ahead of time, drops months past PARTITION_RETENTION_MONTHS (releasing
+their screenshot blobs for gc_screenshot_blobs.py) and purges old idempotency keys.
+
+Per-organization retention (apply_retention.py) is the normal way to expire data;
+partition drops are a global backstop and are skipped while any organization's
+policy keeps activities longer than PARTITION_RETENTION_MONTHS.
+"""
+
+import argparse
+import os
+from datetime import date, datetime, timedelta
+from sqlalchemy import tuple_
+from app import create_app
+from models import db, IngestKey
+from partitions import (PARTITIONED_TABLES, add_months, month_start, is_partitioned, ensure_partitions,
+                        expired_partitions, drop_partition)
+from retention import longest_activity_retention_days
+
+def purge_ingest_keys(days, batch_size):
+    """Delete idempotency keys older than the retry window, in batches"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    while True:
+        keys = [tuple(row) for row in db.session.query(IngestKey.employee_id, IngestKey.key).filter(
+            IngestKey.created_at < cutoff
+        ).limit(batch_size).all()]
+        if not keys:
+            break
+        IngestKey.query.filter(tuple_(IngestKey.employee_id, IngestKey.key).in_(keys)).delete(
+            synchronize_session=False)
+        db.session.commit()
+        total += len(keys)
+    return total
+
+def partition_drops_allowed(retention_months, today=None):
+    """False if dropping months past retention_months would cut into an organization's retention policy"""
+    today = today or date.today()
+    youngest_dropped_days = (today - add_months(month_start(today), -retention_months)).days
+    longest = longest_activity_retention_days()
+    return longest is not None and youngest_dropped_days >= longest
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain monthly partitions of activities and screenshots')
+    parser.add_argument('--months-ahead', type=int, default=None,
+                        help='partitions to keep created ahead (default: PARTITION_MONTHS_AHEAD)')
+    parser.add_argument('--retention-months', type=int, default=None,
+                        help='drop partitions older than this many months, 0 keeps everything '
+                             '(default: PARTITION_RETENTION_MONTHS)')
+    parser.add_argument('--key-retention-days', type=int, default=None,
+                        help='purge idempotency keys older than this (default: INGEST_KEY_RETENTION_DAYS)')
+    parser.add_argument('--batch-size', type=int, default=10000)
+    parser.add_argument('--dry-run', action='store_true', help='report what would be dropped')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        months_ahead = args.months_ahead if args.months_ahead is not None else app.config['PARTITION_MONTHS_AHEAD']
+        retention = args.retention_months if args.retention_months is not None \
+            else app.config['PARTITION_RETENTION_MONTHS']
+        key_days = args.key_retention_days if args.key_retention_days is not None \
+            else app.config['INGEST_KEY_RETENTION_DAYS']
+        if retention and not partition_drops_allowed(retention):
+            print(f"✗ Retention policies keep activities longer than {retention} month(s); "
+                  f"not dropping partitions (see apply_retention.py)")
+            retention = 0
+
+        for table in PARTITIONED_TABLES:
+            with db.engine.begin() as conn:
+                if not is_partitioned(conn, table):
+                    print(f"- {table} is not partitioned (run `alembic upgrade head` on PostgreSQL)")
+                    continue
+                created = ensure_partitions(conn, table, months_ahead)
+            print(f"✓ {table}: created {len(created)} partition(s) {', '.join(created)}")
+
+            if not retention:
+                continue
+            with db.engine.connect() as conn:
+                expired = expired_partitions(conn, table, retention)
+            for name in expired:
+                if args.dry_run:
+                    print(f"  would drop {name}")
+                    continue
+                # One transaction per partition keeps locks short
+                with db.engine.begin() as conn:
+                    legacy_paths = drop_partition(conn, table, name)
+                for path in legacy_paths:
+                    if os.path.exists(path):
+                        os.unlink(path)
+                print(f"✓ Dropped {name}")
+
+        if not args.dry_run:
+            purged = purge_ingest_keys(key_days, args.batch_size)
+            print(f"✓ Purged {purged} idempotency key(s) older than {key_days} day(s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Screenshot Storage Migration
+Rehomes legacy flat screenshot files (screenshots/<folder_name>/screenshot_*.png) into
+the configured storage backend as content-addressed blobs, in batches.
+
+  python migrate_screenshot_storage.py                     # legacy files -> SCREENSHOT_STORAGE
+  python migrate_screenshot_storage.py --dry-run           # report only
+  python migrate_screenshot_storage.py --copy-local-blobs  # local blobs -> SCREENSHOT_STORAGE (e.g. s3)
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app
+from models import db, Screenshot, ScreenshotBlob
+from storage import get_storage, make_ref, acquire_blob
+from storage.blobs import BLOB_REF_PREFIX
+from storage.local import LocalStorage
+
+
+def stage_file(storage, path):
+    """Hash a legacy file into a temp file; returns (path, temp_path, digest, size) or None if missing"""
+    if not os.path.exists(path):
+        return path, None, None, None
+    with open(path, 'rb') as f:
+        temp_path, digest, size = storage.write_temp(f)
+    return path, temp_path, digest, size
+
+
+def rehome_legacy_files(storage, batch_size, workers, keep_originals, dry_run):
+    """Move every screenshot that still has a plain file path into blob storage"""
+    last_id = 0
+    moved = missing = 0
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = Screenshot.query.filter(
+                Screenshot.id > last_id,
+                ~Screenshot.file_path.like(f'{BLOB_REF_PREFIX}%')
+            ).order_by(Screenshot.id).limit(batch_size).all()
+            if not batch:
+                break
+            last_id = batch[-1].id
+
+            if dry_run:
+                missing += sum(1 for s in batch if not os.path.exists(s.file_path))
+                moved += len(batch)
+                continue
+
+            # File I/O in parallel, database work on this thread
+            staged = dict(zip([s.id for s in batch], pool.map(lambda s: stage_file(storage, s.file_path), batch)))
+            published = []
+            try:
+                for screenshot in batch:
+                    path, temp_path, digest, size = staged[screenshot.id]
+                    if temp_path is None:
+                        missing += 1
+                        continue
+                    acquire_blob(digest, size)
+                    screenshot.file_path = make_ref(digest)
+                    screenshot.file_size = size
+                    published.append((path, temp_path, digest))
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                for _, temp_path, _, _ in staged.values():
+                    storage.discard(temp_path)
+                raise
+
+            for path, temp_path, digest in published:
+                storage.publish(temp_path, digest)
+                if not keep_originals:
+                    os.unlink(path)
+            moved += len(published)
+            print(f"  ... {moved} rehomed, {missing} missing ({moved / max(time.time() - started, 1e-6):.0f}/s)")
+
+    return moved, missing
+
+
+def copy_local_blobs(storage, local, batch_size, workers, dry_run):
+    """Copy blobs from the local sharded layout into another backend (e.g. S3)"""
+    copied = skipped = 0
+    last_digest = ''
+
+    def copy_one(digest):
+        if storage.exists(digest):
+            return False
+        with local.open(digest) as f:
+            temp_path, _, _ = storage.write_temp(f)
+        storage.publish(temp_path, digest)
+        return True
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            digests = [row.digest for row in db.session.query(ScreenshotBlob.digest).filter(
+                ScreenshotBlob.digest > last_digest,
+                ScreenshotBlob.ref_count > 0
+            ).order_by(ScreenshotBlob.digest).limit(batch_size).all()]
+            if not digests:
+                break
+            last_digest = digests[-1]
+            db.session.rollback()  # don't hold a transaction open during the copy
+
+            digests = [d for d in digests if local.exists(d)]
+            if dry_run:
+                copied += len(digests)
+                continue
+            for did_copy in pool.map(copy_one, digests):
+                copied += did_copy
+                skipped += not did_copy
+            print(f"  ... {copied} copied, {skipped} already present")
+
+    return copied, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rehome screenshot files into the configured storage backend')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, default=8, help='parallel file copy workers')
+    parser.add_argument('--keep-originals', action='store_true', help='leave legacy files in place after rehoming')
+    parser.add_argument('--copy-local-blobs', action='store_true',
+                        help='copy blobs from the local layout into the configured backend instead')
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        storage = get_storage()
+        print("=" * 70)
+        print(f"SCREENSHOT STORAGE MIGRATION -> {storage.name}{' (dry run)' if args.dry_run else ''}")
+        print("=" * 70)
+
+        if args.copy_local_blobs:
+            local = LocalStorage(os.path.join(app.config['SCREENSHOT_FOLDER'], 'blobs'))
+            if isinstance(storage, LocalStorage) and storage.root == local.root:
+                print("Configured backend is the local blob store; nothing to copy")
+                return
+            copied, skipped = copy_local_blobs(storage, local, args.batch_size, args.workers, args.dry_run)
+            print(f"\n✓ Copied {copied} blob(s), {skipped} already present")
+        else:
+            moved, missing = rehome_legacy_files(storage, args.batch_size, args.workers,
+                                                 args.keep_originals, args.dry_run)
+            print(f"\n✓ Rehomed {moved} screenshot(s); {missing} file(s) missing on disk")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Add a partial unique index on monitoring_sessions (employee_id) WHERE is_active
+
+Closes duplicate active sessions first (keeping each employee's newest), since
+the index enforces at most one active session per employee.
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from models import db
+from sqlalchemy import text
+from flask import Flask
+
+INDEX_NAME = 'uq_monitoring_sessions_active_employee'
+
+def upgrade():
+    """Close duplicate active sessions and create the partial unique index"""
+    # Create minimal Flask app for database context
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'postgresql://localhost/employee_monitoring')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        try:
+            result = db.session.execute(text("""
+                UPDATE monitoring_sessions
+                SET is_active = false, end_time = COALESCE(end_time, CURRENT_TIMESTAMP)
+                WHERE is_active AND id NOT IN (
+                    SELECT MAX(id) FROM monitoring_sessions WHERE is_active GROUP BY employee_id
+                )
+            """))
+            print(f"✅ Closed {result.rowcount} duplicate active session(s)")
+
+            db.session.execute(text(f"""
+                CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME}
+                ON monitoring_sessions (employee_id)
+                WHERE is_active
+            """))
+            print(f"✅ Partial unique index {INDEX_NAME} in place")
+
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error adding active session index: {e}")
+            raise
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    print("Running migration: Add partial unique index for active monitoring sessions")
+    upgrade()
+    print("Migration completed!")
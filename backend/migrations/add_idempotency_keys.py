@@ -0,0 +1,63 @@
+"""
+Add idempotency_key columns (with unique indexes) to activities and screenshots
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from models import db
+from sqlalchemy import text
+from flask import Flask
+
+TABLES = ['activities', 'screenshots']
+
+def upgrade():
+    """Add idempotency_key column and unique index to the ingest tables"""
+    # Create minimal Flask app for database context
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'postgresql://localhost/employee_monitoring')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        try:
+            for table in TABLES:
+                result = db.session.execute(text("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name=:table AND column_name='idempotency_key'
+                """), {'table': table})
+
+                if result.fetchone():
+                    print(f"✅ Column 'idempotency_key' already exists in {table} table")
+                else:
+                    db.session.execute(text(f"""
+                        ALTER TABLE {table}
+                        ADD COLUMN idempotency_key VARCHAR(128)
+                    """))
+                    print(f"✅ Added 'idempotency_key' column to {table} table")
+
+                # Keys come from the agents, so they are unique per session, not globally.
+                # NULLs don't collide, so events without a key are unaffected
+                db.session.execute(text(f"""
+                    CREATE UNIQUE INDEX IF NOT EXISTS ix_{table}_idempotency_key
+                    ON {table} (session_id, idempotency_key)
+                """))
+                print(f"✅ Unique index ix_{table}_idempotency_key in place")
+
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error adding idempotency keys: {e}")
+            raise
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    print("Running migration: Add idempotency keys to activities and screenshots")
+    upgrade()
+    print("Migration completed!")
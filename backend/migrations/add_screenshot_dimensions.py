@@ -0,0 +1,55 @@
+"""
+Add width/height columns to screenshots
+"""
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)) + '/..')
+
+from models import db
+from sqlalchemy import text
+from flask import Flask
+
+COLUMNS = ['width', 'height']
+
+def upgrade():
+    """Add pixel dimension columns to the screenshots table"""
+    # Create minimal Flask app for database context
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'postgresql://localhost/employee_monitoring')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        try:
+            for column in COLUMNS:
+                result = db.session.execute(text("""
+                    SELECT column_name
+                    FROM information_schema.columns
+                    WHERE table_name='screenshots' AND column_name=:column
+                """), {'column': column})
+
+                if result.fetchone():
+                    print(f"✅ Column '{column}' already exists in screenshots table")
+                else:
+                    db.session.execute(text(f"""
+                        ALTER TABLE screenshots
+                        ADD COLUMN {column} INTEGER
+                    """))
+                    print(f"✅ Added '{column}' column to screenshots table")
+
+            db.session.commit()
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"❌ Error adding screenshot dimensions: {e}")
+            raise
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    print("Running migration: Add width/height to screenshots")
+    upgrade()
+    print("Migration completed!")
@@ -1,5 +1,6 @@
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, select
 import bcrypt
 from cryptography.fernet import Fernet
 import base64
@@ -52,13 +53,16 @@ class Organization(db.Model):
             'name': self.name,
             'screenshot_interval': self.screenshot_interval,
             'created_at': self.created_at.isoformat(),
-            'employee_count': len(self.employees)
+            'employee_count': self.employee_count
         }
 
 
 class Employee(db.Model):
     """Employee model"""
     __tablename__ = 'employees'
+    __table_args__ = (
+        db.Index('ix_employees_organization_id_manager_id', 'organization_id', 'manager_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(200), unique=True, nullable=False)
@@ -66,14 +70,17 @@ class Employee(db.Model):
     password_hash = db.Column(db.String(255), nullable=False)
     role = db.Column(db.String(50), default='employee')  # 'super_admin', 'admin' (manager), or 'employee'
     organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
-    manager_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=True)  # Manager assignment
+    manager_id = db.Column(db.Integer, db.ForeignKey('employees.id', ondelete='SET NULL'), nullable=True)  # Manager assignment
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     # Encrypted agent credentials (stored when employee provides them via dashboard)
     agent_credentials_encrypted = db.Column(db.Text, nullable=True)
     
     # Relationships
-    sessions = db.relationship('MonitoringSession', backref='employee', lazy=True, cascade='all, delete-orphan')
+    # Child rows are removed by ON DELETE CASCADE in the database, not loaded one by one
+    # (deletion.py also releases their screenshot files)
+    sessions = db.relationship('MonitoringSession', backref='employee', lazy=True, cascade='all, delete-orphan',
+                               passive_deletes=True)
     managed_employees = db.relationship('Employee', backref=db.backref('manager', remote_side=[id]), lazy=True)
     
     def set_password(self, password):
@@ -100,19 +107,39 @@ class Employee(db.Model):
         return data
 
 
+# Counted in SQL rather than by loading the employees relationship. Deferred: reading it
+# on one organization runs a COUNT, and list queries undefer it into the same SELECT.
+Organization.employee_count = db.column_property(
+    select(func.count(Employee.id)).where(Employee.organization_id == Organization.id)
+    .correlate_except(Employee).scalar_subquery(),
+    deferred=True
+)
+
+
 class MonitoringSession(db.Model):
     """Monitoring session model - tracks a period of monitoring"""
     __tablename__ = 'monitoring_sessions'
+    __table_args__ = (
+        # At most one active session per employee; also serves the active-session lookup
+        db.Index('uq_monitoring_sessions_active_employee', 'employee_id', unique=True,
+                 postgresql_where=db.text('is_active'), sqlite_where=db.text('is_active')),
+        db.Index('ix_monitoring_sessions_employee_id_start_time', 'employee_id', 'start_time'),
+        db.Index('ix_monitoring_sessions_end_time', 'end_time'),  # Retention scans closed sessions by age
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id'), nullable=False)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
     start_time = db.Column(db.DateTime, default=datetime.utcnow)
     end_time = db.Column(db.DateTime, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    archived_at = db.Column(db.DateTime, nullable=True)  # Activities/screenshots moved to a SessionArchive bundle
     
     # Relationships
-    activities = db.relationship('Activity', backref='session', lazy=True, cascade='all, delete-orphan')
-    screenshots = db.relationship('Screenshot', backref='session', lazy=True, cascade='all, delete-orphan')
+    activities = db.relationship('Activity', backref='session', lazy=True, cascade='all, delete-orphan',
+                                 passive_deletes=True)
+    screenshots = db.relationship('Screenshot', backref='session', lazy=True, cascade='all, delete-orphan',
+                                  passive_deletes=True)
+    summary = db.relationship('SessionSummary', uselist=False, lazy=True, passive_deletes=True)
     
     def to_dict(self, include_details=False):
         data = {
@@ -121,7 +148,8 @@ class MonitoringSession(db.Model):
             'start_time': self.start_time.isoformat() + 'Z' if self.start_time else None,
             'end_time': self.end_time.isoformat() + 'Z' if self.end_time else None,
             'is_active': self.is_active,
-            'duration_seconds': (self.end_time - self.start_time).total_seconds() if self.end_time else None
+            'duration_seconds': (self.end_time - self.start_time).total_seconds() if self.end_time else None,
+            'archived_at': self.archived_at.isoformat() + 'Z' if self.archived_at else None
         }
         if include_details:
             data['activities'] = [a.to_dict() for a in self.activities]
@@ -132,9 +160,16 @@ class MonitoringSession(db.Model):
 class Activity(db.Model):
     """Activity tracking - applications and websites"""
     __tablename__ = 'activities'
+    __table_args__ = (
+        db.Index('ix_activities_session_id_timestamp', 'session_id', 'timestamp'),
+        # Replay lookups are scoped to the caller's sessions
+        db.Index('ix_activities_idempotency_key', 'session_id', 'idempotency_key'),
+        # Ids are never reused on SQLite either: the usage rollups and restored rows rely on it
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('monitoring_sessions.id'), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey('monitoring_sessions.id', ondelete='CASCADE'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     activity_type = db.Column(db.String(50))  # 'application' or 'website'
     application_name = db.Column(db.String(200), nullable=True)
@@ -142,6 +177,7 @@ class Activity(db.Model):
     url = db.Column(db.String(1000), nullable=True)
     duration_seconds = db.Column(db.Integer, default=0)
     in_allowlist = db.Column(db.Boolean, default=False)  # Track if activity was in allowlist
+    idempotency_key = db.Column(db.String(128), nullable=True)  # Client event key, per employee (unique via ingest_keys)
     
     def to_dict(self):
         return {
@@ -160,17 +196,32 @@ class Activity(db.Model):
 class Screenshot(db.Model):
     """Screenshot model"""
     __tablename__ = 'screenshots'
+    __table_args__ = (
+        db.Index('ix_screenshots_session_id_timestamp', 'session_id', 'timestamp'),
+        # Only the (few) unprocessed rows are ever looked up by this flag
+        db.Index('ix_screenshots_unprocessed', 'session_id',
+                 postgresql_where=db.text('NOT is_processed'), sqlite_where=db.text('NOT is_processed')),
+        db.Index('ix_screenshots_idempotency_key', 'session_id', 'idempotency_key'),
+        {'sqlite_autoincrement': True},
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    session_id = db.Column(db.Integer, db.ForeignKey('monitoring_sessions.id'), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey('monitoring_sessions.id', ondelete='CASCADE'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer)
+    width = db.Column(db.Integer, nullable=True)  # Pixel dimensions, read from the image header on upload
+    height = db.Column(db.Integer, nullable=True)
+    thumb_path = db.Column(db.String(80), nullable=True)  # Blob reference of the 320px JPEG rendition (renditions.py)
+    thumb_size = db.Column(db.Integer, nullable=True)
+    preview_path = db.Column(db.String(80), nullable=True)  # Blob reference of the 1280px JPEG rendition
+    preview_size = db.Column(db.Integer, nullable=True)
     extracted_text = db.Column(db.Text, nullable=True)
     extraction_data = db.Column(db.JSON, nullable=True)  # Store full extraction response
     is_processed = db.Column(db.Boolean, default=False)
     folder_name = db.Column(db.String(100), nullable=True)  # Dynamic folder based on allowlist
     activity_name = db.Column(db.String(200), nullable=True)  # Activity label for process mining
+    idempotency_key = db.Column(db.String(128), nullable=True)  # Client event key, per employee (unique via ingest_keys)
     
     def to_dict(self):
         return {
@@ -179,6 +230,10 @@ class Screenshot(db.Model):
             'timestamp': self.timestamp.isoformat() + 'Z' if self.timestamp else None,
             'file_path': self.file_path,
             'file_size': self.file_size,
+            'width': self.width,
+            'height': self.height,
+            'thumb_size': self.thumb_size,
+            'preview_size': self.preview_size,
             'extracted_text': self.extracted_text,
             'extraction_data': self.extraction_data,
             'is_processed': self.is_processed,
@@ -187,6 +242,209 @@ class Screenshot(db.Model):
         }
 
 
+class IngestKey(db.Model):
+    """
+    Idempotency keys of ingested events
+
+    Kept outside activities/screenshots because a unique index on a partitioned
+    table must include the partition key. Inserted in the same transaction as the
+    event, so a replayed key fails the primary key and the event is not written twice.
+    Keys are chosen by the agents, so they are only unique per employee.
+    """
+    __tablename__ = 'ingest_keys'
+    
+    employee_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    key = db.Column(db.String(128), primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'activity' or 'screenshot'
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class ScreenshotBlob(db.Model):
+    """Content-addressed screenshot file, shared by every screenshot with the same bytes"""
+    __tablename__ = 'screenshot_blobs'
+    
+    digest = db.Column(db.String(64), primary_key=True)  # SHA-256 hex of the file contents
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Last ref change, drives garbage collection
+    
+    def to_dict(self):
+        return {
+            'digest': self.digest,
+            'size': self.size,
+            'ref_count': self.ref_count,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class RetentionPolicy(db.Model):
+    """
+    Per-organization data retention, in days after a session ends (NULL keeps forever)
+
+    Organizations without a row use the RETENTION_*_DAYS defaults from config.
+    """
+    __tablename__ = 'retention_policies'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False, unique=True)
+    screenshot_days = db.Column(db.Integer, nullable=True)  # Full-resolution images; the session is archived then
+    thumbnail_days = db.Column(db.Integer, nullable=True)
+    activity_days = db.Column(db.Integer, nullable=True)  # The archive bundle and the session itself
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'organization_id': self.organization_id,
+            'screenshot_days': self.screenshot_days,
+            'thumbnail_days': self.thumbnail_days,
+            'activity_days': self.activity_days,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+
+class SessionArchive(db.Model):
+    """Compressed bundle holding an archived session's activities and screenshot metadata"""
+    __tablename__ = 'session_archives'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    session_id = db.Column(db.Integer, db.ForeignKey('monitoring_sessions.id', ondelete='CASCADE'), nullable=False,
+                           unique=True)
+    bundle_ref = db.Column(db.String(80), nullable=False)  # Blob reference ("sha256:<hex>") in screenshot storage
+    bundle_size = db.Column(db.Integer, nullable=False)
+    activity_count = db.Column(db.Integer, default=0)
+    screenshot_count = db.Column(db.Integer, default=0)
+    thumbnail_count = db.Column(db.Integer, default=0)  # Thumbnail references held by the archive
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    thumbnails_expired_at = db.Column(db.DateTime, nullable=True)  # Held thumbnails released
+    restored_at = db.Column(db.DateTime, nullable=True)
+    hold_until = db.Column(db.DateTime, nullable=True)  # A restored session stays hot until then
+    
+    def to_dict(self):
+        return {
+            'session_id': self.session_id,
+            'bundle_size': self.bundle_size,
+            'activity_count': self.activity_count,
+            'screenshot_count': self.screenshot_count,
+            'thumbnail_count': self.thumbnail_count,
+            'archived_at': self.archived_at.isoformat() + 'Z' if self.archived_at else None,
+            'restored_at': self.restored_at.isoformat() + 'Z' if self.restored_at else None,
+            'hold_until': self.hold_until.isoformat() + 'Z' if self.hold_until else None,
+            'thumbnails_expired_at': self.thumbnails_expired_at.isoformat() + 'Z' if self.thumbnails_expired_at else None
+        }
+
+
+class SessionSummary(db.Model):
+    """Per-session counts and top applications, materialized from the session's rows (see session_summaries.py)"""
+    __tablename__ = 'session_summaries'
+    
+    session_id = db.Column(db.Integer, db.ForeignKey('monitoring_sessions.id', ondelete='CASCADE'), primary_key=True)
+    activity_count = db.Column(db.Integer, default=0)
+    screenshot_count = db.Column(db.Integer, default=0)
+    active_seconds = db.Column(db.Integer, default=0)  # Sum of activity durations
+    applications = db.Column(db.JSON, nullable=True)  # {name: [activity count, seconds]} for the busiest applications
+    folders = db.Column(db.JSON, nullable=True)  # {folder_name or '': [screenshot count, seconds at the capture interval]}
+    is_final = db.Column(db.Boolean, default=False)  # Recomputed in full after the session stopped
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        applications = sorted((self.applications or {}).items(), key=lambda item: item[1][1], reverse=True)
+        return {
+            'activity_count': self.activity_count,
+            'screenshot_count': self.screenshot_count,
+            'active_seconds': self.active_seconds,
+            'top_applications': [
+                {'name': name, 'duration_seconds': seconds, 'count': count}
+                for name, (count, seconds) in applications[:10]
+            ],
+            'folders': [
+                {'name': name or None, 'screenshot_count': count, 'duration_seconds': seconds}
+                for name, (count, seconds) in sorted((self.folders or {}).items(), key=lambda item: -item[1][0])
+            ],
+            'is_final': self.is_final,
+            'updated_at': self.updated_at.isoformat() + 'Z' if self.updated_at else None
+        }
+
+
+class UsageRollup(db.Model):
+    """Daily usage per employee and application, website or screenshot folder (see usage_rollups.py)"""
+    __tablename__ = 'usage_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('employee_id', 'day', 'dimension', 'name', name='uq_usage_rollups_employee_day_name'),
+        db.Index('ix_usage_rollups_organization_id_day', 'organization_id', 'day'),
+    )
+    
+    id = db.Column(db.Integer, primary_key=True)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=True)
+    employee_id = db.Column(db.Integer, db.ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
+    day = db.Column(db.Date, nullable=False)  # UTC day of the event timestamp
+    dimension = db.Column(db.String(20), nullable=False)  # 'application', 'url' or 'folder'
+    name = db.Column(db.String(1000), nullable=False)
+    total_seconds = db.Column(db.Integer, default=0)
+    switch_count = db.Column(db.Integer, default=0)  # Activity events, one per switch to this application/url
+    screenshot_count = db.Column(db.Integer, default=0)
+    
+    def to_dict(self):
+        return {
+            'employee_id': self.employee_id,
+            'day': self.day.isoformat(),
+            'dimension': self.dimension,
+            'name': self.name,
+            'total_seconds': self.total_seconds,
+            'switch_count': self.switch_count,
+            'screenshot_count': self.screenshot_count
+        }
+
+
+class RollupWatermark(db.Model):
+    """Highest activity/screenshot id already counted into usage_rollups"""
+    __tablename__ = 'rollup_watermarks'
+    
+    source = db.Column(db.String(20), primary_key=True)  # 'activities' or 'screenshots'
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DeletionJob(db.Model):
+    """Background deletion of an employee or session, with progress counters (see deletion.py)"""
+    __tablename__ = 'deletion_jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    target_type = db.Column(db.String(20), nullable=False)  # 'employee' or 'session'
+    target_id = db.Column(db.Integer, nullable=False)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organizations.id'), nullable=False)
+    requested_by = db.Column(db.Integer, nullable=True)  # Employee id (not a foreign key: it may be deleted too)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, completed, failed
+    total_sessions = db.Column(db.Integer, default=0)
+    deleted_sessions = db.Column(db.Integer, default=0)
+    deleted_activities = db.Column(db.Integer, default=0)
+    deleted_screenshots = db.Column(db.Integer, default=0)
+    released_files = db.Column(db.Integer, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'target_type': self.target_type,
+            'target_id': self.target_id,
+            'status': self.status,
+            'progress': self.deleted_sessions / self.total_sessions if self.total_sessions else
+                (1.0 if self.status == 'completed' else 0.0),
+            'total_sessions': self.total_sessions,
+            'deleted_sessions': self.deleted_sessions,
+            'deleted_activities': self.deleted_activities,
+            'deleted_screenshots': self.deleted_screenshots,
+            'released_files': self.released_files,
+            'error': self.error,
+            'created_at': self.created_at.isoformat() + 'Z' if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() + 'Z' if self.finished_at else None
+        }
+
+
 class MonitoringConfig(db.Model):
     """Manager-configured allowlist for selective monitoring"""
     __tablename__ = 'monitoring_configs'
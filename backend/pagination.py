@@ -0,0 +1,90 @@
+"""
+Keyset Pagination
+Session screenshot and activity listings accept
+
+    ?limit=<n>          page size (at most MAX_PAGE_SIZE; omitted returns every row)
+    &from=<time>        only rows at or after this time (ISO 8601 or epoch seconds)
+    &to=<time>          only rows before this time
+    &cursor=<token>     continue after the last row of the previous page
+
+and are ordered by (timestamp, id), so rows arriving in the meantime never shift
+or repeat a page. The cursor of the next page is sent in the X-Next-Cursor
+response header (absent on the last page) and the body stays a JSON array,
+streamed (see streaming.py). Each page is one index range scan on
+(session_id, timestamp), however deep.
+"""
+
+import base64
+import json
+from datetime import datetime
+from flask import request
+from sqlalchemy import tuple_
+from ingest import parse_client_timestamp
+from streaming import stream_rows
+
+MAX_PAGE_SIZE = 1000
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+
+def encode_cursor(row):
+    payload = json.dumps([row.timestamp.isoformat(), row.id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(payload).rstrip(b'=').decode()
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) of the row a cursor points after; raises ValueError if malformed"""
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def _page_size():
+    value = request.args.get('limit')
+    if value is None or value == '':
+        return None
+    if not value.isdigit() or not 1 <= int(value) <= MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    return int(value)
+
+
+def _time_arg(name):
+    try:
+        return parse_client_timestamp(request.args.get(name))
+    except ValueError as e:
+        raise ValueError(f"Invalid '{name}' time") from e
+
+
+def keyset_page(query, model):
+    """
+    Apply the request's from/to/cursor/limit to a query over model
+
+    Returns (rows, next_cursor); next_cursor is None on the last page. Without a
+    limit, rows is the query itself, fetched in batches as it is iterated.
+    Raises ValueError (with a message for the client) on malformed parameters.
+    """
+    limit = _page_size()
+    start, end = _time_arg('from'), _time_arg('to')
+    if start is not None:
+        query = query.filter(model.timestamp >= start)
+    if end is not None:
+        query = query.filter(model.timestamp < end)
+    cursor = request.args.get('cursor')
+    if cursor:
+        query = query.filter(tuple_(model.timestamp, model.id) > tuple_(*decode_cursor(cursor)))
+    query = query.order_by(model.timestamp, model.id)
+
+    if limit is None:
+        return stream_rows(query), None
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_cursor(rows[limit - 1])
+
+
+def with_next_cursor(response, next_cursor):
+    """Attach the next page's cursor to a listing response"""
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return response
@@ -0,0 +1,127 @@
+"""
+Monthly Range Partitions (PostgreSQL)
+activities and screenshots are partitioned by month on timestamp:
+
+    activities                 partitioned parent (the ORM maps to this)
+    activities_p2026_10        FOR VALUES FROM ('2026-10-01') TO ('2026-11-01')
+    activities_default         rows outside every monthly range
+
+Queries that filter on timestamp only touch the matching partitions, and
+expiring a month is a DETACH + DROP instead of a large DELETE. On other
+databases (SQLite in development) the tables are plain and these helpers
+report nothing to do.
+"""
+
+import re
+from datetime import date, datetime
+from sqlalchemy import text
+from storage.blobs import BLOB_REF_PREFIX
+from renditions import BLOB_REF_COLUMNS
+
+PARTITIONED_TABLES = ['activities', 'screenshots']
+PARTITION_RE = re.compile(r'^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table, month):
+    return f"{table}_p{month.year:04d}_{month.month:02d}"
+
+
+def parse_partition_name(name):
+    """(table, first day of month) for a monthly partition name, or None"""
+    match = PARTITION_RE.match(name)
+    if not match:
+        return None
+    return match.group('table'), date(int(match.group('year')), int(match.group('month')), 1)
+
+
+def is_partitioned(conn, table):
+    if conn.dialect.name != 'postgresql':
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+    ), {'table': table}).first() is not None
+
+
+def list_partitions(conn, table):
+    """Monthly partitions of a table as {first day of month: partition name}"""
+    rows = conn.execute(text("""
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.relname = :table
+    """), {'table': table}).scalars()
+    partitions = {}
+    for name in rows:
+        parsed = parse_partition_name(name)
+        if parsed and parsed[0] == table:
+            partitions[parsed[1]] = name
+    return partitions
+
+
+def create_partition(conn, table, month):
+    """Create the partition for one month if it doesn't exist yet"""
+    conn.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    ))
+
+
+def ensure_partitions(conn, table, months_ahead=3, now=None):
+    """Create partitions from the current month through months_ahead; returns the names created"""
+    existing = list_partitions(conn, table)
+    current = month_start(now or datetime.utcnow())
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if month not in existing:
+            create_partition(conn, table, month)
+            created.append(partition_name(table, month))
+    return created
+
+
+def expired_partitions(conn, table, keep_months, now=None):
+    """Partitions whose whole month lies before the retention window, oldest first"""
+    cutoff = add_months(month_start(now or datetime.utcnow()), -keep_months)
+    return [name for month, name in sorted(list_partitions(conn, table).items())
+            if add_months(month, 1) <= cutoff]
+
+
+def detach_partition(conn, table, name):
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+
+
+def drop_partition(conn, table, name):
+    """
+    Detach and drop one partition inside the current transaction
+
+    Dropping screenshots releases the blob references held by its rows (originals
+    and renditions); legacy
+    file paths are returned so the caller can unlink them after the commit.
+    """
+    detach_partition(conn, table, name)
+    legacy_paths = []
+    if table == 'screenshots':
+        for column in BLOB_REF_COLUMNS:
+            conn.execute(text(f"""
+                UPDATE screenshot_blobs SET ref_count = GREATEST(screenshot_blobs.ref_count - released.n, 0),
+                                            updated_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT substr({column}, :offset) AS digest, COUNT(*) AS n FROM {name}
+                    WHERE {column} LIKE :pattern GROUP BY 1
+                ) AS released
+                WHERE screenshot_blobs.digest = released.digest
+            """), {'offset': len(BLOB_REF_PREFIX) + 1, 'pattern': f'{BLOB_REF_PREFIX}%'})
+        legacy_paths = list(conn.execute(text(
+            f"SELECT file_path FROM {name} WHERE file_path NOT LIKE :pattern"
+        ), {'pattern': f'{BLOB_REF_PREFIX}%'}).scalars())
+    conn.execute(text(f"DROP TABLE {name}"))
+    return legacy_paths
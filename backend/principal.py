@@ -0,0 +1,98 @@
+"""
+Authenticated Principal
+Most handlers only need the caller's id, role, organization and manager to
+authorize a request, not the whole Employee row. get_principal() decodes the JWT
+identity once per request (kept in flask.g) and returns an immutable Principal,
+cached per employee in an in-process LRU for PRINCIPAL_CACHE_TTL seconds.
+
+update_employee, assign_manager and employee deletion invalidate the entry in
+the worker that made the change; other workers pick the change up when their
+entry expires, so the TTL bounds how long a role change takes to apply everywhere.
+"""
+
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app, g
+from flask_jwt_extended import get_jwt_identity
+from models import db, Employee
+
+Principal = namedtuple('Principal', ['id', 'role', 'organization_id', 'manager_id', 'is_active'])
+
+
+class PrincipalCache:
+    """employee_id -> Principal, least recently used evicted past max_size, with expiry"""
+
+    def __init__(self, ttl=30, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, employee_id):
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is None:
+                return None
+            principal, expires = entry
+            if expires < time.monotonic():
+                del self._entries[employee_id]
+                return None
+            self._entries.move_to_end(employee_id)
+            return principal
+
+    def set(self, employee_id, principal):
+        with self._lock:
+            self._entries[employee_id] = (principal, time.monotonic() + self.ttl)
+            self._entries.move_to_end(employee_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, employee_id):
+        with self._lock:
+            self._entries.pop(employee_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_principal_cache():
+    """Principal cache for the current app (created once per app)"""
+    cache = current_app.extensions.get('principal_cache')
+    if cache is None:
+        cache = PrincipalCache(ttl=current_app.config.get('PRINCIPAL_CACHE_TTL', 30),
+                               max_size=current_app.config.get('PRINCIPAL_CACHE_SIZE', 10000))
+        current_app.extensions['principal_cache'] = cache
+    return cache
+
+
+def load_principal(employee_id):
+    """Principal of an employee (cached), or None if there is no such employee"""
+    cache = get_principal_cache()
+    principal = cache.get(employee_id)
+    if principal is not None:
+        return principal
+
+    row = db.session.query(
+        Employee.id, Employee.role, Employee.organization_id, Employee.manager_id, Employee.is_active
+    ).filter(Employee.id == employee_id).first()
+    if row is None:
+        return None
+    principal = Principal(*row)
+    cache.set(employee_id, principal)
+    return principal
+
+
+def get_principal():
+    """Principal of the request's JWT identity, resolved once per request"""
+    if 'principal' not in g:
+        g.principal = load_principal(int(get_jwt_identity()))
+    return g.principal
+
+
+def invalidate_principal(employee_id):
+    """Forget a cached principal after the employee's role, organization or manager changed"""
+    get_principal_cache().invalidate(employee_id)
+    if g.get('principal') is not None and g.principal.id == employee_id:
+        g.pop('principal')
@@ -0,0 +1,111 @@
+"""
+List Projections
+List endpoints return each row's full to_dict() by default. Clients that need
+less ask for it:
+
+    ?view=summary                       the named lightweight projection
+    ?fields=id,timestamp,folder_name    exactly these fields (any of the full ones)
+
+and only the columns those fields read are SELECTed (load_only), so a gallery no
+longer pulls every screenshot's OCR text and extraction JSON to show thumbnails.
+"""
+
+from datetime import datetime
+from flask import request
+from sqlalchemy.orm import load_only
+from models import Activity, MonitoringSession, Screenshot
+from signed_urls import signed_url, signed_urls
+
+VIEWS = ('summary', 'full')
+
+
+class Projection:
+    """
+    The fields a list endpoint can return for one model
+
+    Plain fields are columns of the same name; computed maps a field to the
+    columns it reads and a function of the row. full serializes a whole row.
+    """
+
+    def __init__(self, model, columns, summary, full, computed=None, key_columns=('id',)):
+        self.model = model
+        self.computed = computed or {}
+        self.fields = list(columns) + list(self.computed)
+        self.summary = summary
+        self.full = full
+        self.key_columns = key_columns  # Always loaded: ordering and pagination read them
+
+    def requested_fields(self):
+        """Fields asked for with ?fields= or ?view=, None for the full rows; ValueError if unknown"""
+        if request.args.get('fields'):
+            fields = [f.strip() for f in request.args['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in self.fields]
+            if unknown:
+                raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+            return list(dict.fromkeys(fields))
+        view = request.args.get('view', 'full')
+        if view not in VIEWS:
+            raise ValueError(f"view must be one of: {', '.join(VIEWS)}")
+        return self.summary if view == 'summary' else None
+
+    def select(self, query, fields):
+        """Restrict a query over the model to the columns the fields read"""
+        if fields is None:
+            return query
+        names = set(self.key_columns)
+        for field in fields:
+            names.update(self.computed[field][0] if field in self.computed else (field,))
+        return query.options(load_only(*(getattr(self.model, name) for name in sorted(names))))
+
+    def serialize(self, row, fields):
+        if fields is None:
+            return self.full(row)
+        data = {}
+        for field in fields:
+            if field in self.computed:
+                data[field] = self.computed[field][1](row)
+            else:
+                value = getattr(row, field)
+                data[field] = value.isoformat() + 'Z' if isinstance(value, datetime) else value
+        return data
+
+
+def _signed(size):
+    return ('id',), lambda row: signed_url(row.id, size)
+
+
+def _duration(session):
+    return (session.end_time - session.start_time).total_seconds() if session.end_time else None
+
+
+def _summary(session):
+    return session.summary.to_dict() if session.summary else None
+
+
+SCREENSHOT_FIELDS = Projection(
+    Screenshot,
+    columns=['id', 'session_id', 'timestamp', 'file_path', 'file_size', 'width', 'height', 'thumb_size',
+             'preview_size', 'extracted_text', 'extraction_data', 'is_processed', 'folder_name', 'activity_name'],
+    computed={'url': _signed('original'), 'thumb_url': _signed('thumb'), 'preview_url': _signed('preview')},
+    summary=['id', 'session_id', 'timestamp', 'folder_name', 'activity_name', 'is_processed', 'thumb_url', 'url'],
+    full=lambda s: dict(s.to_dict(), **signed_urls(s.id)),
+    key_columns=('id', 'timestamp'),
+)
+
+ACTIVITY_FIELDS = Projection(
+    Activity,
+    columns=['id', 'session_id', 'timestamp', 'activity_type', 'application_name', 'window_title', 'url',
+             'duration_seconds', 'in_allowlist'],
+    summary=['id', 'session_id', 'timestamp', 'activity_type', 'application_name', 'duration_seconds'],
+    full=Activity.to_dict,
+    key_columns=('id', 'timestamp'),
+)
+
+SESSION_FIELDS = Projection(
+    MonitoringSession,
+    columns=['id', 'employee_id', 'start_time', 'end_time', 'is_active', 'archived_at'],
+    computed={'duration_seconds': (('start_time', 'end_time'), _duration), 'summary': (('id',), _summary)},
+    summary=['id', 'employee_id', 'start_time', 'end_time', 'is_active', 'duration_seconds', 'summary'],
+    full=lambda s: dict(s.to_dict(), summary=_summary(s)),
+    key_columns=('id', 'start_time'),
+)
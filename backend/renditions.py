@@ -0,0 +1,166 @@
+"""
+Screenshot Renditions
+Galleries show small tiles, so besides the full-resolution PNG each screenshot
+can have two downsized JPEG renditions:
+
+    thumb      fits in 320x320 (gallery tiles)
+    preview    fits in 1280x1280 (detail views)
+
+A rendition is made on first request (GET /api/screenshots/<id>/file?size=thumb)
+and cached: stored as a blob in screenshot storage like the original, with its
+reference and byte size on the Screenshot row. Resizing runs in a process pool
+(RENDITION_WORKERS, 0 renders in the request thread), and backfill_renditions.py
+renders them ahead of time for existing screenshots.
+"""
+
+import logging
+import multiprocessing
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from flask import current_app
+from PIL import Image
+from models import db, Screenshot
+from storage import get_storage, make_ref, acquire_blob, screenshot_exists, local_screenshot_copy
+
+logger = logging.getLogger(__name__)
+
+# size name -> (longest side in pixels, JPEG quality)
+RENDITIONS = {'thumb': (320, 70), 'preview': (1280, 80)}
+RENDITION_MIMETYPE = 'image/jpeg'
+# Screenshot columns holding blob references: the original and each rendition
+BLOB_REF_COLUMNS = ['file_path'] + [f'{size}_path' for size in RENDITIONS]
+
+
+def render(source_path, size):
+    """JPEG bytes of an image scaled down to fit the rendition's box (runs in the pool)"""
+    longest_side, quality = RENDITIONS[size]
+    with Image.open(source_path) as image:
+        image.draft('RGB', (longest_side, longest_side))
+        image = image.convert('RGB')
+        image.thumbnail((longest_side, longest_side), Image.Resampling.LANCZOS)
+        out = BytesIO()
+        image.save(out, 'JPEG', quality=quality, optimize=True, progressive=size == 'preview')
+    return out.getvalue()
+
+
+def get_rendition_pool():
+    """Process pool for resizing (created once per worker process), or None to render inline"""
+    if not current_app.config.get('RENDITION_WORKERS', 2):
+        return None
+    pool = current_app.extensions.get('rendition_pool')
+    if pool is None:
+        # spawn: forking a process that runs writer threads can copy held locks
+        pool = ProcessPoolExecutor(max_workers=current_app.config['RENDITION_WORKERS'],
+                                   mp_context=multiprocessing.get_context('spawn'))
+        current_app.extensions['rendition_pool'] = pool
+    return pool
+
+
+def _result(call, path):
+    try:
+        return call()
+    except (OSError, ValueError) as e:
+        logger.warning("Could not render %s: %s", path, e)
+        return None
+
+
+def render_many(jobs):
+    """
+    Render [(source_path, size), ...] in the pool
+
+    Returns the bytes in the same order, None for images that can't be decoded.
+    """
+    pool = get_rendition_pool()
+    if pool is None:
+        return [_result(lambda: render(path, size), path) for path, size in jobs]
+    futures = [(pool.submit(render, path, size), path) for path, size in jobs]
+    return [_result(future.result, path) for future, path in futures]
+
+
+def save_rendition(screenshot_id, size, data, storage):
+    """
+    Point a screenshot at a rendition inside the current transaction
+
+    Only fills an empty column, so two requests rendering the same screenshot at
+    once take a single blob reference. Returns (blob reference, temp file to
+    publish after the commit, or None if another request got there first).
+    """
+    temp_path, digest, length = storage.write_temp(BytesIO(data))
+    ref = make_ref(digest)
+    column = getattr(Screenshot, f'{size}_path')
+    updated = Screenshot.query.filter(Screenshot.id == screenshot_id, column.is_(None)).update(
+        {column: ref, getattr(Screenshot, f'{size}_size'): length}, synchronize_session=False
+    )
+    if not updated:
+        storage.discard(temp_path)
+        return None, None
+    acquire_blob(digest, length)
+    return ref, (temp_path, digest)
+
+
+def ensure_rendition(screenshot, size):
+    """
+    Blob reference of a screenshot's rendition, rendering and storing it if needed
+
+    Returns None when the original is gone (or isn't a readable image) and no
+    rendition was kept.
+    """
+    ref = getattr(screenshot, f'{size}_path')
+    if ref:
+        return ref
+    if not screenshot_exists(screenshot.file_path):
+        return None
+
+    with local_screenshot_copy(screenshot.file_path) as path:
+        data = render_many([(path, size)])[0]
+    if data is None:
+        return None
+    storage = get_storage()
+    ref, pending = save_rendition(screenshot.id, size, data, storage)
+    db.session.commit()
+    if pending:
+        storage.publish(*pending)
+    db.session.refresh(screenshot)
+    return getattr(screenshot, f'{size}_path')
+
+
+def render_missing(query, size, batch_size=100):
+    """
+    Render the rendition of every screenshot in query that lacks one, a batch at a time
+
+    Screenshots whose original is gone or unreadable are skipped. Returns the number rendered.
+    """
+    storage = get_storage()
+    column = getattr(Screenshot, f'{size}_path')
+    rendered = 0
+    last_id = 0
+    while True:
+        batch = query.filter(column.is_(None), Screenshot.id > last_id) \
+            .order_by(Screenshot.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        batch = [screenshot for screenshot in batch if screenshot_exists(screenshot.file_path)]
+
+        with ExitStack() as stack:
+            paths = [stack.enter_context(local_screenshot_copy(screenshot.file_path)) for screenshot in batch]
+            images = render_many([(path, size) for path in paths])
+        published = []
+        try:
+            for screenshot, data in zip(batch, images):
+                if data is None:
+                    continue
+                ref, pending = save_rendition(screenshot.id, size, data, storage)
+                if pending:
+                    published.append(pending)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            for temp_path, _ in published:
+                storage.discard(temp_path)
+            raise
+        for pending in published:
+            storage.publish(*pending)
+        rendered += len(published)
+    return rendered
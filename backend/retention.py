@@ -0,0 +1,446 @@
+"""
+Retention and Tiered Archival
+Each organization's RetentionPolicy (or the RETENTION_*_DAYS defaults) moves
+closed sessions through three tiers, counted in days from the session's end_time:
+
+    hot        activities and screenshot rows in the hot tables, full-res images
+    archived   after screenshot_days: the rows are written to a gzip'd JSON Lines
+               bundle stored as a blob in screenshot storage, deleted from the hot
+               tables in batches and their images released (gc_screenshot_blobs.py
+               removes the files); the session row stays, with archived_at set
+    expired    after activity_days: the bundle and the session row are deleted
+
+Between the two, thumbnail_days keeps the screenshots' thumbnails (see
+renditions.py): they are rendered before a session is archived and its archive
+holds a reference to each one, released by the run after thumbnail_days.
+
+restore_session() loads an archived session's rows back from its bundle, under
+their original ids, and keeps it hot for RETENTION_RESTORE_HOLD_DAYS before the
+next run archives it again.
+Screenshots come back with their metadata and extracted text; an image whose blob
+has been collected in the meantime is marked with an "expired:" file path, and a
+collected rendition is left empty.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from contextlib import closing
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, insert, or_
+from models import (db, Organization, Employee, MonitoringSession, Activity, Screenshot,
+                    ScreenshotBlob, RetentionPolicy, SessionArchive)
+from renditions import BLOB_REF_COLUMNS, render_missing
+from session_summaries import summarize_session
+from storage import get_storage, make_ref, parse_ref, acquire_blob, release_blob
+from storage.blobs import BLOB_REF_PREFIX
+
+POLICY_FIELDS = ['screenshot_days', 'thumbnail_days', 'activity_days']
+BUNDLE_FORMAT = 1
+BUNDLE_MODELS = {'activity': Activity, 'screenshot': Screenshot}
+EXPIRED_REF_PREFIX = 'expired:'
+
+
+# ----- Policies -----
+
+def default_policy(config):
+    """Policy of organizations without a RetentionPolicy row (0 in config keeps forever)"""
+    return {field: int(config.get(f'RETENTION_{field.upper()}', 0)) or None for field in POLICY_FIELDS}
+
+
+def effective_policy(organization_id):
+    """Retention days of an organization as a dict, plus whether they are the defaults"""
+    policy = RetentionPolicy.query.filter_by(organization_id=organization_id).first()
+    if policy is None:
+        return dict(default_policy(current_app.config), is_default=True)
+    return dict({field: getattr(policy, field) for field in POLICY_FIELDS}, is_default=False)
+
+
+def _days(value):
+    return float('inf') if value is None else value
+
+
+def policy_error(values):
+    """Validation message for a policy dict, or None if it's acceptable"""
+    for field in POLICY_FIELDS:
+        value = values.get(field)
+        if value is not None and (isinstance(value, bool) or not isinstance(value, int) or value < 1):
+            return f'{field} must be a positive number of days or null (keep forever)'
+    if not _days(values.get('screenshot_days')) <= _days(values.get('thumbnail_days')) \
+            <= _days(values.get('activity_days')):
+        return 'Retention must satisfy screenshot_days <= thumbnail_days <= activity_days'
+    return None
+
+
+def longest_activity_retention_days():
+    """
+    Longest activity retention that policies ask for, or None if one keeps forever
+
+    Organizations on the defaults only count when RETENTION_ACTIVITY_DAYS is set,
+    so that PARTITION_RETENTION_MONTHS alone still governs deployments without policies.
+    """
+    values = [policy.activity_days for policy in RetentionPolicy.query.all()]
+    default_days = default_policy(current_app.config)['activity_days']
+    if default_days and Organization.query.count() > len(values):
+        values.append(default_days)
+    if None in values:
+        return None
+    return max(values, default=0)
+
+
+# ----- Bundles -----
+
+class _HashingWriter:
+    """File wrapper hashing and counting the (compressed) bytes written through it"""
+
+    def __init__(self, f):
+        self.f = f
+        self.hasher = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.hasher.update(data)
+        self.size += len(data)
+        return self.f.write(data)
+
+    def flush(self):
+        self.f.flush()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _row_to_json(row):
+    return {column.key: getattr(row, column.key) for column in row.__table__.columns}
+
+
+def _row_from_json(model, data):
+    """
+    Column values of a bundled row, its id included: the usage rollups counted it
+    under that id, so a new one would get it counted a second time
+    """
+    row = {}
+    for column in model.__table__.columns:
+        if column.key not in data:
+            continue
+        value = data[column.key]
+        if value is not None and isinstance(column.type, db.DateTime):
+            value = datetime.fromisoformat(value)
+        row[column.key] = value
+    return row
+
+
+def write_bundle(session, storage, batch_size=1000):
+    """
+    Stream a session and its rows into a gzip'd JSON Lines temp file
+
+    Returns (temp_path, digest, size, counts); counts maps 'activity' and
+    'screenshot' to the number of rows written.
+    """
+    counts = Counter()
+    fd, temp_path = tempfile.mkstemp(dir=storage.tmp_dir, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            out = _HashingWriter(raw)
+            with gzip.GzipFile(fileobj=out, mode='wb', mtime=0) as bundle:
+                def write(record):
+                    bundle.write(json.dumps(record, default=_json_default).encode() + b'\n')
+
+                write({'type': 'session', 'format': BUNDLE_FORMAT, 'row': _row_to_json(session)})
+                for kind, model in BUNDLE_MODELS.items():
+                    rows = model.query.filter_by(session_id=session.id) \
+                        .order_by(model.timestamp, model.id).yield_per(batch_size)
+                    for row in rows:
+                        write({'type': kind, 'row': _row_to_json(row)})
+                        counts[kind] += 1
+    except Exception:
+        os.unlink(temp_path)
+        raise
+    return temp_path, out.hasher.hexdigest(), out.size, counts
+
+
+def read_bundle(storage, archive):
+    """Yield the records of an archive bundle"""
+    with closing(storage.open(parse_ref(archive.bundle_ref))) as raw, gzip.GzipFile(fileobj=raw) as bundle:
+        for line in bundle:
+            yield json.loads(line)
+
+
+def _hot_thumbnails(session_id):
+    """Thumbnail blobs of a session's hot screenshots, as a Counter of digests"""
+    rows = db.session.query(Screenshot.thumb_path, func.count()).filter(
+        Screenshot.session_id == session_id,
+        Screenshot.thumb_path.like(f'{BLOB_REF_PREFIX}%')
+    ).group_by(Screenshot.thumb_path)
+    return Counter({parse_ref(ref): count for ref, count in rows})
+
+
+def release_archived_thumbnails(archive, storage):
+    """
+    Release the thumbnails an archive holds, inside the current transaction
+
+    Returns the number of references released.
+    """
+    if not archive.thumbnail_count or archive.thumbnails_expired_at is not None:
+        return 0
+    digests = Counter(parse_ref(record['row'].get('thumb_path')) for record in read_bundle(storage, archive)
+                      if record['type'] == 'screenshot' and parse_ref(record['row'].get('thumb_path')))
+    for digest, count in digests.items():
+        release_blob(digest, count)
+    return sum(digests.values())
+
+
+# ----- Tier transitions -----
+
+def delete_hot_rows(session_id, batch_size=1000):
+    """
+    Delete a session's screenshots and activities, one transaction per batch
+
+    Screenshot blobs (originals and renditions) are released in the same transaction as their rows; legacy
+    files are unlinked after it commits. Returns the number of rows deleted.
+    """
+    deleted = Counter()
+    for kind, model in (('screenshots', Screenshot), ('activities', Activity)):
+        while True:
+            columns = [model.id] + ([getattr(model, column) for column in BLOB_REF_COLUMNS]
+                                    if model is Screenshot else [])
+            rows = db.session.query(*columns).filter(model.session_id == session_id).limit(batch_size).all()
+            if not rows:
+                break
+
+            legacy_paths = []
+            if model is Screenshot:
+                digests = Counter()
+                for row in rows:
+                    for column in BLOB_REF_COLUMNS:
+                        digest = parse_ref(getattr(row, column))
+                        if digest:
+                            digests[digest] += 1
+                        elif column == 'file_path':
+                            legacy_paths.append(row.file_path)
+                for digest, count in digests.items():
+                    release_blob(digest, count)
+
+            model.query.filter(
+                model.session_id == session_id,
+                model.id.in_([row.id for row in rows])
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            for path in legacy_paths:
+                if path and os.path.exists(path):
+                    os.unlink(path)
+            deleted[kind] += len(rows)
+    return deleted
+
+
+def archive_session(session, storage, batch_size=1000, now=None, keep_thumbnails=False):
+    """
+    Move a closed session's rows into its archive bundle
+
+    The bundle is stored and committed before any hot row is deleted, and a
+    session whose deletes were interrupted (or that was restored) reuses its
+    existing bundle. With keep_thumbnails, missing thumbnails are rendered first
+    and the archive takes a reference to each. Returns the number of hot rows deleted.
+    """
+    now = now or datetime.utcnow()
+    archive = SessionArchive.query.filter_by(session_id=session.id).first()
+    if archive is None:
+        # Session lists keep showing the summary once the rows are gone
+        if session.summary is None or not session.summary.is_final:
+            summarize_session(session)
+        thumbnails = Counter()
+        if keep_thumbnails:
+            render_missing(Screenshot.query.filter_by(session_id=session.id), 'thumb', batch_size)
+            thumbnails = _hot_thumbnails(session.id)
+        temp_path, digest, size, counts = write_bundle(session, storage, batch_size)
+        try:
+            acquire_blob(digest, size)
+            sizes = dict(db.session.query(ScreenshotBlob.digest, ScreenshotBlob.size).filter(
+                ScreenshotBlob.digest.in_(list(thumbnails))))
+            for thumbnail, count in thumbnails.items():
+                acquire_blob(thumbnail, sizes.get(thumbnail, 0), count)
+            archive = SessionArchive(
+                session_id=session.id,
+                bundle_ref=make_ref(digest),
+                bundle_size=size,
+                activity_count=counts['activity'],
+                screenshot_count=counts['screenshot'],
+                thumbnail_count=sum(thumbnails.values()),
+                archived_at=now
+            )
+            db.session.add(archive)
+            storage.publish(temp_path, digest)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            storage.discard(temp_path)
+            raise
+
+    deleted = delete_hot_rows(session.id, batch_size)
+    session.archived_at = now
+    archive.hold_until = None
+    db.session.commit()
+    return deleted
+
+
+def expire_thumbnails(archive, storage, now=None):
+    """Let go of an archive's thumbnails; returns the number released"""
+    released = release_archived_thumbnails(archive, storage)
+    archive.thumbnails_expired_at = now or datetime.utcnow()
+    db.session.commit()
+    return released
+
+
+def expire_session(session, storage, batch_size=1000):
+    """Delete an archived session for good: leftover hot rows, its bundle and the session row"""
+    delete_hot_rows(session.id, batch_size)
+    archive = SessionArchive.query.filter_by(session_id=session.id).first()
+    if archive:
+        release_archived_thumbnails(archive, storage)
+        release_blob(parse_ref(archive.bundle_ref))
+        db.session.delete(archive)
+    MonitoringSession.query.filter_by(id=session.id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def _restore_rows(model, rows, storage):
+    """Insert bundled rows again, re-acquiring the screenshot blobs (originals and renditions) that still exist"""
+    if model is Screenshot:
+        digests = Counter(parse_ref(row.get(column)) for row in rows for column in BLOB_REF_COLUMNS
+                          if parse_ref(row.get(column)))
+        alive = {digest for (digest,) in db.session.query(ScreenshotBlob.digest).filter(
+            ScreenshotBlob.digest.in_(list(digests))
+        ) if storage.exists(digest)}
+        sizes = {}
+        for row in rows:
+            for column in BLOB_REF_COLUMNS:
+                size_column = column.replace('_path', '_size')
+                digest = parse_ref(row.get(column))
+                if digest in alive:
+                    sizes[digest] = row[size_column]
+                elif column != 'file_path':
+                    # Collected rendition: rendered again from the original on request
+                    row[column] = row[size_column] = None
+                elif digest or not os.path.exists(row['file_path']):
+                    row['file_path'] = EXPIRED_REF_PREFIX + row['file_path']
+        for digest in alive:
+            acquire_blob(digest, sizes[digest], digests[digest])
+    db.session.execute(insert(model.__table__), rows)
+
+
+def restore_session(session, hold_days=7, batch_size=1000, now=None):
+    """
+    Load an archived session's rows back into the hot tables
+
+    Runs as a single transaction, so a failed restore leaves the session archived.
+    Returns the number of rows restored per table.
+    """
+    now = now or datetime.utcnow()
+    storage = get_storage()
+    archive = SessionArchive.query.filter_by(session_id=session.id).one()
+
+    restored = Counter()
+    pending = {model: [] for model in BUNDLE_MODELS.values()}
+    try:
+        for record in read_bundle(storage, archive):
+            model = BUNDLE_MODELS.get(record['type'])
+            if model is None:
+                continue
+            pending[model].append(_row_from_json(model, record['row']))
+            if len(pending[model]) >= batch_size:
+                _restore_rows(model, pending[model], storage)
+                restored[model.__tablename__] += len(pending[model])
+                pending[model] = []
+        for model, rows in pending.items():
+            if rows:
+                _restore_rows(model, rows, storage)
+                restored[model.__tablename__] += len(rows)
+
+        session.archived_at = None
+        archive.restored_at = now
+        archive.hold_until = now + timedelta(days=hold_days)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return restored
+
+
+# ----- Job -----
+
+def _closed_sessions(organization_id):
+    return MonitoringSession.query.join(Employee, Employee.id == MonitoringSession.employee_id).filter(
+        Employee.organization_id == organization_id,
+        MonitoringSession.is_active.is_(False),
+        MonitoringSession.end_time.isnot(None)
+    )
+
+
+def run_retention(organization_id=None, batch_size=1000, session_limit=1000, dry_run=False, now=None):
+    """
+    Apply every organization's policy once
+
+    At most session_limit sessions per organization and tier are processed per
+    call, oldest first. Returns counters of what was (or, with dry_run, would be) done.
+    """
+    now = now or datetime.utcnow()
+    storage = get_storage()
+    stats = Counter()
+
+    organizations = Organization.query.order_by(Organization.id)
+    if organization_id is not None:
+        organizations = organizations.filter(Organization.id == organization_id)
+
+    for organization_id in [org.id for org in organizations]:
+        policy = effective_policy(organization_id)
+
+        if policy['screenshot_days'] is not None:
+            cutoff = now - timedelta(days=policy['screenshot_days'])
+            thumbnail_cutoff = now - timedelta(days=policy['thumbnail_days']) \
+                if policy['thumbnail_days'] is not None else None
+            sessions = _closed_sessions(organization_id).outerjoin(
+                SessionArchive, SessionArchive.session_id == MonitoringSession.id
+            ).filter(
+                MonitoringSession.end_time < cutoff,
+                MonitoringSession.archived_at.is_(None),
+                or_(SessionArchive.hold_until.is_(None), SessionArchive.hold_until < now)
+            ).order_by(MonitoringSession.end_time).limit(session_limit).all()
+            for session in sessions:
+                if not dry_run:
+                    keep_thumbnails = thumbnail_cutoff is None or session.end_time >= thumbnail_cutoff
+                    stats.update(archive_session(session, storage, batch_size, now, keep_thumbnails))
+                stats['sessions_archived'] += 1
+
+        if policy['thumbnail_days'] is not None:
+            cutoff = now - timedelta(days=policy['thumbnail_days'])
+            archives = SessionArchive.query.join(MonitoringSession).filter(
+                MonitoringSession.id.in_(_closed_sessions(organization_id).with_entities(MonitoringSession.id)),
+                MonitoringSession.end_time < cutoff,
+                MonitoringSession.archived_at.isnot(None),
+                SessionArchive.thumbnail_count > 0,
+                SessionArchive.thumbnails_expired_at.is_(None)
+            ).order_by(MonitoringSession.end_time).limit(session_limit).all()
+            for archive in archives:
+                if not dry_run:
+                    stats['thumbnails'] += expire_thumbnails(archive, storage, now)
+                stats['sessions_thumbnails_expired'] += 1
+
+        if policy['activity_days'] is not None:
+            cutoff = now - timedelta(days=policy['activity_days'])
+            sessions = _closed_sessions(organization_id).filter(
+                MonitoringSession.end_time < cutoff,
+                MonitoringSession.archived_at.isnot(None)
+            ).order_by(MonitoringSession.end_time).limit(session_limit).all()
+            for session in sessions:
+                if not dry_run:
+                    expire_session(session, storage, batch_size)
+                stats['sessions_expired'] += 1
+
+    return stats
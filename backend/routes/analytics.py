@@ -0,0 +1,80 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from models import UsageRollup, RollupWatermark
+from usage_rollups import DIMENSIONS, SOURCES, usage_query
+from principal import get_principal
+from datetime import date, datetime, timedelta
+
+analytics_bp = Blueprint('analytics', __name__)
+
+GROUP_BY = ('day', 'employee')
+
+
+def _day_arg(name, default):
+    value = request.args.get(name)
+    if not value:
+        return default
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' date, expected YYYY-MM-DD")
+
+
+@analytics_bp.route('/usage', methods=['GET'])
+@jwt_required()
+def get_usage():
+    """
+    Usage per application, url or screenshot folder from the daily rollups
+    
+    ?dimension=application|url|folder, ?from=/?to= days (from inclusive, to exclusive;
+    the last 30 days by default), ?group_by=day,employee and ?employee_id= (admins)
+    """
+    employee_id = int(get_jwt_identity())
+    employee = get_principal()
+    
+    dimension = request.args.get('dimension', 'application')
+    if dimension not in DIMENSIONS:
+        return jsonify({'error': f"dimension must be one of: {', '.join(DIMENSIONS)}"}), 400
+    group_by = [g.strip() for g in request.args.get('group_by', '').split(',') if g.strip()]
+    if any(g not in GROUP_BY for g in group_by):
+        return jsonify({'error': f"group_by takes: {', '.join(GROUP_BY)}"}), 400
+    try:
+        end = _day_arg('to', datetime.utcnow().date() + timedelta(days=1))
+        start = _day_arg('from', end - timedelta(days=30))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    query = usage_query(dimension, start, end, group_by)
+    
+    # Admins see their organization's usage, everyone else their own
+    if employee.role == 'admin':
+        query = query.filter(UsageRollup.organization_id == employee.organization_id)
+        target_employee_id = request.args.get('employee_id', type=int)
+        if target_employee_id:
+            query = query.filter(UsageRollup.employee_id == target_employee_id)
+    else:
+        query = query.filter(UsageRollup.employee_id == employee_id)
+    
+    usage = []
+    for row in query:
+        entry = {
+            'name': row.name,
+            'total_seconds': int(row.total_seconds or 0),
+            'switch_count': int(row.switch_count or 0),
+            'screenshot_count': int(row.screenshot_count or 0)
+        }
+        if 'day' in group_by:
+            entry['day'] = row.day.isoformat()
+        if 'employee' in group_by:
+            entry['employee_id'] = row.employee_id
+        usage.append(entry)
+    
+    watermarks = {mark.source: mark.updated_at for mark in RollupWatermark.query}
+    return jsonify({
+        'dimension': dimension,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        # Oldest time the rollups were brought up to date, None before the first run
+        'updated_at': min(watermarks.values()).isoformat() + 'Z' if len(watermarks) == len(SOURCES) else None,
+        'usage': usage
+    }), 200
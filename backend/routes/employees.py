@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Employee
+from deletion import create_deletion_job, submit_deletion_job
+from principal import get_principal, invalidate_principal
 
 emp_bp = Blueprint('employees', __name__)
 
@@ -58,8 +60,7 @@ def update_my_profile():
 @jwt_required()
 def get_employee(emp_id):
     """Get employee details (admin only)"""
-    current_employee_id = int(get_jwt_identity())
-    current_employee = Employee.query.get(current_employee_id)
+    current_employee = get_principal()
     
     if current_employee.role not in ['admin', 'super_admin']:
         return jsonify({'error': 'Admin access required'}), 403
@@ -79,8 +80,7 @@ def get_employee(emp_id):
 @jwt_required()
 def update_employee(emp_id):
     """Update employee (admin only)"""
-    current_employee_id = int(get_jwt_identity())
-    current_employee = Employee.query.get(current_employee_id)
+    current_employee = get_principal()
     
     if current_employee.role not in ['admin', 'super_admin']:
         return jsonify({'error': 'Admin access required'}), 403
@@ -104,16 +104,43 @@ def update_employee(emp_id):
         employee.is_active = data['is_active']
     
     db.session.commit()
+    invalidate_principal(employee.id)
     
     return jsonify(employee.to_dict()), 200
 
 
+@emp_bp.route('/<int:emp_id>', methods=['DELETE'])
+@jwt_required()
+def delete_employee(emp_id):
+    """Delete an employee with all their sessions, activities and screenshots (admin only)"""
+    current_employee_id = int(get_jwt_identity())
+    current_employee = get_principal()
+    
+    if current_employee.role not in ['admin', 'super_admin']:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    employee = Employee.query.get(emp_id)
+    if not employee:
+        return jsonify({'error': 'Employee not found'}), 404
+    
+    if employee.organization_id != current_employee.organization_id:
+        return jsonify({'error': 'Access denied'}), 403
+    
+    if employee.id == current_employee_id:
+        return jsonify({'error': 'You cannot delete your own account'}), 400
+    
+    # Runs in the background; poll /api/monitoring/deletion-jobs/<id> for progress
+    job = create_deletion_job('employee', emp_id, employee.organization_id, requested_by=current_employee_id)
+    submit_deletion_job(job.id)
+    
+    return jsonify({'message': 'Employee deletion started', 'job': job.to_dict()}), 202
+
+
 @emp_bp.route('/<int:emp_id>/assign-manager', methods=['PUT'])
 @jwt_required()
 def assign_manager(emp_id):
     """Assign employee to a manager (super admin only)"""
-    current_employee_id = int(get_jwt_identity())
-    current_employee = Employee.query.get(current_employee_id)
+    current_employee = get_principal()
     
     # Only super admins can assign managers
     if current_employee.role != 'super_admin':
@@ -134,6 +161,7 @@ def assign_manager(emp_id):
         # Unassign manager
         employee.manager_id = None
         db.session.commit()
+        invalidate_principal(employee.id)
         return jsonify({
             'message': 'Manager unassigned',
             'employee': employee.to_dict()
@@ -153,6 +181,7 @@ def assign_manager(emp_id):
     # Assign manager
     employee.manager_id = manager_id
     db.session.commit()
+    invalidate_principal(employee.id)
     
     return jsonify({
         'message': f'Employee assigned to {manager.name}',
@@ -1,7 +1,20 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Employee, MonitoringSession, Activity, encrypt_credentials, decrypt_credentials
+from models import db, Employee, MonitoringSession, Activity, Screenshot, IngestKey, SessionArchive, DeletionJob, encrypt_credentials, decrypt_credentials
+from ingest import get_idempotency_key, resolve_event_timestamp, find_replayed_event, idempotency_key_seen
+from ingest_writer import async_ingest_enabled, get_ingest_writer, IngestQueueFull
+from session_cache import find_active_session, get_active_session_id, invalidate_active_session, session_deleted
+from retention import restore_session
+from deletion import create_deletion_job, submit_deletion_job
+from pagination import keyset_page, with_next_cursor
+from streaming import JsonArray, stream_json, stream_rows
+from projections import ACTIVITY_FIELDS, SESSION_FIELDS
+from access import authorize_session, visible_sessions
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime
+from principal import get_principal
+from session_summaries import summarize_session, refresh_active_summaries
+from sqlalchemy.orm import joinedload
 
 monitor_bp = Blueprint('monitoring', __name__)
 
@@ -15,11 +28,11 @@ def start_session():
     if not employee:
         return jsonify({'error': 'Employee not found'}), 404
     
+    if not employee.is_active:
+        return jsonify({'error': 'Employee is deactivated'}), 403
+    
     # Check if there's an active session
-    active_session = MonitoringSession.query.filter_by(
-        employee_id=employee_id,
-        is_active=True
-    ).first()
+    active_session = find_active_session(employee_id)
     
     if active_session:
         return jsonify({'error': 'Active session already exists', 'session': active_session.to_dict()}), 400
@@ -38,10 +51,19 @@ def start_session():
         except Exception as e:
             return jsonify({'error': f'Failed to store credentials: {str(e)}'}), 500
     
-    # Create new session
+    # Create new session (the partial unique index rejects a concurrent second start)
     session = MonitoringSession(employee_id=employee_id)
     db.session.add(session)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        active_session = find_active_session(employee_id)
+        return jsonify({
+            'error': 'Active session already exists',
+            'session': active_session.to_dict() if active_session else None
+        }), 400
+    invalidate_active_session(employee_id)
     
     return jsonify({
         'message': 'Monitoring session started',
@@ -57,17 +79,16 @@ def stop_session():
     """Stop the active monitoring session"""
     employee_id = int(get_jwt_identity())
     
-    active_session = MonitoringSession.query.filter_by(
-        employee_id=employee_id,
-        is_active=True
-    ).first()
+    active_session = find_active_session(employee_id)
     
     if not active_session:
         return jsonify({'error': 'No active session found'}), 404
     
     active_session.end_time = datetime.utcnow()
     active_session.is_active = False
+    summarize_session(active_session)
     db.session.commit()
+    invalidate_active_session(employee_id)
     
     return jsonify({
         'message': 'Monitoring session stopped',
@@ -78,52 +99,134 @@ def stop_session():
 @monitor_bp.route('/sessions/current', methods=['GET'])
 @jwt_required()
 def get_current_session():
-    """Get current active session"""
+    """Get current active session (with its activities and screenshots unless ?view= or ?fields= is given)"""
     employee_id = int(get_jwt_identity())
     
-    active_session = MonitoringSession.query.filter_by(
-        employee_id=employee_id,
-        is_active=True
-    ).first()
+    try:
+        fields = SESSION_FIELDS.requested_fields()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    active_session = find_active_session(employee_id)
     
     if not active_session:
         return jsonify({'session': None}), 200
     
-    return jsonify({'session': active_session.to_dict(include_details=True)}), 200
+    if fields is not None:
+        return jsonify({'session': SESSION_FIELDS.serialize(active_session, fields)}), 200
+    
+    # Same body as to_dict(include_details=True), written as the rows are read
+    session = active_session.to_dict()
+    session['activities'] = JsonArray(stream_rows(
+        Activity.query.filter_by(session_id=active_session.id).order_by(Activity.timestamp, Activity.id)
+    ), Activity.to_dict)
+    session['screenshots'] = JsonArray(stream_rows(
+        Screenshot.query.filter_by(session_id=active_session.id).order_by(Screenshot.timestamp, Screenshot.id)
+    ), Screenshot.to_dict)
+    return stream_json({'session': session})
 
 
 @monitor_bp.route('/sessions', methods=['GET'])
 @jwt_required()
 def get_sessions():
-    """Get monitoring sessions (with filters)"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    """Get monitoring sessions (with filters; ?fields=/?view= projections, see projections.py)"""
+    employee = get_principal()
+    
+    try:
+        fields = SESSION_FIELDS.requested_fields()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
     # Get query parameters
     target_employee_id = request.args.get('employee_id', type=int)
     limit = request.args.get('limit', 50, type=int)
     
-    # Build query
-    query = MonitoringSession.query
-    
-    if employee.role == 'admin':
-        # Admin can view all sessions in their organization
-        if target_employee_id:
-            target_employee = Employee.query.get(target_employee_id)
-            if not target_employee or target_employee.organization_id != employee.organization_id:
-                return jsonify({'error': 'Access denied'}), 403
-            query = query.filter_by(employee_id=target_employee_id)
-        else:
-            # Get all employees in organization
-            org_employee_ids = [e.id for e in employee.organization.employees]
-            query = query.filter(MonitoringSession.employee_id.in_(org_employee_ids))
-    else:
-        # Regular employees can only view their own sessions
-        query = query.filter_by(employee_id=employee_id)
+    # Admins see their organization's sessions (joined on the owner), everyone else their own
+    query = visible_sessions(employee)
     
+    if employee.role == 'admin' and target_employee_id:
+        target_organization_id = db.session.query(Employee.organization_id).filter_by(id=target_employee_id).scalar()
+        if target_organization_id != employee.organization_id:
+            return jsonify({'error': 'Access denied'}), 403
+        query = query.filter(MonitoringSession.employee_id == target_employee_id)
+    
+    # Running sessions on this page get their summary recomputed once it is stale
+    if fields is None or 'summary' in fields:
+        page = query.with_entities(MonitoringSession.id).order_by(MonitoringSession.start_time.desc()).limit(limit)
+        refresh_active_summaries(page, current_app.config['SESSION_SUMMARY_MAX_AGE'])
+    
+    # Summaries come in the same query instead of counting each session's rows
+    query = SESSION_FIELDS.select(query, fields).options(joinedload(MonitoringSession.summary))
     sessions = query.order_by(MonitoringSession.start_time.desc()).limit(limit).all()
     
-    return jsonify([s.to_dict() for s in sessions]), 200
+    return jsonify([SESSION_FIELDS.serialize(s, fields) for s in sessions]), 200
+
+
+@monitor_bp.route('/sessions/<int:session_id>/restore', methods=['POST'])
+@jwt_required()
+def restore_archived_session(session_id):
+    """Load an archived session's activities and screenshots back (admin only)"""
+    employee = get_principal()
+    
+    if employee.role != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    session, error = authorize_session(employee, session_id)
+    if error:
+        return error
+    
+    if session.archived_at is None:
+        return jsonify({'error': 'Session is not archived'}), 400
+    
+    hold_days = request.args.get('hold_days', current_app.config['RETENTION_RESTORE_HOLD_DAYS'], type=int)
+    restored = restore_session(session, hold_days=hold_days,
+                               batch_size=current_app.config['RETENTION_BATCH_SIZE'])
+    
+    return jsonify({
+        'message': 'Session restored',
+        'session': session.to_dict(),
+        'archive': SessionArchive.query.filter_by(session_id=session_id).first().to_dict(),
+        'restored': dict(restored)
+    }), 200
+
+
+@monitor_bp.route('/sessions/<int:session_id>', methods=['DELETE'])
+@jwt_required()
+def delete_session(session_id):
+    """Delete a session with its activities and screenshots (admin only)"""
+    employee_id = int(get_jwt_identity())
+    employee = get_principal()
+    
+    if employee.role != 'admin':
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    session, error = authorize_session(employee, session_id)
+    if error:
+        return error
+    
+    # Runs in the background; poll /api/monitoring/deletion-jobs/<id> for progress
+    job = create_deletion_job('session', session_id, employee.organization_id, requested_by=employee_id)
+    submit_deletion_job(job.id)
+    
+    return jsonify({'message': 'Session deletion started', 'job': job.to_dict()}), 202
+
+
+@monitor_bp.route('/deletion-jobs/<int:job_id>', methods=['GET'])
+@jwt_required()
+def get_deletion_job(job_id):
+    """Progress of a background employee/session deletion"""
+    employee_id = int(get_jwt_identity())
+    employee = get_principal()
+    
+    job = DeletionJob.query.get(job_id)
+    if not job:
+        return jsonify({'error': 'Deletion job not found'}), 404
+    
+    if job.requested_by != employee_id and (employee.role not in ['admin', 'super_admin']
+                                            or job.organization_id != employee.organization_id):
+        return jsonify({'error': 'Access denied'}), 403
+    
+    return jsonify(job.to_dict()), 200
 
 
 @monitor_bp.route('/activities', methods=['POST'])
@@ -132,13 +235,10 @@ def log_activity():
     """Log an activity (application or website)"""
     employee_id = int(get_jwt_identity())
     
-    # Get active session
-    active_session = MonitoringSession.query.filter_by(
-        employee_id=employee_id,
-        is_active=True
-    ).first()
+    # Get active session (cached per employee, invalidated on start/stop)
+    session_id = get_active_session_id(employee_id)
     
-    if not active_session:
+    if not session_id:
         return jsonify({'error': 'No active session'}), 400
     
     data = request.get_json()
@@ -146,18 +246,61 @@ def log_activity():
     if not data or not data.get('activity_type'):
         return jsonify({'error': 'Activity type required'}), 400
     
-    activity = Activity(
-        session_id=active_session.id,
+    try:
+        idempotency_key = get_idempotency_key(data)
+        timestamp = resolve_event_timestamp(data.get('captured_at'), data.get('sent_at'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    # Replayed event (agent retry) - return the stored row without writing
+    existing = find_replayed_event(Activity, employee_id, idempotency_key)
+    if existing:
+        return jsonify(existing.to_dict()), 200
+    
+    fields = dict(
+        session_id=session_id,
+        timestamp=timestamp,
         activity_type=data['activity_type'],
         application_name=data.get('application_name'),
         window_title=data.get('window_title'),
         url=data.get('url'),
         duration_seconds=data.get('duration_seconds', 0),
-        in_allowlist=data.get('in_allowlist', False)  # NEW: Track if in allowlist
+        in_allowlist=data.get('in_allowlist', False),  # NEW: Track if in allowlist
+        idempotency_key=idempotency_key
     )
     
-    db.session.add(activity)
-    db.session.commit()
+    # Async ingest: queue the row for the batch writer instead of committing here
+    if async_ingest_enabled():
+        try:
+            get_ingest_writer().enqueue(Activity, fields, employee_id=employee_id)
+        except IngestQueueFull as e:
+            return jsonify({'error': str(e)}), 503
+        return jsonify(Activity(**fields).to_dict()), 202
+    
+    for retried in (False, True):
+        activity = Activity(**fields)
+        
+        db.session.add(activity)
+        if idempotency_key:
+            db.session.add(IngestKey(employee_id=employee_id, key=idempotency_key, kind='activity'))
+        try:
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Lost a race with a concurrent retry of the same event
+            db.session.rollback()
+            existing = find_replayed_event(Activity, employee_id, idempotency_key)
+            if existing:
+                return jsonify(existing.to_dict()), 200
+            if idempotency_key_seen(employee_id, idempotency_key):
+                # Received before, but the row has since been deleted
+                return jsonify({'message': 'Activity already received'}), 200
+            # The cached session was deleted meanwhile: resolve it again and retry once
+            if retried or not session_deleted(employee_id, fields['session_id']):
+                raise
+            fields['session_id'] = get_active_session_id(employee_id)
+            if not fields['session_id']:
+                return jsonify({'error': 'No active session'}), 400
     
     return jsonify(activity.to_dict()), 201
 
@@ -165,32 +308,27 @@ def log_activity():
 @monitor_bp.route('/activities', methods=['GET'])
 @jwt_required()
 def get_activities():
-    """Get activities for a session"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    """Get activities for a session (paginated, see pagination.py; ?fields=/?view= projections, see projections.py)"""
+    employee = get_principal()
     
     session_id = request.args.get('session_id', type=int)
     
     if not session_id:
         return jsonify({'error': 'Session ID required'}), 400
     
-    session = MonitoringSession.query.get(session_id)
-    if not session:
-        return jsonify({'error': 'Session not found'}), 404
-    
-    # Check access
-    if employee.role != 'admin' and session.employee_id != employee_id:
-        return jsonify({'error': 'Access denied'}), 403
+    session, error = authorize_session(employee, session_id)
+    if error:
+        return error
     
-    if employee.role == 'admin':
-        # Verify session belongs to organization
-        session_employee = Employee.query.get(session.employee_id)
-        if session_employee.organization_id != employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
-    
-    activities = Activity.query.filter_by(session_id=session_id).order_by(Activity.timestamp).all()
-    
-    return jsonify([a.to_dict() for a in activities]), 200
+    try:
+        fields = ACTIVITY_FIELDS.requested_fields()
+        query = ACTIVITY_FIELDS.select(Activity.query.filter_by(session_id=session_id), fields)
+        activities, next_cursor = keyset_page(query, Activity)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = stream_json(JsonArray(activities, lambda a: ACTIVITY_FIELDS.serialize(a, fields)))
+    return with_next_cursor(response, next_cursor), 200
 
 
 @monitor_bp.route('/agent/credentials', methods=['GET'])
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Employee, MonitoringConfig
+from models import db, MonitoringConfig
+from principal import get_principal
 import logging
 
 logger = logging.getLogger(__name__)
@@ -11,8 +12,7 @@ config_bp = Blueprint('monitoring_config', __name__)
 @jwt_required()
 def get_configs():
     """Get all monitoring configurations for the organization"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if not employee:
         return jsonify({'error': 'Employee not found'}), 404
@@ -28,8 +28,7 @@ def get_configs():
 @jwt_required()
 def get_active_configs():
     """Get active monitoring configurations (for agent)"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if not employee:
         return jsonify({'error': 'Employee not found'}), 404
@@ -47,7 +46,7 @@ def get_active_configs():
 def create_config():
     """Create a new monitoring configuration (admin only)"""
     employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if not employee or employee.role not in ['admin', 'super_admin']:
         return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
@@ -87,7 +86,7 @@ def create_config():
 def update_config(config_id):
     """Update a monitoring configuration (admin only)"""
     employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if not employee or employee.role not in ['admin', 'super_admin']:
         return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
@@ -131,7 +130,7 @@ def update_config(config_id):
 def delete_config(config_id):
     """Delete a monitoring configuration (admin only)"""
     employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if not employee or employee.role not in ['admin', 'super_admin']:
         return jsonify({'error': 'Access denied. Admin privileges required.'}), 403
@@ -1,6 +1,13 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Organization, Employee
+from models import db, Organization, Employee, RetentionPolicy
+from retention import POLICY_FIELDS, effective_policy, policy_error
+from principal import get_principal
+from exports import EXPORT_KINDS, ExportScope, decode_resume_token, iter_page, iter_records
+from ingest import parse_client_timestamp
+from streaming import stream_ndjson
+from event_log import EVENT_LOG_FORMATS, iter_event_log, pyarrow_available
+from sqlalchemy.orm import undefer
 
 org_bp = Blueprint('organizations', __name__)
 
@@ -8,13 +15,13 @@ org_bp = Blueprint('organizations', __name__)
 @jwt_required()
 def get_organizations():
     """Get all organizations (admin only)"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if employee.role != 'admin':
         return jsonify({'error': 'Admin access required'}), 403
     
-    organizations = Organization.query.all()
+    # Employee counts come back in the same SELECT
+    organizations = Organization.query.options(undefer(Organization.employee_count)).all()
     return jsonify([org.to_dict() for org in organizations]), 200
 
 
@@ -22,8 +29,7 @@ def get_organizations():
 @jwt_required()
 def get_organization(org_id):
     """Get organization details"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     # Employees can only view their own organization
     if employee.role != 'admin' and employee.organization_id != org_id:
@@ -40,8 +46,7 @@ def get_organization(org_id):
 @jwt_required()
 def update_organization(org_id):
     """Update organization settings"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     if employee.role != 'admin' or employee.organization_id != org_id:
         return jsonify({'error': 'Admin access required'}), 403
@@ -71,7 +76,7 @@ def update_organization(org_id):
 def get_organization_employees(org_id):
     """Get all employees in an organization"""
     employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     # Check if user is admin or super_admin
     if employee.role not in ['admin', 'super_admin'] or employee.organization_id != org_id:
@@ -89,3 +94,111 @@ def get_organization_employees(org_id):
         employees = Employee.query.filter_by(organization_id=org_id, manager_id=employee_id).all()
     
     return jsonify([emp.to_dict() for emp in employees]), 200
+
+
+@org_bp.route('/<int:org_id>/retention-policy', methods=['GET'])
+@jwt_required()
+def get_retention_policy(org_id):
+    """Get the organization's retention policy (days after a session ends, null keeps forever)"""
+    employee = get_principal()
+    
+    if employee.role not in ['admin', 'super_admin'] or employee.organization_id != org_id:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    if not Organization.query.get(org_id):
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    return jsonify(dict(effective_policy(org_id), organization_id=org_id)), 200
+
+
+@org_bp.route('/<int:org_id>/retention-policy', methods=['PUT'])
+@jwt_required()
+def update_retention_policy(org_id):
+    """Set the organization's retention policy; omitted fields keep their current value"""
+    employee = get_principal()
+    
+    if employee.role not in ['admin', 'super_admin'] or employee.organization_id != org_id:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    if not Organization.query.get(org_id):
+        return jsonify({'error': 'Organization not found'}), 404
+    
+    data = request.get_json() or {}
+    values = {field: data.get(field) if field in data else current
+              for field, current in effective_policy(org_id).items() if field in POLICY_FIELDS}
+    error = policy_error(values)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    policy = RetentionPolicy.query.filter_by(organization_id=org_id).first()
+    if not policy:
+        policy = RetentionPolicy(organization_id=org_id)
+        db.session.add(policy)
+    for field, value in values.items():
+        setattr(policy, field, value)
+    db.session.commit()
+    
+    return jsonify(dict(effective_policy(org_id), organization_id=org_id)), 200
+
+
+def _export_scope(org_id):
+    """ExportScope of the request's employee_id/from/to parameters; raises ValueError if malformed"""
+    try:
+        employee_ids = [int(e) for e in request.args.get('employee_id', '').split(',') if e.strip()] or None
+    except ValueError as e:
+        raise ValueError('employee_id must be a comma-separated list of ids') from e
+    try:
+        start = parse_client_timestamp(request.args.get('from'))
+        end = parse_client_timestamp(request.args.get('to'))
+    except ValueError as e:
+        raise ValueError("Invalid 'from' or 'to' time") from e
+    return ExportScope(org_id, employee_ids, start, end)
+
+
+@org_bp.route('/<int:org_id>/exports/<kind>', methods=['GET'])
+@jwt_required()
+def export_events(org_id, kind):
+    """Stream the organization's activities or screenshots as NDJSON, or their event log as Parquet/Arrow"""
+    employee = get_principal()
+    
+    if employee.role not in ['admin', 'super_admin'] or employee.organization_id != org_id:
+        return jsonify({'error': 'Admin access required'}), 403
+    
+    if kind not in EXPORT_KINDS:
+        return jsonify({'error': f"Export kind must be one of: {', '.join(EXPORT_KINDS)}"}), 404
+    
+    export_format = request.args.get('format', 'ndjson')
+    if export_format != 'ndjson' and export_format not in EVENT_LOG_FORMATS:
+        return jsonify({'error': f"format must be one of: ndjson, {', '.join(EVENT_LOG_FORMATS)}"}), 400
+    
+    limit = request.args.get('limit', type=int)
+    if limit is not None and limit < 1:
+        return jsonify({'error': 'limit must be positive'}), 400
+    try:
+        scope = _export_scope(org_id)
+        after_id = decode_resume_token(kind, request.args['cursor']) if request.args.get('cursor') else 0
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if export_format in EVENT_LOG_FORMATS:
+        # Columnar event logs are written whole: no limit/cursor pages (see event_log.py)
+        if limit is not None or after_id:
+            return jsonify({'error': 'limit and cursor only apply to ndjson exports'}), 400
+        if not pyarrow_available():
+            return jsonify({'error': 'Parquet/Arrow exports need pyarrow installed on the server'}), 501
+        response = Response(stream_with_context(iter_event_log(
+            kind, scope, export_format, current_app.config['EXPORT_BATCH_SIZE']
+        )), mimetype=EVENT_LOG_FORMATS[export_format])
+        response.headers['Content-Disposition'] = f"attachment; filename={kind}.{export_format}"
+        return response
+    
+    compress = request.args.get('gzip', 'false').lower() in ('true', '1')
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+    if limit is None:
+        records = iter_records(kind, scope, after_id, batch_size=batch_size)
+    else:
+        # Ends with a {"next_cursor": ...} line, taken from the last record actually sent
+        records = iter_page(kind, scope, after_id, limit, batch_size)
+    response = stream_ndjson(records, compress=compress)
+    response.headers['Content-Disposition'] = f"attachment; filename={kind}.ndjson{'.gz' if compress else ''}"
+    return response
@@ -1,11 +1,25 @@
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from models import db, Employee, MonitoringSession, Screenshot, Activity
-from werkzeug.utils import secure_filename
-import os
+from models import db, Screenshot, Activity, IngestKey
+from storage import (get_storage, make_ref, acquire_blob, screenshot_exists, send_screenshot, not_modified,
+                     local_screenshot_copy)
+from ingest import get_idempotency_key, resolve_event_timestamp, find_replayed_event, idempotency_key_seen
+from upload_stream import receive_upload
+from ingest_writer import async_ingest_enabled, get_ingest_writer, IngestQueueFull
+from session_cache import get_active_session_id, session_deleted
+from renditions import RENDITIONS, RENDITION_MIMETYPE, ensure_rendition
+from signed_urls import SIZES as SIGNED_SIZES, signed_urls, verify_signature
+from pagination import keyset_page, with_next_cursor
+from streaming import JsonArray, stream_json
+from projections import SCREENSHOT_FIELDS
+from access import authorize_screenshot, authorize_session, accessible_screenshots
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
 import requests
 import logging
 from datetime import datetime, timedelta
+from contextlib import ExitStack
+from principal import get_principal, load_principal
 
 logger = logging.getLogger(__name__)
 
@@ -17,58 +31,115 @@ def upload_screenshot():
     """Upload a screenshot with dynamic folder routing"""
     employee_id = int(get_jwt_identity())
     
-    # Get active session
-    active_session = MonitoringSession.query.filter_by(
-        employee_id=employee_id,
-        is_active=True
-    ).first()
+    # Get active session (cached per employee, invalidated on start/stop)
+    session_id = get_active_session_id(employee_id)
     
-    if not active_session:
+    if not session_id:
         return jsonify({'error': 'No active session'}), 400
     
-    if 'file' not in request.files:
-        return jsonify({'error': 'No file provided'}), 400
-    
-    file = request.files['file']
-    
-    if file.filename == '':
-        return jsonify({'error': 'No file selected'}), 400
-    
-    # Get folder_name and activity_name from request (sent by agent based on allowlist)
-    folder_name = request.form.get('folder_name')
-    activity_name = request.form.get('activity_name', folder_name)
-    
-    # If no folder specified, skip (not in allowlist)
-    if not folder_name:
-        return jsonify({
-            'message': 'Screenshot not saved - not in allowlist',
-            'allowlist_filtered': True
-        }), 200
-    
-    # Generate unique filename
-    timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
-    filename = secure_filename(f"screenshot_{employee_id}_{active_session.id}_{timestamp}.png")
-    
-    # Create dynamic folder path
-    folder_path = os.path.join(current_app.config['SCREENSHOT_FOLDER'], folder_name)
-    os.makedirs(folder_path, exist_ok=True)
-    
-    filepath = os.path.join(folder_path, filename)
-    file.save(filepath)
-    
-    file_size = os.path.getsize(filepath)
-    
-    # Create screenshot record with folder and activity info
-    screenshot = Screenshot(
-        session_id=active_session.id,
-        file_path=filepath,
-        file_size=file_size,
-        folder_name=folder_name,
-        activity_name=activity_name
-    )
-    
-    db.session.add(screenshot)
-    db.session.commit()
+    # Parse the multipart body ourselves: the file is streamed to a temp file
+    # (size-limited, hashed and measured in one pass) instead of being buffered
+    storage = get_storage()
+    with ExitStack() as upload_scope:
+        try:
+            form, files = upload_scope.enter_context(
+                receive_upload(storage.tmp_dir, current_app.config['MAX_SCREENSHOT_SIZE']))
+        except (RequestEntityTooLarge, BadRequest) as e:
+            return jsonify({'error': e.description}), e.code
+        
+        if 'file' not in files:
+            return jsonify({'error': 'No file provided'}), 400
+        
+        file = files['file']
+        
+        if file.filename == '':
+            return jsonify({'error': 'No file selected'}), 400
+        
+        # Get folder_name and activity_name from request (sent by agent based on allowlist)
+        folder_name = form.get('folder_name')
+        activity_name = form.get('activity_name', folder_name)
+        
+        # If no folder specified, skip (not in allowlist)
+        if not folder_name:
+            return jsonify({
+                'message': 'Screenshot not saved - not in allowlist',
+                'allowlist_filtered': True
+            }), 200
+        
+        try:
+            idempotency_key = get_idempotency_key(form)
+            captured_at = resolve_event_timestamp(form.get('captured_at'), form.get('sent_at'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Replayed upload (agent retry) - don't write the file again
+        existing = find_replayed_event(Screenshot, employee_id, idempotency_key)
+        if existing:
+            return jsonify({
+                'message': 'Screenshot already uploaded',
+                'screenshot': existing.to_dict()
+            }), 200
+        
+        upload = file.stream
+        fields = dict(
+            session_id=session_id,
+            timestamp=captured_at,
+            file_path=make_ref(upload.digest),
+            file_size=upload.size,
+            width=upload.width,
+            height=upload.height,
+            folder_name=folder_name,
+            activity_name=activity_name,
+            idempotency_key=idempotency_key
+        )
+        
+        # Async ingest: the batch writer commits the row, then publishes the file
+        if async_ingest_enabled():
+            temp_path = upload.detach()
+            try:
+                get_ingest_writer().enqueue(Screenshot, fields, temp_path, employee_id=employee_id)
+            except IngestQueueFull as e:
+                storage.discard(temp_path)
+                return jsonify({'error': str(e)}), 503
+            return jsonify({
+                'message': 'Screenshot accepted',
+                'screenshot': Screenshot(**fields).to_dict()
+            }), 202
+        
+        for retried in (False, True):
+            acquire_blob(upload.digest, upload.size)
+            
+            # Create screenshot record with folder and activity info
+            screenshot = Screenshot(**fields)
+            
+            db.session.add(screenshot)
+            if idempotency_key:
+                db.session.add(IngestKey(employee_id=employee_id, key=idempotency_key, kind='screenshot'))
+            try:
+                db.session.commit()
+                break
+            except IntegrityError:
+                # Lost a race with a concurrent retry of the same upload
+                db.session.rollback()
+                existing = find_replayed_event(Screenshot, employee_id, idempotency_key)
+                if existing:
+                    return jsonify({
+                        'message': 'Screenshot already uploaded',
+                        'screenshot': existing.to_dict()
+                    }), 200
+                if idempotency_key_seen(employee_id, idempotency_key):
+                    # Received before, but the row has since been deleted
+                    return jsonify({'message': 'Screenshot already uploaded'}), 200
+                # The cached session was deleted meanwhile: resolve it again and retry once
+                if retried or not session_deleted(employee_id, fields['session_id']):
+                    raise
+                fields['session_id'] = get_active_session_id(employee_id)
+                if not fields['session_id']:
+                    return jsonify({'error': 'No active session'}), 400
+        
+        # Publish (atomic rename / append) only once the reference is committed,
+        # so garbage collection can't race us
+        storage.publish(upload.path, upload.digest)
     
     return jsonify({
         'message': 'Screenshot uploaded successfully',
@@ -80,29 +151,18 @@ def upload_screenshot():
 @jwt_required()
 def get_screenshot(screenshot_id):
     """Get screenshot details"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
-    screenshot = Screenshot.query.get(screenshot_id)
-    if not screenshot:
-        return jsonify({'error': 'Screenshot not found'}), 404
-    
-    # Check access
-    session = MonitoringSession.query.get(screenshot.session_id)
-    if employee.role != 'admin' and session.employee_id != employee_id:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    if employee.role == 'admin':
-        session_employee = Employee.query.get(session.employee_id)
-        if session_employee.organization_id != employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
+    screenshot, error = authorize_screenshot(employee, screenshot_id)
+    if error:
+        return error
     
-    return jsonify(screenshot.to_dict()), 200
+    return jsonify(dict(screenshot.to_dict(), **signed_urls(screenshot.id))), 200
 
 
 @screenshot_bp.route('/<int:screenshot_id>/file', methods=['GET'])
 def download_screenshot(screenshot_id):
-    """Download screenshot file"""
+    """Download screenshot file (?size=thumb|preview for a downsized JPEG)"""
     # Custom auth to handle query param token
     from flask_jwt_extended import verify_jwt_in_request, get_jwt
     
@@ -124,55 +184,81 @@ def download_screenshot(screenshot_id):
             else:
                 return jsonify({'error': 'Missing authorization'}), 401
                 
-        employee_id = int(identity)
-        employee = Employee.query.get(employee_id)
+        employee = load_principal(int(identity))
         
-        screenshot = Screenshot.query.get(screenshot_id)
-        if not screenshot:
-            return jsonify({'error': 'Screenshot not found'}), 404
+        screenshot, error = authorize_screenshot(employee, screenshot_id)
+        if error:
+            return error
         
-        # Check access
-        session = MonitoringSession.query.get(screenshot.session_id)
-        if employee.role != 'admin' and session.employee_id != employee_id:
-            return jsonify({'error': 'Access denied'}), 403
+        size = request.args.get('size')
+        if size:
+            if size not in RENDITIONS:
+                return jsonify({'error': f"size must be one of: {', '.join(RENDITIONS)}"}), 400
+            cached = not_modified(getattr(screenshot, f'{size}_path'))
+            if cached:
+                return cached
+            ref = ensure_rendition(screenshot, size)
+            if not ref:
+                return jsonify({'error': 'Screenshot file not found'}), 404
+            return send_screenshot(ref, mimetype=RENDITION_MIMETYPE)
         
-        if employee.role == 'admin':
-            session_employee = Employee.query.get(session.employee_id)
-            if session_employee.organization_id != employee.organization_id:
-                return jsonify({'error': 'Access denied'}), 403
+        # Browsers revalidating with the ETag get a 304 without a storage lookup
+        cached = not_modified(screenshot.file_path)
+        if cached:
+            return cached
         
-        if not os.path.exists(screenshot.file_path):
+        if not screenshot_exists(screenshot.file_path):
             return jsonify({'error': 'Screenshot file not found'}), 404
         
-        return send_file(screenshot.file_path, mimetype='image/png')
+        return send_screenshot(screenshot.file_path, mimetype='image/png')
         
     except Exception as e:
         return jsonify({'error': f'Authorization failed: {str(e)}'}), 401
 
 
+@screenshot_bp.route('/<int:screenshot_id>/signed/<size>', methods=['GET'])
+def serve_signed_screenshot(screenshot_id, size):
+    """Serve a screenshot or rendition through a signed URL from a list response (no JWT)"""
+    if size not in SIGNED_SIZES:
+        return jsonify({'error': 'Screenshot not found'}), 404
+    if not verify_signature(screenshot_id, size, request.args.get('expires'), request.args.get('sig')):
+        return jsonify({'error': 'Invalid or expired link'}), 403
+    
+    screenshot = Screenshot.query.get(screenshot_id)
+    if not screenshot:
+        return jsonify({'error': 'Screenshot not found'}), 404
+    
+    if size == 'original':
+        ref, mimetype = screenshot.file_path, 'image/png'
+    else:
+        ref, mimetype = getattr(screenshot, f'{size}_path'), RENDITION_MIMETYPE
+    cached = not_modified(ref)
+    if cached:
+        return cached
+    
+    if size != 'original':
+        ref = ensure_rendition(screenshot, size)
+        if not ref:
+            return jsonify({'error': 'Screenshot file not found'}), 404
+    elif not screenshot_exists(ref):
+        return jsonify({'error': 'Screenshot file not found'}), 404
+    
+    # nginx (X-Accel-Redirect) or S3 (presigned redirect) sends the bytes when configured
+    return send_screenshot(ref, mimetype=mimetype, offload=True)
+
+
 @screenshot_bp.route('/<int:screenshot_id>/extract', methods=['POST'])
 @jwt_required()
 def extract_screenshot_data(screenshot_id):
     """Extract data from screenshot using external API"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     # Allow admin or the employee who owns the screenshot
     # (We check ownership after fetching the screenshot)
     
-    screenshot = Screenshot.query.get(screenshot_id)
-    if not screenshot:
-        return jsonify({'error': 'Screenshot not found'}), 404
-        
-    # Check access
-    session = MonitoringSession.query.get(screenshot.session_id)
-    if employee.role != 'admin' and session.employee_id != employee_id:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    if employee.role == 'admin':
-        session_employee = Employee.query.get(session.employee_id)
-        if session_employee.organization_id != employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
+    screenshot, error = authorize_screenshot(employee, screenshot_id)
+    if error:
+        return error
     
     # Check if already processed
     if screenshot.is_processed:
@@ -182,7 +268,7 @@ def extract_screenshot_data(screenshot_id):
         }), 200
     
     # Check if file exists
-    if not os.path.exists(screenshot.file_path):
+    if not screenshot_exists(screenshot.file_path):
         return jsonify({'error': 'Screenshot file not found'}), 404
     
     # Call extraction API
@@ -201,7 +287,8 @@ def extract_screenshot_data(screenshot_id):
             ocr_service = create_ocr_service(api_key, api_url)
             
             # Extract text and data
-            extracted_text, extraction_data = ocr_service.extract_text_from_image(screenshot.file_path)
+            with local_screenshot_copy(screenshot.file_path) as file_path:
+                extracted_text, extraction_data = ocr_service.extract_text_from_image(file_path)
             
             # Store extraction results
             screenshot.extracted_text = extracted_text
@@ -286,8 +373,7 @@ def extract_screenshot_data(screenshot_id):
 @jwt_required()
 def extract_batch():
     """Batch extract data from multiple screenshots"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    employee = get_principal()
     
     data = request.get_json()
     if not data or 'screenshot_ids' not in data:
@@ -301,25 +387,11 @@ def extract_batch():
     if len(screenshot_ids) > 50:
         return jsonify({'error': 'Batch size limit exceeded (max 50)'}), 400
         
-    # Get screenshots
-    screenshots = Screenshot.query.filter(Screenshot.id.in_(screenshot_ids)).all()
-    
-    # Filter accessible screenshots
-    valid_screenshots = []
-    for s in screenshots:
-        session = MonitoringSession.query.get(s.session_id)
-        
-        # Check access
-        has_access = False
-        if employee.role == 'admin':
-            session_employee = Employee.query.get(session.employee_id)
-            if session_employee.organization_id == employee.organization_id:
-                has_access = True
-        elif session.employee_id == employee_id:
-            has_access = True
-            
-        if has_access and not s.is_processed and os.path.exists(s.file_path):
-            valid_screenshots.append(s)
+    # Accessible screenshots only, authorized in one query
+    valid_screenshots = [
+        s for s in accessible_screenshots(employee, screenshot_ids)
+        if not s.is_processed and screenshot_exists(s.file_path)
+    ]
             
     if not valid_screenshots:
         return jsonify({'message': 'No valid unprocessed screenshots found'}), 200
@@ -338,24 +410,28 @@ def extract_batch():
             from ocr_service import create_ocr_service
             ocr_service = create_ocr_service(api_key, api_url)
             
-            # Map paths to screenshot objects
-            path_to_screenshot = {s.file_path: s for s in valid_screenshots}
-            paths = list(path_to_screenshot.keys())
-            
-            # Run parallel extraction
-            logger.info(f"Starting batch extraction for {len(paths)} screenshots")
-            results = ocr_service.extract_batch_parallel(paths, max_workers=5)
+            with ExitStack() as stack:
+                # Map paths to screenshot objects (deduplicated images share a path)
+                path_to_screenshots = {}
+                for s in valid_screenshots:
+                    path = stack.enter_context(local_screenshot_copy(s.file_path))
+                    path_to_screenshots.setdefault(path, []).append(s)
+                paths = list(path_to_screenshots.keys())
+                
+                # Run parallel extraction
+                logger.info(f"Starting batch extraction for {len(paths)} screenshots")
+                results = ocr_service.extract_batch_parallel(paths, max_workers=5)
             
             # Process results
             for path, (text, data) in results.items():
-                screenshot = path_to_screenshot.get(path)
-                if screenshot and text:
-                    screenshot.extracted_text = text
-                    screenshot.extraction_data = data
-                    screenshot.is_processed = True
-                    processed_count += 1
-                else:
-                    failed_count += 1
+                for screenshot in path_to_screenshots.get(path, []):
+                    if text:
+                        screenshot.extracted_text = text
+                        screenshot.extraction_data = data
+                        screenshot.is_processed = True
+                        processed_count += 1
+                    else:
+                        failed_count += 1
                     
             db.session.commit()
             
@@ -444,23 +520,19 @@ def extract_batch():
 @screenshot_bp.route('/session/<int:session_id>', methods=['GET'])
 @jwt_required()
 def get_session_screenshots(session_id):
-    """Get all screenshots for a session"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
+    """Get a session's screenshots (paginated, see pagination.py; ?fields=/?view= projections, see projections.py)"""
+    employee = get_principal()
     
-    session = MonitoringSession.query.get(session_id)
-    if not session:
-        return jsonify({'error': 'Session not found'}), 404
+    session, error = authorize_session(employee, session_id)
+    if error:
+        return error
     
-    # Check access
-    if employee.role != 'admin' and session.employee_id != employee_id:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    if employee.role == 'admin':
-        session_employee = Employee.query.get(session.employee_id)
-        if session_employee.organization_id != employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
-    
-    screenshots = Screenshot.query.filter_by(session_id=session_id).order_by(Screenshot.timestamp).all()
-    
-    return jsonify([s.to_dict() for s in screenshots]), 200
+    try:
+        fields = SCREENSHOT_FIELDS.requested_fields()
+        query = SCREENSHOT_FIELDS.select(Screenshot.query.filter_by(session_id=session_id), fields)
+        screenshots, next_cursor = keyset_page(query, Screenshot)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response = stream_json(JsonArray(screenshots, lambda s: SCREENSHOT_FIELDS.serialize(s, fields)))
+    return with_next_cursor(response, next_cursor), 200
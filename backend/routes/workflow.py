@@ -3,8 +3,12 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import db, Employee, MonitoringSession, Activity, Screenshot
 from workflow_generator import WorkflowDiagramGenerator
 from process_mining_generator import ProcessMiningGenerator
+from access import authorize_session, can_access
+from sqlalchemy import select
 import os
 import tempfile
+from principal import get_principal, load_principal
+from streaming import stream_rows
 
 workflow_bp = Blueprint('workflow', __name__)
 
@@ -28,22 +32,13 @@ def generate_process_map(session_id):
     except Exception as e:
         return jsonify({'error': 'Invalid authentication'}), 401
     
-    employee = Employee.query.get(employee_id)
+    employee = load_principal(employee_id)
     if not employee:
         return jsonify({'error': 'Employee not found'}), 404
     
-    session = MonitoringSession.query.get(session_id)
-    if not session:
-        return jsonify({'error': 'Session not found'}), 404
-    
-    # Check access
-    if employee.role != 'admin' and session.employee_id != employee_id:
-        return jsonify({'error': 'Access denied'}), 403
-    
-    if employee.role == 'admin':
-        session_employee = Employee.query.get(session.employee_id)
-        if session_employee.organization_id != employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
+    session, error = authorize_session(employee, session_id)
+    if error:
+        return error
     
     try:
         # Generate process mining diagram
@@ -86,21 +81,11 @@ def generate_process_map(session_id):
 @jwt_required()
 def generate_session_diagram(session_id):
     """Generate workflow diagram for a session"""
-    employee_id = int(get_jwt_identity())
-    employee = Employee.query.get(employee_id)
-    
-    session = MonitoringSession.query.get(session_id)
-    if not session:
-        return jsonify({'error': 'Session not found'}), 404
-    
-    # Check access
-    if employee.role != 'admin' and session.employee_id != employee_id:
-        return jsonify({'error': 'Access denied'}), 403
+    employee = get_principal()
     
-    if employee.role == 'admin':
-        session_employee = Employee.query.get(session.employee_id)
-        if session_employee.organization_id != employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
+    session, error = authorize_session(employee, session_id)
+    if error:
+        return error
     
     # Get activities and screenshots
     activities = Activity.query.filter_by(session_id=session_id).all()
@@ -179,8 +164,7 @@ def generate_session_diagram(session_id):
 @jwt_required()
 def generate_employee_diagram(emp_id):
     """Generate workflow diagram for all employee sessions"""
-    current_employee_id = int(get_jwt_identity())
-    current_employee = Employee.query.get(current_employee_id)
+    current_employee = get_principal()
     
     # Check access
     if current_employee.role != 'admin' and current_employee.id != emp_id:
@@ -190,21 +174,31 @@ def generate_employee_diagram(emp_id):
     if not employee:
         return jsonify({'error': 'Employee not found'}), 404
     
-    if current_employee.role == 'admin':
-        if employee.organization_id != current_employee.organization_id:
-            return jsonify({'error': 'Access denied'}), 403
-    
-    # Get all sessions for employee
-    sessions = MonitoringSession.query.filter_by(employee_id=emp_id).all()
-    session_ids = [s.id for s in sessions]
-    
-    # Get all activities and screenshots
-    activities = Activity.query.filter(Activity.session_id.in_(session_ids)).all()
-    screenshots = Screenshot.query.filter(Screenshot.session_id.in_(session_ids)).all()
+    if not can_access(current_employee, employee.id, employee.organization_id):
+        return jsonify({'error': 'Access denied'}), 403
     
-    # Convert to dictionaries
-    activities_data = [a.to_dict() for a in activities]
-    screenshots_data = [s.to_dict() for s in screenshots]
+    # The employee's sessions, as a subquery rather than a list of ids
+    session_ids = select(MonitoringSession.id).where(MonitoringSession.employee_id == emp_id)
+    
+    # Only the fields the generator reads (no ORM objects or OCR text), fetched a batch at a
+    # time. These lists are not streamed on: the generator sorts, merges and revisits the rows
+    # and emits a diagram node per row, so the response is as large as its input anyway
+    activities_data = [
+        {'timestamp': timestamp.isoformat() + 'Z' if timestamp else None, 'activity_type': activity_type,
+         'application_name': application_name, 'url': url, 'window_title': window_title,
+         'duration_seconds': duration_seconds}
+        for timestamp, activity_type, application_name, url, window_title, duration_seconds in stream_rows(
+            db.session.query(Activity.timestamp, Activity.activity_type, Activity.application_name, Activity.url,
+                             Activity.window_title, Activity.duration_seconds)
+            .filter(Activity.session_id.in_(session_ids)).order_by(Activity.timestamp, Activity.id))
+    ]
+    screenshots_data = [
+        {'timestamp': timestamp.isoformat() + 'Z' if timestamp else None, 'is_processed': is_processed,
+         'extraction_data': extraction_data}
+        for timestamp, is_processed, extraction_data in stream_rows(
+            db.session.query(Screenshot.timestamp, Screenshot.is_processed, Screenshot.extraction_data)
+            .filter(Screenshot.session_id.in_(session_ids)).order_by(Screenshot.timestamp, Screenshot.id))
+    ]
     
     # Generate diagrams
     generator = WorkflowDiagramGenerator(activities_data, screenshots_data)
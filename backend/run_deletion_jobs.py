@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Deletion Job Runner
+Finishes employee/session deletions that were interrupted (worker restart or a
+failed batch). Jobs are idempotent, so running this while nothing is stuck is harmless.
+"""
+
+import argparse
+from app import create_app
+from models import DeletionJob
+from deletion import OPEN_STATUSES, run_deletion_job
+
+def main():
+    parser = argparse.ArgumentParser(description='Resume pending, running or failed deletion jobs')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='sessions deleted per transaction (default: DELETION_BATCH_SIZE)')
+    parser.add_argument('--include-failed', action='store_true', help='also retry failed jobs')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        batch_size = args.batch_size or app.config['DELETION_BATCH_SIZE']
+        statuses = OPEN_STATUSES + (['failed'] if args.include_failed else [])
+        job_ids = [job.id for job in DeletionJob.query.filter(DeletionJob.status.in_(statuses)).order_by(DeletionJob.id)]
+        for job_id in job_ids:
+            job = run_deletion_job(job_id, batch_size)
+            mark = '✓' if job.status == 'completed' else '✗'
+            print(f"{mark} Job {job.id} ({job.target_type} {job.target_id}): {job.status}, "
+                  f"{job.deleted_sessions}/{job.total_sessions} sessions, {job.deleted_screenshots} screenshots")
+        print(f"✓ Processed {len(job_ids)} deletion job(s)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Active Session Resolver
+The agent endpoints need the employee's active session id on every request.
+Hits are cached per employee for ACTIVE_SESSION_CACHE_TTL seconds, in process
+or, when REDIS_URL is set, in Redis so every worker sees start/stop at once.
+
+Only active sessions are cached; a miss always goes to the database (a lookup
+on the partial unique index over active sessions), so a session started in
+another worker is picked up immediately. Without Redis, a session stopped in
+another worker may still be resolved here for up to the TTL. A cached session
+that was deleted meanwhile makes the insert fail on its foreign key; the ingest
+paths then check session_deleted(), which drops the id, and retry once with the
+session resolved again.
+"""
+
+import logging
+import threading
+import time
+from flask import current_app
+from models import db, MonitoringSession
+
+try:
+    import redis
+except ImportError:  # optional: in-process cache only
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+REDIS_KEY = 'monitor:active-session:{}'
+
+
+class ActiveSessionCache:
+    """employee_id -> active session id, with expiry"""
+
+    def __init__(self, ttl=10, redis_client=None):
+        self.ttl = ttl
+        self.redis = redis_client
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, employee_id):
+        if self.redis is not None:
+            try:
+                value = self.redis.get(REDIS_KEY.format(employee_id))
+                return int(value) if value is not None else None
+            except redis.RedisError:
+                logger.warning("Redis unavailable, resolving active session from the database", exc_info=True)
+                return None
+
+        with self._lock:
+            entry = self._entries.get(employee_id)
+            if entry is None:
+                return None
+            session_id, expires = entry
+            if expires < time.monotonic():
+                del self._entries[employee_id]
+                return None
+            return session_id
+
+    def set(self, employee_id, session_id):
+        if self.redis is not None:
+            try:
+                self.redis.set(REDIS_KEY.format(employee_id), session_id, ex=self.ttl)
+            except redis.RedisError:
+                logger.warning("Redis unavailable, active session not cached", exc_info=True)
+            return
+
+        with self._lock:
+            self._entries[employee_id] = (session_id, time.monotonic() + self.ttl)
+
+    def invalidate(self, employee_id):
+        if self.redis is not None:
+            try:
+                self.redis.delete(REDIS_KEY.format(employee_id))
+            except redis.RedisError:
+                logger.warning("Redis unavailable, active session not invalidated", exc_info=True)
+
+        with self._lock:
+            self._entries.pop(employee_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def get_session_cache():
+    """Active session cache for the current app (created once per app)"""
+    cache = current_app.extensions.get('active_session_cache')
+    if cache is None:
+        redis_url = current_app.config.get('REDIS_URL')
+        client = None
+        if redis_url:
+            if redis is None:
+                logger.warning("REDIS_URL is set but the redis package is not installed; caching in process")
+            else:
+                client = redis.Redis.from_url(redis_url)
+        cache = ActiveSessionCache(ttl=current_app.config.get('ACTIVE_SESSION_CACHE_TTL', 10), redis_client=client)
+        current_app.extensions['active_session_cache'] = cache
+    return cache
+
+
+def find_active_session(employee_id):
+    """The employee's active MonitoringSession straight from the database, or None"""
+    return MonitoringSession.query.filter_by(employee_id=employee_id, is_active=True).first()
+
+
+def get_active_session_id(employee_id):
+    """Id of the employee's active session (cached), or None"""
+    cache = get_session_cache()
+    session_id = cache.get(employee_id)
+    if session_id is not None:
+        return session_id
+
+    session = find_active_session(employee_id)
+    if session is None:
+        return None
+    cache.set(employee_id, session.id)
+    return session.id
+
+
+def invalidate_active_session(employee_id):
+    """Forget the cached active session after a start or stop"""
+    get_session_cache().invalidate(employee_id)
+
+
+def session_deleted(employee_id, session_id):
+    """
+    Whether session_id no longer exists (after an insert into it failed); if so
+    the cached id is dropped so get_active_session_id resolves the session again
+    """
+    if db.session.query(MonitoringSession.id).filter_by(id=session_id).first() is not None:
+        return False
+    invalidate_active_session(employee_id)
+    return True
@@ -0,0 +1,107 @@
+"""
+Session Summaries
+A compact row per session (activity and screenshot counts, active seconds, the
+busiest applications, screenshots and time per folder) so session lists can show
+stats without loading the session's activities and screenshots.
+
+Every refresh recomputes the summary from the session's rows with two GROUP BY
+queries over the session_id indexes, so it never depends on the order in which
+rows were committed and a refresh can't lose counts an earlier one had merged.
+stop_session computes the final summary. Listing sessions recomputes the
+summaries of the active sessions on the page once they are older than
+SESSION_SUMMARY_MAX_AGE, so ingest never pays for it and a busy list recomputes
+each running session at most once per interval; backfill_session_summaries.py
+--active refreshes the ones nobody lists. Archiving summarizes a session before
+its rows leave the hot tables; archived sessions are never recomputed from the
+(empty) hot tables.
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_
+from models import db, Activity, Employee, MonitoringSession, Organization, Screenshot, SessionSummary
+
+TRACKED_APPLICATIONS = 50  # Applications kept per summary; to_dict shows the top 10
+
+
+def _screenshot_interval(session):
+    return db.session.query(Organization.screenshot_interval).join(
+        Employee, Employee.organization_id == Organization.id
+    ).filter(Employee.id == session.employee_id).scalar() or 10
+
+
+def summarize_session(session):
+    """
+    Create or recompute a session's summary from all of its rows (the caller commits)
+
+    The summary is marked final once the session has stopped. Archived sessions
+    keep the summary they have.
+    """
+    summary = db.session.get(SessionSummary, session.id)
+    if session.archived_at is not None and summary is not None:
+        return summary
+    if summary is None:
+        summary = SessionSummary(session_id=session.id)
+        db.session.add(summary)
+
+    app_name = func.coalesce(Activity.application_name, Activity.url, 'Unknown')
+    applications = {}
+    summary.activity_count = summary.active_seconds = 0
+    for name, count, seconds in db.session.query(
+        app_name, func.count(Activity.id), func.coalesce(func.sum(Activity.duration_seconds), 0)
+    ).filter(Activity.session_id == session.id).group_by(app_name):
+        applications[name] = [count, int(seconds)]
+        summary.activity_count += count
+        summary.active_seconds += int(seconds)
+    busiest = sorted(applications.items(), key=lambda item: item[1][1], reverse=True)[:TRACKED_APPLICATIONS]
+
+    interval = _screenshot_interval(session)
+    folders = {}
+    summary.screenshot_count = 0
+    for folder, count in db.session.query(
+        Screenshot.folder_name, func.count(Screenshot.id)
+    ).filter(Screenshot.session_id == session.id).group_by(Screenshot.folder_name):
+        previous_count, previous_seconds = folders.get(folder or '', (0, 0))
+        folders[folder or ''] = [previous_count + count, previous_seconds + count * interval]
+        summary.screenshot_count += count
+
+    # New dicts so the JSON columns are written back
+    summary.applications = dict(busiest)
+    summary.folders = folders
+    summary.is_final = not session.is_active
+    summary.updated_at = datetime.utcnow()
+    return summary
+
+
+def summarize_sessions(query, batch_size=100):
+    """Summarize every session in query, committing a batch at a time; returns the number summarized"""
+    summarized = 0
+    last_id = 0
+    while True:
+        batch = query.filter(MonitoringSession.id > last_id).order_by(MonitoringSession.id).limit(batch_size).all()
+        if not batch:
+            break
+        last_id = batch[-1].id
+        for session in batch:
+            summarize_session(session)
+        db.session.commit()
+        summarized += len(batch)
+    return summarized
+
+
+def refresh_active_summaries(session_ids, max_age):
+    """
+    Recompute the summaries of the active sessions among session_ids (a query of
+    session ids) that have none or one older than max_age seconds, and commit;
+    returns the number refreshed
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    stale = MonitoringSession.query.outerjoin(SessionSummary).filter(
+        MonitoringSession.id.in_(session_ids.subquery()),
+        MonitoringSession.is_active.is_(True),
+        or_(SessionSummary.updated_at.is_(None), SessionSummary.updated_at < cutoff)
+    ).all()
+    for session in stale:
+        summarize_session(session)
+    if stale:
+        db.session.commit()
+    return len(stale)
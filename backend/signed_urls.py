@@ -0,0 +1,59 @@
+"""
+Signed Screenshot URLs
+List responses carry short-lived URLs for each screenshot's file and renditions:
+
+    /api/screenshots/<id>/signed/<size>?expires=<unix time>&sig=<HMAC-SHA256>
+
+Anyone holding one can fetch that image until it expires, without a JWT, so
+<img> tags and new tabs work without putting the access token in the URL. The
+route only checks the signature and looks the row up by primary key; behind
+nginx with SCREENSHOT_ACCEL_REDIRECT set it answers with an X-Accel-Redirect and
+nginx sends the blob file itself (S3 blobs are redirected to a presigned URL).
+
+Expiry is rounded up to a SCREENSHOT_URL_TTL boundary, so a screenshot's URL stays
+the same across list calls within a window and the browser cache keeps working.
+"""
+
+import base64
+import hashlib
+import hmac
+import time
+from flask import current_app, request
+from renditions import RENDITIONS
+
+SIZES = ['original'] + list(RENDITIONS)
+
+
+def _secret():
+    config = current_app.config
+    return (config.get('SCREENSHOT_URL_SECRET') or config['SECRET_KEY']).encode()
+
+
+def signature(screenshot_id, size, expires):
+    digest = hmac.new(_secret(), f'{screenshot_id}:{size}:{expires}'.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+def signed_url(screenshot_id, size='original', now=None):
+    """Absolute signed URL of a screenshot (size 'original', 'thumb' or 'preview')"""
+    ttl = current_app.config.get('SCREENSHOT_URL_TTL', 3600)
+    expires = (int(now or time.time()) // ttl + 2) * ttl  # valid for at least ttl seconds
+    base = current_app.config.get('SCREENSHOT_URL_BASE') or request.host_url
+    return (f"{base.rstrip('/')}/api/screenshots/{screenshot_id}/signed/{size}"
+            f"?expires={expires}&sig={signature(screenshot_id, size, expires)}")
+
+
+def signed_urls(screenshot_id):
+    """The 'url', 'thumb_url' and 'preview_url' fields of a screenshot in list responses"""
+    return {('url' if size == 'original' else f'{size}_url'): signed_url(screenshot_id, size) for size in SIZES}
+
+
+def verify_signature(screenshot_id, size, expires, sig, now=None):
+    """True if sig was issued for this screenshot and size and hasn't expired"""
+    try:
+        expires = int(expires)
+    except (TypeError, ValueError):
+        return False
+    if expires < (now or time.time()) or not sig:
+        return False
+    return hmac.compare_digest(sig, signature(screenshot_id, size, expires))
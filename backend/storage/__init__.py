@@ -0,0 +1,134 @@
+"""
+Screenshot storage
+Every route that touches Screenshot.file_path goes through these helpers, which
+understand both blob references (served by the configured backend) and legacy
+absolute paths written before content-addressed storage existed.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import closing, contextmanager
+from flask import Response, current_app, request, send_file
+from storage.base import StorageBackend
+from storage.blobs import make_ref, parse_ref, acquire_blob, release_blob, collect_garbage
+
+
+def create_storage(config):
+    """Build the storage backend selected by SCREENSHOT_STORAGE"""
+    backend = config.get('SCREENSHOT_STORAGE', 'local')
+    root = config['SCREENSHOT_FOLDER']
+
+    if backend == 'local':
+        from storage.local import LocalStorage
+        return LocalStorage(os.path.join(root, 'blobs'), accel_redirect=config.get('SCREENSHOT_ACCEL_REDIRECT'))
+
+    if backend == 'packfile':
+        from storage.packfile import PackfileStorage
+        return PackfileStorage(os.path.join(root, 'packs'),
+                               segment_max_bytes=config.get('PACKFILE_SEGMENT_MAX_BYTES', 1024 * 1024 * 1024))
+
+    if backend == 's3':
+        from storage.s3 import S3Storage
+        return S3Storage(
+            bucket=config['S3_BUCKET'],
+            tmp_dir=os.path.join(root, 'tmp'),
+            prefix=config.get('S3_PREFIX', 'screenshots'),
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region_name=config.get('S3_REGION'),
+            access_key_id=config.get('S3_ACCESS_KEY_ID'),
+            secret_access_key=config.get('S3_SECRET_ACCESS_KEY')
+        )
+
+    raise ValueError(f"Unknown SCREENSHOT_STORAGE backend: {backend}")
+
+
+def get_storage():
+    """Storage backend for the current app (created once per app)"""
+    storage = current_app.extensions.get('screenshot_storage')
+    if storage is None:
+        storage = create_storage(current_app.config)
+        current_app.extensions['screenshot_storage'] = storage
+    return storage
+
+
+def screenshot_exists(file_path):
+    digest = parse_ref(file_path)
+    if digest:
+        return get_storage().exists(digest)
+    return bool(file_path) and os.path.exists(file_path)
+
+
+def cache_immutable(response):
+    """Let the browser keep a screenshot response: stored bytes never change"""
+    response.cache_control.private = True
+    response.cache_control.max_age = current_app.config.get('SCREENSHOT_CACHE_MAX_AGE', 31536000)
+    response.cache_control.immutable = True
+    return response
+
+
+def not_modified(file_path):
+    """
+    304 response if the client already holds this blob (If-None-Match), else None
+
+    Lets a revalidating browser be answered without touching storage.
+    """
+    digest = parse_ref(file_path)
+    if digest and request.if_none_match.contains(digest):
+        response = Response(status=304)
+        response.set_etag(digest)
+        return cache_immutable(response)
+    return None
+
+
+def send_screenshot(file_path, mimetype='image/png', offload=False):
+    """
+    Response streaming a screenshot's bytes, with validators for conditional and range requests
+
+    With offload, blobs are handed to nginx or the object store when the backend can.
+    """
+    digest = parse_ref(file_path)
+    if digest:
+        storage = get_storage()
+        response = storage.offload(digest, mimetype) if offload else None
+        if response is not None and response.status_code != 200:
+            return response  # Redirect to a presigned URL, which must not be cached past its expiry
+        return cache_immutable(response or storage.send(digest, mimetype))
+    return cache_immutable(send_file(file_path, mimetype=mimetype, conditional=True))
+
+
+@contextmanager
+def local_screenshot_copy(file_path):
+    """
+    Yield a local filesystem path for a screenshot (e.g. for OCR)
+
+    Local blobs and legacy files are used in place; remote blobs are
+    downloaded to a temp file that is removed afterwards.
+    """
+    digest = parse_ref(file_path)
+    if not digest:
+        yield file_path
+        return
+
+    storage = get_storage()
+    path = storage.local_path(digest)
+    if path:
+        yield path
+        return
+
+    fd, temp_path = tempfile.mkstemp(dir=storage.tmp_dir, suffix='.png')
+    try:
+        with os.fdopen(fd, 'wb') as out, closing(storage.open(digest)) as src:
+            shutil.copyfileobj(src, out)
+        yield temp_path
+    finally:
+        os.unlink(temp_path)
+
+
+def release_screenshot_file(file_path):
+    """Release a screenshot's stored bytes (blob reference or legacy path)"""
+    digest = parse_ref(file_path)
+    if digest:
+        release_blob(digest)
+    elif file_path and os.path.exists(file_path):
+        os.unlink(file_path)
@@ -0,0 +1,108 @@
+"""
+Screenshot storage backend interface
+Backends store immutable blobs addressed by the SHA-256 of their contents
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import closing
+from flask import Response, request, send_file, stream_with_context
+
+CHUNK_SIZE = 64 * 1024
+
+
+class StorageBackend:
+    """
+    Base class for screenshot storage backends
+
+    Uploads are streamed once into a local temp file while being hashed
+    (write_temp), then handed to the backend under their digest (publish).
+    Subclasses implement publish/exists/open/delete and may expose local_path.
+    """
+
+    name = 'base'
+
+    def __init__(self, tmp_dir):
+        self.tmp_dir = tmp_dir
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    @staticmethod
+    def key_for(digest):
+        """Sharded key of a blob: two levels of 256 prefixes each"""
+        return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def write_temp(self, stream):
+        """
+        Copy a stream to a temp file, hashing it on the way through
+
+        Returns (temp_path, digest, size). The bytes are only read once.
+        """
+        hasher = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=self.tmp_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    hasher.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+        return temp_path, hasher.hexdigest(), size
+
+    def discard(self, temp_path):
+        if temp_path and os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+    def publish(self, temp_path, digest):
+        """Move a hashed temp file into the backend under its digest"""
+        raise NotImplementedError
+
+    def exists(self, digest):
+        raise NotImplementedError
+
+    def open(self, digest):
+        """Binary file-like object for reading a blob"""
+        raise NotImplementedError
+
+    def delete(self, digest):
+        raise NotImplementedError
+
+    def local_path(self, digest):
+        """Filesystem path of a blob, or None if the backend isn't local"""
+        return None
+
+    def send(self, digest, mimetype):
+        """
+        Flask response streaming a blob to the client
+
+        The digest is the blob's strong ETag, so If-None-Match is answered with
+        304; local files also honour Range requests (206).
+        """
+        path = self.local_path(digest)
+        if path:
+            return send_file(path, mimetype=mimetype, etag=digest, conditional=True)
+
+        def generate():
+            with closing(self.open(digest)) as f:
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        response = Response(stream_with_context(generate()), mimetype=mimetype)
+        response.set_etag(digest)
+        return response.make_conditional(request)
+
+    def offload(self, digest, mimetype):
+        """
+        Response handing the blob's bytes to something other than this worker
+        (front-end server or object store), or None if the backend can't
+        """
+        return None
@@ -0,0 +1,98 @@
+"""
+Content-addressed blob references and reference counting
+Screenshot.file_path holds a blob reference ("sha256:<hex>") and ScreenshotBlob rows
+count the screenshots pointing at each blob, so identical images are stored once
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy import case
+from sqlalchemy.exc import IntegrityError
+from models import db, ScreenshotBlob
+
+BLOB_REF_PREFIX = 'sha256:'
+
+
+def make_ref(digest):
+    """Blob reference stored in Screenshot.file_path"""
+    return f"{BLOB_REF_PREFIX}{digest}"
+
+
+def parse_ref(file_path):
+    """Return the digest for a blob reference, or None for a legacy file path"""
+    if file_path and file_path.startswith(BLOB_REF_PREFIX):
+        return file_path[len(BLOB_REF_PREFIX):]
+    return None
+
+
+def acquire_blob(digest, size, count=1):
+    """
+    Add count references to a blob inside the current transaction
+
+    Must run before the blob is published, so that a concurrent garbage
+    collection of the same digest is serialized on the row lock.
+    Returns True if this is the first reference.
+    """
+    updated = ScreenshotBlob.query.filter_by(digest=digest).update(
+        {ScreenshotBlob.ref_count: ScreenshotBlob.ref_count + count,
+         ScreenshotBlob.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+    if updated:
+        return False
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(ScreenshotBlob(digest=digest, size=size, ref_count=count))
+        return True
+    except IntegrityError:
+        # Another upload of the same content inserted it first
+        ScreenshotBlob.query.filter_by(digest=digest).update(
+            {ScreenshotBlob.ref_count: ScreenshotBlob.ref_count + count,
+             ScreenshotBlob.updated_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        return False
+
+
+def release_blob(digest, count=1):
+    """
+    Drop count references to a blob inside the current transaction
+
+    Unreferenced blobs are left for collect_garbage() so that an identical
+    upload arriving in the meantime can reuse them.
+    """
+    ScreenshotBlob.query.filter(
+        ScreenshotBlob.digest == digest,
+        ScreenshotBlob.ref_count > 0
+    ).update(
+        {ScreenshotBlob.ref_count: case((ScreenshotBlob.ref_count > count, ScreenshotBlob.ref_count - count), else_=0),
+         ScreenshotBlob.updated_at: datetime.utcnow()},
+        synchronize_session=False
+    )
+
+
+def collect_garbage(storage, grace_seconds=3600, limit=1000):
+    """
+    Delete blobs that have had no references for longer than the grace period
+
+    Each row is deleted and its blob removed before the commit, so an upload
+    of the same content blocks on the row until the blob is gone and then
+    re-creates both. Returns the number of blobs removed.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+    candidates = [row.digest for row in db.session.query(ScreenshotBlob.digest).filter(
+        ScreenshotBlob.ref_count <= 0,
+        ScreenshotBlob.updated_at < cutoff
+    ).limit(limit).all()]
+
+    removed = 0
+    for digest in candidates:
+        deleted = ScreenshotBlob.query.filter(
+            ScreenshotBlob.digest == digest,
+            ScreenshotBlob.ref_count <= 0
+        ).delete(synchronize_session=False)
+        if deleted:
+            storage.delete(digest)
+            removed += 1
+        db.session.commit()
+    return removed
@@ -0,0 +1,56 @@
+"""
+Local filesystem storage backend
+Blobs live under <root>/<aa>/<bb>/<sha256>, so no directory grows past 256 entries
+at the first two levels however many screenshots a folder collects
+"""
+
+import os
+from flask import Response
+from storage.base import StorageBackend
+
+
+class LocalStorage(StorageBackend):
+    name = 'local'
+
+    def __init__(self, root, accel_redirect=None):
+        """
+        Initialize with the directory blobs are sharded under, and optionally the
+        nginx internal location serving that directory (for X-Accel-Redirect)
+        """
+        self.root = root
+        self.accel_redirect = accel_redirect
+        super().__init__(os.path.join(root, 'tmp'))
+
+    def path_for(self, digest):
+        return os.path.join(self.root, *self.key_for(digest).split('/'))
+
+    def publish(self, temp_path, digest):
+        """Atomically rename a hashed temp file into its content address"""
+        final_path = self.path_for(digest)
+        os.makedirs(os.path.dirname(final_path), exist_ok=True)
+        # Identical content may already be there; replacing it is harmless
+        os.replace(temp_path, final_path)
+        return final_path
+
+    def exists(self, digest):
+        return os.path.exists(self.path_for(digest))
+
+    def open(self, digest):
+        return open(self.path_for(digest), 'rb')
+
+    def delete(self, digest):
+        path = self.path_for(digest)
+        if os.path.exists(path):
+            os.unlink(path)
+
+    def local_path(self, digest):
+        return self.path_for(digest)
+
+    def offload(self, digest, mimetype):
+        """Empty response telling nginx to send the blob file (X-Accel-Redirect)"""
+        if not self.accel_redirect:
+            return None
+        response = Response(mimetype=mimetype)
+        response.headers['X-Accel-Redirect'] = f"{self.accel_redirect.rstrip('/')}/{self.key_for(digest)}"
+        response.set_etag(digest)
+        return response
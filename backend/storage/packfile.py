@@ -0,0 +1,399 @@
+"""
+Packfile segment storage backend
+Screenshots are appended to large per-day segment files instead of one file each:
+
+    <root>/segments/YYYY/MM/DD/segment-000001.pack   concatenated blob bytes
+    <root>/segments/YYYY/MM/DD/segment-000001.idx    fixed-size index records
+
+Each index record is (sha256, offset, length, flag); a later record for the same
+digest wins and a tombstone flag marks it deleted. Reads are served from mmap
+slices of the segment. compact() rewrites old segments without deleted entries.
+Appends, tombstones and compaction all take an exclusive flock on the segment so
+several gunicorn workers can share one store. Segment numbers only ever grow
+(<day>/segments.seq holds the last one handed out), so a path always names the
+same bytes and a mapping or index entry of a compacted segment is never reused.
+"""
+
+import io
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import Response, request
+from storage.base import StorageBackend, CHUNK_SIZE
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: in-process locking only
+    fcntl = None
+
+RECORD = struct.Struct('>32sQIB')
+FLAG_LIVE = 0
+FLAG_DELETED = 1
+SEGMENT_RE = re.compile(r'^segment-(\d{6})\.pack$')
+SEQUENCE_FILE = 'segments.seq'
+RECENT_DAYS = 2  # Publishers append to today's segments (yesterday's around midnight)
+MTIME_SLACK_NS = 2 * 10**9  # Directories changed this recently are listed again on the next scan
+
+
+def _lock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def read_index(idx_path, start=0):
+    """Read complete index records from byte offset start; returns (records, end_offset)"""
+    with open(idx_path, 'rb') as f:
+        f.seek(start)
+        data = f.read()
+    usable = len(data) - len(data) % RECORD.size
+    records = [RECORD.unpack_from(data, pos) for pos in range(0, usable, RECORD.size)]
+    return [(raw.hex(), offset, length, flag) for raw, offset, length, flag in records], start + usable
+
+
+class PackfileStorage(StorageBackend):
+    name = 'packfile'
+
+    def __init__(self, root, segment_max_bytes=1024 * 1024 * 1024):
+        self.root = root
+        self.segments_dir = os.path.join(root, 'segments')
+        self.segment_max_bytes = segment_max_bytes
+        super().__init__(os.path.join(root, 'tmp'))
+        os.makedirs(self.segments_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._index = {}          # digest -> (segment_path, offset, length)
+        self._idx_positions = {}  # idx_path -> bytes already applied
+        self._maps = {}           # segment_path -> mmap
+        self._dirs = {}           # directory -> (mtime_ns, subdirectories) when last listed
+
+    # ----- Layout -----
+
+    @staticmethod
+    def idx_path_for(segment_path):
+        return segment_path[:-len('.pack')] + '.idx'
+
+    def day_dir(self, day):
+        return os.path.join(self.segments_dir, day.strftime('%Y'), day.strftime('%m'), day.strftime('%d'))
+
+    def segments_in(self, day_dir):
+        """Segment paths in a day directory, oldest first"""
+        if not os.path.isdir(day_dir):
+            return []
+        names = sorted(name for name in os.listdir(day_dir) if SEGMENT_RE.match(name))
+        return [os.path.join(day_dir, name) for name in names]
+
+    def next_segment_path(self, day_dir):
+        """A segment path never handed out before in this day directory"""
+        with open(os.path.join(day_dir, SEQUENCE_FILE), 'a+') as seq:
+            _lock(seq)
+            try:
+                seq.seek(0)
+                number = int(seq.read().strip() or 0)
+                segments = self.segments_in(day_dir)
+                if segments:
+                    number = max(number, int(SEGMENT_RE.match(os.path.basename(segments[-1])).group(1)))
+                number += 1
+                seq.truncate(0)
+                seq.write(str(number))
+            finally:
+                _unlock(seq)
+        return os.path.join(day_dir, f'segment-{number:06d}.pack')
+
+    def active_segment(self, day_dir):
+        """(segment new blobs are appended to, whether it is a new one), rolling over once it is full"""
+        segments = self.segments_in(day_dir)
+        if segments and os.path.getsize(segments[-1]) < self.segment_max_bytes:
+            return segments[-1], False
+        return self.next_segment_path(day_dir), True
+
+    @staticmethod
+    def open_segment(segment_path, create=False):
+        """
+        A segment opened for appending under its flock, None if it doesn't exist
+        or was compacted away while waiting for the lock
+
+        Only new segments are created: reopening a compacted path would bring it back.
+        """
+        flags = os.O_WRONLY | os.O_APPEND | (os.O_CREAT if create else 0)
+        try:
+            out = os.fdopen(os.open(segment_path, flags, 0o644), 'ab')
+        except FileNotFoundError:
+            return None
+        _lock(out)
+        if os.fstat(out.fileno()).st_nlink == 0:
+            out.close()  # Also releases the lock
+            return None
+        return out
+
+    def all_index_files(self):
+        for dirpath, _, filenames in os.walk(self.segments_dir):
+            for name in sorted(filenames):
+                if name.endswith('.idx'):
+                    yield os.path.join(dirpath, name)
+
+    # ----- Index -----
+
+    def _apply(self, segment_path, records):
+        for digest, offset, length, flag in records:
+            if flag == FLAG_DELETED:
+                self._index.pop(digest, None)
+            else:
+                self._index[digest] = (segment_path, offset, length)
+
+    def _read_new_records(self, idx_path):
+        start = self._idx_positions.get(idx_path, 0)
+        try:
+            if os.path.getsize(idx_path) <= start:
+                return
+        except FileNotFoundError:  # Segment created before its first record, or compacted away
+            return
+        records, end = read_index(idx_path, start)
+        self._apply(idx_path[:-len('.idx')] + '.pack', records)
+        self._idx_positions[idx_path] = end
+
+    def _changed_index_files(self):
+        """
+        Index files in directories whose mtime changed since they were last listed
+        (every index file when nothing is cached)
+
+        New segments, days and compaction output all add a file and so change a
+        directory; unchanged directories cost one stat and are not listed.
+        """
+        found = []
+        pending = [self.segments_dir]
+        while pending:
+            path = pending.pop()
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                self._dirs.pop(path, None)
+                continue
+            cached = self._dirs.get(path)
+            if cached and cached[0] == mtime:
+                pending.extend(cached[1])
+                continue
+            subdirs = []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_dir():
+                        subdirs.append(entry.path)
+                    elif entry.name.endswith('.idx'):
+                        found.append(entry.path)
+            pending.extend(subdirs)
+            # A file added within the mtime granularity wouldn't change it again
+            if time.time_ns() - mtime > MTIME_SLACK_NS:
+                self._dirs[path] = (mtime, subdirs)
+            else:
+                self._dirs.pop(path, None)
+        return sorted(found)
+
+    def _recent_index_files(self):
+        now = datetime.utcnow()
+        return [self.idx_path_for(segment_path)
+                for days_ago in range(RECENT_DAYS)
+                for segment_path in self.segments_in(self.day_dir(now - timedelta(days=days_ago)))]
+
+    def refresh(self):
+        """Pick up index records written by other processes (or a compaction), rereading every index file"""
+        with self._lock:
+            if any(not os.path.exists(path) for path in self._idx_positions):
+                # A segment was compacted away; rebuild from scratch
+                self._index.clear()
+                self._idx_positions.clear()
+                for segment_path in [path for path in self._maps if not os.path.exists(path)]:
+                    del self._maps[segment_path]
+
+            self._dirs.clear()
+            for idx_path in self._changed_index_files():
+                self._read_new_records(idx_path)
+
+    def _refresh_changed(self):
+        """
+        Pick up new records without statting every index file: records are only
+        appended to recent days' segments, and anything else (a new segment, a
+        compaction) adds a file to its directory. Tombstones in older segments
+        wait for refresh(); a miss doesn't need them.
+        """
+        for idx_path in sorted(set(self._changed_index_files()) | set(self._recent_index_files())):
+            self._read_new_records(idx_path)
+
+    def lookup(self, digest):
+        """(segment_path, offset, length) for a live blob, or None"""
+        with self._lock:
+            entry = self._index.get(digest)
+            if entry is None:
+                self._refresh_changed()
+                entry = self._index.get(digest)
+            elif not os.path.exists(entry[0]):
+                self.refresh()  # Compacted: rebuild so the entry follows its bytes
+                entry = self._index.get(digest)
+            return entry
+
+    # ----- StorageBackend -----
+
+    def publish(self, temp_path, digest, day=None):
+        """Append a hashed temp file to today's segment (skipped if already stored)"""
+        day_dir = self.day_dir(day or datetime.utcnow())
+        os.makedirs(day_dir, exist_ok=True)
+
+        with self._lock:
+            out = None
+            while out is None:
+                segment_path, new = self.active_segment(day_dir)
+                out = self.open_segment(segment_path, create=new)
+            with out:
+                try:
+                    # Checked under the lock, so a concurrent publish of the same bytes isn't appended twice
+                    if self.lookup(digest):
+                        os.unlink(temp_path)
+                        return
+                    offset = out.seek(0, os.SEEK_END)
+                    with open(temp_path, 'rb') as src:
+                        while True:
+                            chunk = src.read(CHUNK_SIZE)
+                            if not chunk:
+                                break
+                            out.write(chunk)
+                    out.flush()
+                    length = out.tell() - offset
+                    # Index after data, so a crash in between only leaves unindexed bytes
+                    with open(self.idx_path_for(segment_path), 'ab') as idx:
+                        idx.write(RECORD.pack(bytes.fromhex(digest), offset, length, FLAG_LIVE))
+                finally:
+                    _unlock(out)
+            self._index[digest] = (segment_path, offset, length)
+
+        os.unlink(temp_path)
+
+    def exists(self, digest):
+        return self.lookup(digest) is not None
+
+    def _map(self, segment_path, end):
+        """Cached read-only mapping of a segment covering at least end bytes"""
+        mapped = self._maps.get(segment_path)
+        if mapped is None or len(mapped) < end:
+            with open(segment_path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment_path] = mapped
+        return mapped
+
+    def view(self, digest):
+        """Zero-copy memoryview of a blob's bytes"""
+        entry = self.lookup(digest)
+        if entry is None:
+            raise FileNotFoundError(digest)
+        segment_path, offset, length = entry
+        with self._lock:
+            mapped = self._map(segment_path, offset + length)
+        return memoryview(mapped)[offset:offset + length]
+
+    def open(self, digest):
+        return io.BytesIO(self.view(digest))
+
+    def send(self, digest, mimetype):
+        """Stream a blob straight out of the segment mapping (conditional and range requests too)"""
+        view = self.view(digest)
+
+        def generate():
+            for pos in range(0, len(view), CHUNK_SIZE):
+                yield view[pos:pos + CHUNK_SIZE].tobytes()
+
+        response = Response(generate(), mimetype=mimetype, direct_passthrough=True)
+        response.content_length = len(view)
+        response.set_etag(digest)
+        return response.make_conditional(request, accept_ranges=True, complete_length=len(view))
+
+    def delete(self, digest):
+        """
+        Tombstone a blob; its bytes are reclaimed by compact()
+
+        Other processes keep resolving the digest until their next refresh(),
+        which is harmless since no screenshot references it any more.
+        """
+        with self._lock:
+            while True:
+                entry = self.lookup(digest)
+                if entry is None:
+                    return
+                segment_path, _, _ = entry
+                out = self.open_segment(segment_path)
+                if out is not None:
+                    break
+                self.refresh()  # Compacted meanwhile: tombstone the entry in its new segment
+            with out:
+                try:
+                    with open(self.idx_path_for(segment_path), 'ab') as idx:
+                        idx.write(RECORD.pack(bytes.fromhex(digest), 0, 0, FLAG_DELETED))
+                finally:
+                    _unlock(out)
+            self._index.pop(digest, None)
+
+    # ----- Compaction -----
+
+    def compact(self, older_than_days=1, min_garbage_ratio=0.25):
+        """
+        Rewrite segments from days before the cutoff that are mostly garbage
+
+        Live entries are copied into a fresh segment; the old index is removed
+        before the old segment so readers never resolve to missing bytes. The
+        old segment stays locked throughout, so no tombstone or append is lost.
+        Returns (segments_rewritten, bytes_reclaimed).
+        """
+        cutoff = self.day_dir(datetime.utcnow() - timedelta(days=older_than_days))
+        rewritten = reclaimed = 0
+
+        for idx_path in list(self.all_index_files()):
+            segment_path = idx_path[:-len('.idx')] + '.pack'
+            if os.path.dirname(idx_path) >= cutoff:
+                continue
+            locked = self.open_segment(segment_path)
+            if locked is None:
+                continue
+
+            with locked:
+                try:
+                    records, _ = read_index(idx_path)
+                    live = {}
+                    for digest, offset, length, flag in records:
+                        if flag == FLAG_DELETED:
+                            live.pop(digest, None)
+                        else:
+                            live[digest] = (offset, length)
+
+                    total = os.path.getsize(segment_path)
+                    live_bytes = sum(length for _, length in live.values())
+                    if total == 0 or (total - live_bytes) / total < min_garbage_ratio:
+                        continue
+
+                    if live:
+                        new_segment = self.next_segment_path(os.path.dirname(segment_path))
+                        with self.open_segment(new_segment, create=True) as out, \
+                                open(segment_path, 'rb') as src, open(self.idx_path_for(new_segment), 'wb') as idx:
+                            for digest, (offset, length) in live.items():
+                                src.seek(offset)
+                                new_offset = out.tell()
+                                out.write(src.read(length))
+                                idx.write(RECORD.pack(bytes.fromhex(digest), new_offset, length, FLAG_LIVE))
+                            out.flush()
+                            os.fsync(out.fileno())
+                            idx.flush()
+                            os.fsync(idx.fileno())
+
+                    os.unlink(idx_path)
+                    os.unlink(segment_path)
+                finally:
+                    _unlock(locked)
+            rewritten += 1
+            reclaimed += total - live_bytes
+
+        self.refresh()
+        return rewritten, reclaimed
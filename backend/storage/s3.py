@@ -0,0 +1,67 @@
+"""
+S3-compatible storage backend
+Works with AWS S3, MinIO or any other S3 API (set S3_ENDPOINT_URL for non-AWS)
+"""
+
+import os
+from flask import redirect
+from storage.base import StorageBackend
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # Optional dependency, only needed when SCREENSHOT_STORAGE=s3
+    boto3 = None
+    ClientError = Exception
+
+
+class S3Storage(StorageBackend):
+    name = 's3'
+
+    def __init__(self, bucket, tmp_dir, prefix='screenshots', endpoint_url=None, region_name=None,
+                 access_key_id=None, secret_access_key=None, client=None):
+        if client is None and boto3 is None:
+            raise RuntimeError("boto3 is required for SCREENSHOT_STORAGE=s3 (pip install boto3)")
+
+        super().__init__(tmp_dir)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+        self.client = client or boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region_name,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key
+        )
+
+    def object_key(self, digest):
+        key = self.key_for(digest)
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def publish(self, temp_path, digest):
+        """Upload a hashed temp file and remove the local copy"""
+        self.client.upload_file(temp_path, self.bucket, self.object_key(digest))
+        os.unlink(temp_path)
+        return self.object_key(digest)
+
+    def exists(self, digest):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.object_key(digest))
+            return True
+        except ClientError as e:
+            if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+
+    def open(self, digest):
+        return self.client.get_object(Bucket=self.bucket, Key=self.object_key(digest))['Body']
+
+    def delete(self, digest):
+        self.client.delete_object(Bucket=self.bucket, Key=self.object_key(digest))
+
+    def offload(self, digest, mimetype, expires_in=300):
+        """Redirect to a presigned GET of the object"""
+        url = self.client.generate_presigned_url('get_object', Params={
+            'Bucket': self.bucket, 'Key': self.object_key(digest), 'ResponseContentType': mimetype
+        }, ExpiresIn=expires_in)
+        return redirect(url)
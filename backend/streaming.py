@@ -0,0 +1,114 @@
+"""
+Streaming JSON Responses
+A listing of a whole session used to be built as one Python list of to_dict()s
+and encoded in one go, so a worker held every row, every dict and the whole body
+at once. stream_json() writes the body while the rows are read instead:
+
+    return stream_json({'session': data, 'activities': JsonArray(stream_rows(query), Activity.to_dict)})
+
+JsonArray values are encoded one element at a time, stream_rows() fetches the
+query STREAM_BATCH_SIZE rows at a time (yield_per; a server-side cursor on
+PostgreSQL) and the body is sent in CHUNK_SIZE pieces, so memory stays flat
+however many rows there are and the first bytes go out after the first batch.
+Elements are encoded with orjson when it is installed, else the json module.
+
+stream_ndjson() does the same for newline-delimited records, optionally gzip'd.
+The status is sent before the rows are read: validate and authorize first.
+"""
+
+import json
+import zlib
+from flask import Response, stream_with_context
+
+try:
+    import orjson
+except ImportError:  # optional: the standard library encoder
+    orjson = None
+
+STREAM_BATCH_SIZE = 500
+CHUNK_SIZE = 64 * 1024
+
+
+def dumps(value):
+    """value as compact JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+class JsonArray:
+    """A JSON array written element by element while the response streams"""
+
+    def __init__(self, rows, serialize=None):
+        self.rows = rows
+        self.serialize = serialize
+
+
+def stream_rows(query, batch_size=STREAM_BATCH_SIZE):
+    """A query's rows, fetched batch_size at a time"""
+    return query.yield_per(batch_size)
+
+
+def _is_lazy(value):
+    if isinstance(value, JsonArray):
+        return True
+    if isinstance(value, dict):
+        return any(_is_lazy(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_is_lazy(v) for v in value)
+    return False
+
+
+def iter_json(value):
+    """Encode value as pieces of JSON, reading JsonArray rows only as they are written"""
+    if not _is_lazy(value):
+        yield dumps(value)
+    elif isinstance(value, dict):
+        yield b'{'
+        for i, (key, item) in enumerate(value.items()):
+            yield (b',' if i else b'') + dumps(str(key)) + b':'
+            yield from iter_json(item)
+        yield b'}'
+    else:
+        rows = value.rows if isinstance(value, JsonArray) else value
+        serialize = value.serialize if isinstance(value, JsonArray) else None
+        yield b'['
+        for i, row in enumerate(rows):
+            if i:
+                yield b','
+            yield from iter_json(serialize(row) if serialize else row)
+        yield b']'
+
+
+def _chunked(pieces, size=CHUNK_SIZE):
+    buffer = bytearray()
+    for piece in pieces:
+        buffer += piece
+        if len(buffer) >= size:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
+
+def stream_json(value, status=200):
+    """Response streaming value as JSON (JsonArray values are written as they are read)"""
+    return Response(stream_with_context(_chunked(iter_json(value))), status=status, mimetype='application/json')
+
+
+def gzip_pieces(pieces, level=6):
+    """pieces compressed as one gzip stream"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for piece in pieces:
+        data = compressor.compress(piece)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_ndjson(records, compress=False, status=200):
+    """Response streaming records as newline-delimited JSON (gzip'd with compress)"""
+    pieces = _chunked(dumps(record) + b'\n' for record in records)
+    if compress:
+        return Response(stream_with_context(gzip_pieces(pieces)), status=status, mimetype='application/gzip')
+    return Response(stream_with_context(pieces), status=status, mimetype='application/x-ndjson')
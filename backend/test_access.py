@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test the access layer: joined authorization checks and their query counts
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import os
+from contextlib import contextmanager
+from io import BytesIO
+
+import pytest
+
+from principal import get_principal_cache
+
+
+def record_screenshots(client, headers, count):
+    session_id = client.post('/api/monitoring/sessions/start', headers=headers, json={}).get_json()['session']['id']
+    ids = []
+    for i in range(count):
+        ids.append(client.post('/api/screenshots/upload', headers=headers, data={
+            'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(64)), 'screenshot.png'), 'folder_name': 'testing'
+        }).get_json()['screenshot']['id'])
+    return session_id, ids
+
+
+@pytest.fixture
+def counted_queries(app, statements):
+    """SELECTs that read sessions or employees (the authorization lookups) while the block runs"""
+    @contextmanager
+    def counted_queries():
+        with app.app_context():
+            get_principal_cache().clear()  # Count the caller's lookup too
+        with statements('employees', 'monitoring_sessions') as recorded:
+            yield recorded
+    return counted_queries
+
+
+def test_single_row_checks_take_two_queries(client, login, counted_queries):
+    owner = login('access-owner@example.com', 'Access Org').headers
+    admin = login('access-admin@example.com', 'Access Org', role='admin').headers
+    outsider = login('access-outsider@example.com', 'Other Access Org', role='admin').headers
+    session_id, (screenshot_id,) = record_screenshots(client, owner, 1)
+
+    for headers in (owner, admin):
+        with counted_queries() as statements:
+            assert client.get(f'/api/screenshots/{screenshot_id}', headers=headers).status_code == 200
+        assert len(statements) == 2  # The viewer, then the screenshot joined to its owner
+        with counted_queries() as statements:
+            assert client.get(f'/api/screenshots/session/{session_id}', headers=headers).status_code == 200
+        assert len(statements) == 2
+
+    assert client.get(f'/api/screenshots/{screenshot_id}', headers=outsider).status_code == 403
+    assert client.get(f'/api/screenshots/session/{session_id}', headers=outsider).status_code == 403
+    assert client.get(f'/api/monitoring/activities?session_id={session_id}', headers=outsider).status_code == 403
+    assert client.get('/api/screenshots/999999', headers=owner).status_code == 404
+    assert client.get('/api/screenshots/session/999999', headers=owner).status_code == 404
+    print("✓ Screenshot and session checks run as one joined query")
+
+
+def test_batch_authorization_is_one_query(client, login, counted_queries):
+    owner = login('batch-owner@example.com', 'Batch Org').headers
+    admin = login('batch-admin@example.com', 'Batch Org', role='admin').headers
+    stranger = login('batch-stranger@example.com', 'Batch Org').headers
+    _, small = record_screenshots(client, owner, 2)
+    _, large = record_screenshots(client, owner, 20)
+    _, foreign = record_screenshots(client, stranger, 3)
+
+    counts = []
+    for ids in (small, large):
+        with counted_queries() as statements:
+            response = client.post('/api/screenshots/extract/batch', headers=admin, json={'screenshot_ids': ids})
+        assert response.get_json()['processed_count'] == len(ids)
+        counts.append(len(statements))
+    assert counts[0] == counts[1] == 2  # Independent of the batch size
+
+    # An employee can only extract their own screenshots
+    response = client.post('/api/screenshots/extract/batch', headers=owner, json={'screenshot_ids': foreign})
+    assert response.get_json() == {'message': 'No valid unprocessed screenshots found'}
+    print("✓ Batch extraction authorizes every id in one query")
+
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test that organization counts and session scoping never load an organization's employees
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import tracemalloc
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event, insert
+
+from models import db, Employee
+
+EMPLOYEES = 10000
+
+
+@pytest.fixture
+def measured(statements):
+    """Statements run, Employee objects loaded and peak traced memory while the block runs"""
+    @contextmanager
+    def measured():
+        stats = {'employees_loaded': 0}
+
+        def count_load(target, context):
+            stats['employees_loaded'] += 1
+
+        event.listen(Employee, 'load', count_load)
+        tracemalloc.start()
+        try:
+            with statements() as recorded:
+                yield stats
+        finally:
+            stats['statements'] = len(recorded)
+            stats['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            event.remove(Employee, 'load', count_load)
+    return measured
+
+
+def test_large_organization_counts_and_sessions(app, client, login, measured):
+    admin, me, _ = login('aggregate-admin@example.com', 'Aggregate Org', role='admin')
+    org_id = me['organization_id']
+    with app.app_context():
+        db.session.execute(insert(Employee), [
+            {'email': f'bulk-{i}@aggregate.example.com', 'name': f'Bulk {i}', 'password_hash': 'x',
+             'organization_id': org_id, 'role': 'employee'}
+            for i in range(EMPLOYEES)
+        ])
+        db.session.commit()
+    session_id = client.post('/api/monitoring/sessions/start', headers=admin, json={}).get_json()['session']['id']
+    client.get(f'/api/organizations/{org_id}', headers=admin)  # Warm the principal cache
+
+    with measured() as stats:
+        organizations = client.get('/api/organizations/', headers=admin).get_json()
+    assert next(o for o in organizations if o['id'] == org_id)['employee_count'] == EMPLOYEES + 1
+    assert stats['statements'] == 1 and stats['employees_loaded'] == 0
+    assert stats['peak_bytes'] < 2 * 1024 * 1024, stats
+
+    with measured() as stats:
+        organization = client.get(f'/api/organizations/{org_id}', headers=admin).get_json()
+    assert organization['employee_count'] == EMPLOYEES + 1
+    assert stats['statements'] == 2 and stats['employees_loaded'] == 0  # The row, then its COUNT
+
+    client.get('/api/monitoring/sessions', headers=admin)  # Summarize the running session
+    with measured() as stats:
+        sessions = client.get('/api/monitoring/sessions', headers=admin).get_json()
+    assert [s['id'] for s in sessions] == [session_id]
+    assert stats['statements'] == 2 and stats['employees_loaded'] == 0  # Stale summaries, then the page
+    assert stats['peak_bytes'] < 2 * 1024 * 1024, stats
+    print(f"✓ {EMPLOYEES} employees counted and scoped in SQL without loading them")
+
+
+def test_session_scoping_unchanged(client, login):
+    admin = login('scope-admin@example.com', 'Scope Org', role='admin').headers
+    user, employee, _ = login('scope-user@example.com', 'Scope Org')
+    outsider, stranger, _ = login('scope-outsider@example.com', 'Other Scope Org')
+    own = client.post('/api/monitoring/sessions/start', headers=user, json={}).get_json()['session']['id']
+    foreign = client.post('/api/monitoring/sessions/start', headers=outsider, json={}).get_json()['session']['id']
+
+    assert [s['id'] for s in client.get('/api/monitoring/sessions', headers=user).get_json()] == [own]
+    admin_view = [s['id'] for s in client.get('/api/monitoring/sessions', headers=admin).get_json()]
+    assert own in admin_view and foreign not in admin_view
+    by_employee = client.get(f"/api/monitoring/sessions?employee_id={employee['id']}", headers=admin).get_json()
+    assert [s['id'] for s in by_employee] == [own]
+    assert client.get(f"/api/monitoring/sessions?employee_id={stranger['id']}", headers=admin).status_code == 403
+    assert client.get('/api/monitoring/sessions?employee_id=999999', headers=admin).status_code == 403
+    print("✓ Session listings keep their organization and ownership scoping")
+
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test async ingest (INGEST_MODE=async): 202 responses, batched writes, replays and draining
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import os
+import uuid
+from io import BytesIO
+
+from models import db, Activity, MonitoringSession, Screenshot, ScreenshotBlob
+from storage import get_storage, make_ref, parse_ref
+from ingest_writer import BatchWriter, get_ingest_writer
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'async batch' * 500
+
+
+def async_mode(app, enabled):
+    app.config['INGEST_MODE'] = 'async' if enabled else 'sync'
+
+
+def test_async_activities_are_batched(app, client, login):
+    headers, _, session_id = login('async-activity@example.com', start=True)
+    other, _, other_session_id = login('async-activity-other@example.com', start=True)
+    keys = [str(uuid.uuid4()) for _ in range(40)]
+    async_mode(app, True)
+    try:
+        for i, key in enumerate(keys + keys[:5]):  # then retry the first five
+            response = client.post('/api/monitoring/activities', headers=headers, json={
+                'activity_type': 'application', 'application_name': 'Editor', 'idempotency_key': key
+            })
+            if i < len(keys):
+                assert response.status_code == 202, response.get_data(as_text=True)
+                assert response.get_json()['id'] is None
+            else:
+                # Queued again (dropped by the writer) or already written (200)
+                assert response.status_code in (200, 202)
+        for key in keys[:5]:  # Another employee's keys never collide with these
+            client.post('/api/monitoring/activities', headers=other, json={
+                'activity_type': 'application', 'application_name': 'Mail', 'idempotency_key': key
+            })
+
+        with app.app_context():
+            get_ingest_writer().flush()
+    finally:
+        async_mode(app, False)
+
+    with app.app_context():
+        assert Activity.query.filter_by(session_id=session_id).count() == 40
+        assert Activity.query.filter_by(session_id=other_session_id).count() == 5
+
+    # Once written, a replay is answered from the database as in sync mode
+    response = client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'application', 'idempotency_key': keys[0]
+    })
+    assert response.status_code == 200
+    print("✓ Async activities written once per idempotency key")
+
+
+def test_async_screenshots_publish_after_commit(app, client, login):
+    headers, _, session_id = login('async-screenshot@example.com', start=True)
+    key = str(uuid.uuid4())
+    async_mode(app, True)
+    try:
+        for idempotency_key in (key, key, None):
+            response = client.post('/api/screenshots/upload', headers=headers, data={
+                'file': (BytesIO(IMAGE), 'screenshot.png'),
+                'folder_name': 'testing',
+                **({'idempotency_key': idempotency_key} if idempotency_key else {})
+            })
+            assert response.status_code == 202, response.get_data(as_text=True)
+
+        with app.app_context():
+            get_ingest_writer().flush()
+    finally:
+        async_mode(app, False)
+
+    with app.app_context():
+        screenshots = Screenshot.query.filter_by(session_id=session_id).all()
+        assert len(screenshots) == 2
+        digest = parse_ref(screenshots[0].file_path)
+        assert db.session.get(ScreenshotBlob, digest).ref_count == 2
+        store = get_storage()
+        assert store.exists(digest)
+        assert os.listdir(store.tmp_dir) == []
+    print("✓ Async screenshots committed before their blob is published")
+
+
+def test_stop_drains_queue(app, login):
+    _, employee, session_id = login('async-drain@example.com', start=True)
+    writer = BatchWriter(app, batch_size=1000, flush_interval=0.2)
+    for i in range(25):
+        writer.enqueue(Activity, {
+            'session_id': session_id, 'activity_type': 'website', 'url': f'https://example.com/{i}',
+            'idempotency_key': f'drain-{i}'
+        }, employee_id=employee['id'])
+    writer.stop()
+
+    assert writer.pending() == 0
+    with app.app_context():
+        assert Activity.query.filter_by(session_id=session_id).count() == 25
+    print("✓ Stopping the writer drains queued rows")
+
+
+def test_deleted_session_does_not_drop_the_batch(app, login):
+    _, employee, deleted_id = login('async-deleted@example.com', start=True)
+    _, other, other_session_id = login('async-deleted-other@example.com', start=True)
+    with app.app_context():
+        db.session.get(MonitoringSession, deleted_id).is_active = False
+        current = MonitoringSession(employee_id=employee['id'])
+        db.session.add(current)
+        db.session.commit()
+        current_id = current.id
+        db.session.query(MonitoringSession).filter_by(id=deleted_id).delete()
+        db.session.commit()
+
+    # Queued with the stale cached id alongside another employee's row
+    writer = BatchWriter(app, batch_size=1000, flush_interval=0.2)
+    writer.enqueue(Activity, {'session_id': deleted_id, 'activity_type': 'application'}, employee_id=employee['id'])
+    writer.enqueue(Activity, {'session_id': other_session_id, 'activity_type': 'application'},
+                   employee_id=other['id'])
+    writer.stop()
+
+    with app.app_context():
+        assert Activity.query.filter_by(session_id=current_id).count() == 1
+        assert Activity.query.filter_by(session_id=other_session_id).count() == 1
+    print("✓ Rows for a deleted session move to the active one without failing the batch")
+
+
+def test_failed_publish_does_not_reinsert(app, login):
+    session_id = login('async-publish-failure@example.com', start=True).session_id
+    with app.app_context():
+        store = get_storage()
+        content = IMAGE + b'publish failure'
+        temp_path, digest, size = store.write_temp(BytesIO(content))
+        publish, calls = store.publish, []
+
+        def flaky_publish(path, blob_digest):
+            calls.append(blob_digest)
+            if len(calls) == 1:
+                raise OSError('storage unavailable')
+            publish(path, blob_digest)
+
+        store.publish = flaky_publish
+        try:
+            writer = BatchWriter(app)
+            writer.enqueue(Screenshot, {
+                'session_id': session_id, 'file_path': make_ref(digest), 'file_size': size,
+                'folder_name': 'testing'  # no idempotency key: a re-insert would duplicate it
+            }, temp_path)
+            writer.stop()
+        finally:
+            store.publish = publish
+
+        assert Screenshot.query.filter_by(session_id=session_id).count() == 1
+        assert len(calls) == 2 and store.exists(digest)
+    print("✓ A failed publish is retried without inserting the batch again")
+
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Test bulk employee/session deletion jobs
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+from io import BytesIO
+
+from sqlalchemy import event
+from models import db, Employee, MonitoringSession, Activity, Screenshot, ScreenshotBlob, DeletionJob
+from deletion import get_deletion_executor, create_deletion_job, run_deletion_job
+from storage import parse_ref
+
+SHARED_IMAGE = b'\x89PNG\r\n\x1a\n' + b'shared desktop' * 500
+
+
+def record(client, headers, sessions, per_session, stop=True):
+    """Record sessions with activities and screenshots (one shared image each)"""
+    for s in range(sessions):
+        client.post('/api/monitoring/sessions/start', headers=headers, json={})
+        for i in range(per_session):
+            client.post('/api/monitoring/activities', headers=headers, json={
+                'activity_type': 'application', 'application_name': f'App {i}'
+            })
+            image = SHARED_IMAGE if i == 0 else SHARED_IMAGE + f'{headers}{s}-{i}'.encode()
+            client.post('/api/screenshots/upload', headers=headers, data={
+                'file': (BytesIO(image), 'screenshot.png'), 'folder_name': 'testing'
+            })
+        if stop or s < sessions - 1:
+            client.post('/api/monitoring/sessions/stop', headers=headers)
+
+
+def wait_for_jobs(app):
+    # The executor runs jobs one at a time, so an empty task queues behind them
+    with app.app_context():
+        get_deletion_executor().submit(lambda: None).result()
+
+
+def test_delete_employee_in_background(app, client, login):
+    admin, me, _ = login('deleter@example.com', 'Deletion Org', role='admin')
+    heavy, heavy_employee, _ = login('heavy@example.com', 'Deletion Org')
+    keeper = login('keeper@example.com', 'Deletion Org').headers
+    record(client, heavy, sessions=3, per_session=4, stop=False)  # Last session still active
+    record(client, keeper, sessions=1, per_session=1)
+    heavy_id = heavy_employee['id']
+    app.config['DELETION_BATCH_SIZE'] = 2
+    with app.app_context():
+        heavy_digests = {parse_ref(path) for (path,) in db.session.query(Screenshot.file_path)
+                         .join(MonitoringSession).filter(MonitoringSession.employee_id == heavy_id)}
+
+    loaded = []
+    def count_loads(target, context):
+        loaded.append(target)
+    event.listen(Activity, 'load', count_loads)
+    event.listen(Screenshot, 'load', count_loads)
+    try:
+        response = client.delete(f'/api/employees/{heavy_id}', headers=admin)
+        assert response.status_code == 202, response.get_json()
+        job = response.get_json()['job']
+        assert job['total_sessions'] == 3
+        wait_for_jobs(app)
+    finally:
+        event.remove(Activity, 'load', count_loads)
+        event.remove(Screenshot, 'load', count_loads)
+    assert loaded == []
+
+    job = client.get(f"/api/monitoring/deletion-jobs/{job['id']}", headers=admin).get_json()
+    assert job['status'] == 'completed', job
+    assert job['progress'] == 1.0
+    assert job['deleted_sessions'] == 3
+    assert job['deleted_activities'] == 12 and job['deleted_screenshots'] == 12
+
+    with app.app_context():
+        assert db.session.get(Employee, heavy_id) is None
+        assert MonitoringSession.query.filter_by(employee_id=heavy_id).count() == 0
+        # The keeper still references the shared image; heavy's own images are unreferenced
+        keeper_shot = Screenshot.query.join(MonitoringSession).join(Employee).filter(
+            Employee.email == 'keeper@example.com').one()
+        shared = parse_ref(keeper_shot.file_path)
+        assert db.session.get(ScreenshotBlob, shared).ref_count == 1
+        assert all(db.session.get(ScreenshotBlob, digest).ref_count == 0 for digest in heavy_digests - {shared})
+
+    assert client.delete(f"/api/employees/{me['id']}", headers=admin).status_code == 400
+    assert client.get(f"/api/monitoring/deletion-jobs/{job['id']}", headers=keeper).status_code == 403
+    print("✓ Employee deleted in batches without loading child rows")
+
+
+def test_delete_session_and_resume_job(app, client, login):
+    admin, me, _ = login('session-deleter@example.com', 'Session Deletion Org', role='admin')
+    employee = login('session-owner@example.com', 'Session Deletion Org').headers
+    record(client, employee, sessions=2, per_session=2)
+    with app.app_context():
+        session_ids = [s.id for s in MonitoringSession.query.join(Employee).filter(
+            Employee.email == 'session-owner@example.com').order_by(MonitoringSession.id)]
+
+    response = client.delete(f'/api/monitoring/sessions/{session_ids[0]}', headers=employee)
+    assert response.status_code == 403
+    response = client.delete(f'/api/monitoring/sessions/{session_ids[0]}', headers=admin)
+    assert response.status_code == 202
+    wait_for_jobs(app)
+
+    with app.app_context():
+        assert db.session.get(MonitoringSession, session_ids[0]) is None
+        assert Activity.query.filter_by(session_id=session_ids[0]).count() == 0
+        assert Activity.query.filter_by(session_id=session_ids[1]).count() == 2
+
+        # A job left behind by a restart is finished by re-running it
+        job = create_deletion_job('session', session_ids[1], me['organization_id'])
+        job.status = 'running'
+        db.session.commit()
+        job = run_deletion_job(job.id, batch_size=1)
+        assert job.status == 'completed' and job.deleted_screenshots == 2
+        assert Screenshot.query.filter_by(session_id=session_ids[1]).count() == 0
+        assert DeletionJob.query.filter(DeletionJob.status != 'completed').count() == 0
+    print("✓ Sessions deleted by job, interrupted jobs resumable")
+
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Test organization NDJSON exports: scoping, gzip, resume tokens and per-batch queries
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from sqlalchemy import insert
+from models import db, Activity, Screenshot
+from exports import ExportScope, encode_resume_token, iter_records
+
+START = datetime(2026, 3, 1, 9, 0, 0)
+
+
+def add_activities(app, session_id, count, application):
+    with app.app_context():
+        db.session.execute(insert(Activity), [
+            {'session_id': session_id, 'timestamp': START + timedelta(minutes=i), 'activity_type': 'application',
+             'application_name': application, 'window_title': f'{application} {i}', 'duration_seconds': i}
+            for i in range(count)
+        ])
+        db.session.commit()
+
+
+def export(client, headers, org_id, kind='activities', **params):
+    response = client.get(f'/api/organizations/{org_id}/exports/{kind}', headers=headers, query_string=params)
+    assert response.status_code == 200, response.data
+    data = response.get_data()
+    if params.get('gzip'):
+        assert response.mimetype == 'application/gzip'
+        data = gzip.decompress(data)
+    return [json.loads(line) for line in data.splitlines()], response
+
+
+def test_export_scope_gzip_and_resume(app, client, login):
+    admin, me, _ = login('export-admin@example.com', 'Export Org', role='admin', start=True)
+    _, alice, alice_session = login('export-alice@example.com', 'Export Org', start=True)
+    _, bob, bob_session = login('export-bob@example.com', 'Export Org', start=True)
+    _, _, outsider_session = login('export-outsider@example.com', 'Other Export Org', start=True)
+    org_id = me['organization_id']
+    add_activities(app, alice_session, 30, 'Editor')
+    add_activities(app, bob_session, 20, 'Browser')
+    add_activities(app, outsider_session, 10, 'Secret')
+
+    records, response = export(client, admin, org_id, **{'from': START.isoformat()})
+    assert response.mimetype == 'application/x-ndjson'
+    assert len(records) == 50 and {r['employee_id'] for r in records} == {alice['id'], bob['id']}
+    assert [r['id'] for r in records] == sorted(r['id'] for r in records)
+    assert records[0]['timestamp'] == START.isoformat() + 'Z' and records[0]['window_title'] == 'Editor 0'
+
+    only_bob, _ = export(client, admin, org_id, employee_id=str(bob['id']), **{'from': START.isoformat()})
+    assert len(only_bob) == 20 and {r['application_name'] for r in only_bob} == {'Browser'}
+    window, _ = export(client, admin, org_id, employee_id=str(alice['id']), **{
+        'from': (START + timedelta(minutes=10)).isoformat(), 'to': (START + timedelta(minutes=15)).isoformat()})
+    assert [r['duration_seconds'] for r in window] == [10, 11, 12, 13, 14]
+
+    compressed, _ = export(client, admin, org_id, gzip='true', **{'from': START.isoformat()})
+    assert compressed == records
+
+    # Pages of 10 chained through their last line's cursor cover the export exactly once
+    pages, cursor = [], None
+    while True:
+        params = {'from': START.isoformat(), 'limit': 10}
+        if cursor:
+            params['cursor'] = cursor
+        page, _ = export(client, admin, org_id, **params)
+        pages.extend(page[:-1])
+        cursor = page[-1]['next_cursor']
+        if not cursor:
+            break
+    assert pages == records and len(page) == 11  # No empty page after a full last one
+
+    with app.app_context():
+        scope = ExportScope(org_id, None, START, None)
+        resumed = list(iter_records('activities', scope, after_id=records[19]['id'], batch_size=7))
+    assert resumed == records[20:]
+    print("✓ Exports are org-scoped, filterable, gzip'able and resumable")
+
+
+def test_export_reads_in_short_batches(app, client, login, statements):
+    admin, me, session_id = login('export-batches@example.com', 'Batch Export Org', role='admin', start=True)
+    add_activities(app, session_id, 25, 'Terminal')
+    screenshot = client.post('/api/screenshots/upload', headers=admin, data={
+        'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(32)), 'screenshot.png'), 'folder_name': 'ops'
+    }).get_json()['screenshot']
+    with app.app_context():
+        row = db.session.get(Screenshot, screenshot['id'])
+        row.extracted_text, row.extraction_data, row.is_processed = 'deploy log', {'app': 'Terminal'}, True
+        db.session.commit()
+
+    app.config['EXPORT_BATCH_SIZE'] = 10
+    try:
+        with statements('activities') as selects:
+            records, _ = export(client, admin, me['organization_id'])
+    finally:
+        app.config['EXPORT_BATCH_SIZE'] = 5000
+    assert len(records) == 25 and len(selects) == 3  # 10 + 10 + 5, one query each
+
+    shots, _ = export(client, admin, me['organization_id'], kind='screenshots')
+    assert shots[0]['extracted_text'] == 'deploy log' and shots[0]['extraction_data'] == {'app': 'Terminal'}
+    assert 'file_path' not in shots[0]
+    print("✓ Exports read one batch per query")
+
+
+def test_export_requires_org_admin_and_valid_parameters(client, login):
+    admin, me, _ = login('export-check-admin@example.com', 'Check Export Org', role='admin')
+    employee = login('export-check-employee@example.com', 'Check Export Org').headers
+    org_id = me['organization_id']
+    url = f'/api/organizations/{org_id}/exports/activities'
+    assert client.get(url, headers=employee).status_code == 403
+    assert client.get(f'/api/organizations/{org_id + 1}/exports/activities', headers=admin).status_code == 403
+    assert client.get(f'/api/organizations/{org_id}/exports/passwords', headers=admin).status_code == 404
+    assert client.get(url + '?cursor=garbage', headers=admin).status_code == 400
+    assert client.get(url, headers=admin, query_string={
+        'cursor': encode_resume_token('screenshots', 1)}).status_code == 400
+    assert client.get(url + '?employee_id=alice', headers=admin).status_code == 400
+    assert client.get(url + '?from=yesterday', headers=admin).status_code == 400
+    print("✓ Exports are limited to the organization's admins")
+
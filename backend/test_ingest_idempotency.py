@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test client capture timestamps and idempotency keys on the ingest endpoints
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from models import db, Activity, Screenshot
+from ingest import resolve_event_timestamp
+
+
+def test_skew_correction():
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    # Client clock runs 5 minutes behind the server
+    captured = resolve_event_timestamp('2025-01-01T11:50:00Z', '2025-01-01T11:55:00Z', now=now)
+    assert captured == datetime(2025, 1, 1, 11, 55, 0), captured
+
+    # Offsets are normalised to UTC
+    captured = resolve_event_timestamp('2025-01-01T13:58:00+02:00', None, now=now)
+    assert captured == datetime(2025, 1, 1, 11, 58, 0), captured
+
+    # Never in the future, and no client time means arrival time
+    assert resolve_event_timestamp('2025-01-02T00:00:00Z', None, now=now) == now
+    assert resolve_event_timestamp(None, None, now=now) == now
+    print("✓ Clock-skew correction")
+
+
+def test_activity_replay_is_noop(app, client, login):
+    headers = login('activity-replay@example.com', start=True).headers
+    captured_at = (datetime.utcnow() - timedelta(minutes=10)).isoformat() + 'Z'
+    payload = {
+        'activity_type': 'application',
+        'application_name': 'Terminal',
+        'captured_at': captured_at,
+        'sent_at': datetime.utcnow().isoformat() + 'Z',
+        'idempotency_key': 'activity-key-1'
+    }
+
+    first = client.post('/api/monitoring/activities', headers=headers, json=payload)
+    assert first.status_code == 201, first.get_data(as_text=True)
+    replay = client.post('/api/monitoring/activities', headers=headers, json=payload)
+    assert replay.status_code == 200, replay.get_data(as_text=True)
+    assert replay.get_json()['id'] == first.get_json()['id']
+
+    with app.app_context():
+        assert Activity.query.filter_by(idempotency_key='activity-key-1').count() == 1
+        stored = Activity.query.filter_by(idempotency_key='activity-key-1').first()
+        # Buffered event keeps its capture time, not its arrival time
+        assert datetime.utcnow() - stored.timestamp > timedelta(minutes=9)
+    print("✓ Activity replay is a no-op")
+
+
+def test_screenshot_replay_is_noop(app, client, login):
+    headers = login('screenshot-replay@example.com', start=True).headers
+    headers = dict(headers, **{'Idempotency-Key': 'screenshot-key-1'})
+
+    def upload():
+        return client.post('/api/screenshots/upload', headers=headers, data={
+            'file': (BytesIO(b'\x89PNG\r\n\x1a\nfake'), 'screenshot.png'),
+            'folder_name': 'testing',
+            'captured_at': (datetime.utcnow() - timedelta(seconds=30)).isoformat() + 'Z'
+        })
+
+    first = upload()
+    assert first.status_code == 201, first.get_data(as_text=True)
+    replay = upload()
+    assert replay.status_code == 200, replay.get_data(as_text=True)
+    assert replay.get_json()['screenshot']['id'] == first.get_json()['screenshot']['id']
+
+    with app.app_context():
+        assert Screenshot.query.filter_by(idempotency_key='screenshot-key-1').count() == 1
+    print("✓ Screenshot replay is a no-op")
+
+
+def test_keys_are_scoped_per_employee(app, client, login):
+    alice, _, alice_session = login('alice-keys@example.com', start=True)
+    bob, _, bob_session = login('bob-keys@example.com', start=True)
+    key = {'Idempotency-Key': 'shared-key-1'}
+
+    ours = client.post('/api/monitoring/activities', headers={**alice, **key}, json={
+        'activity_type': 'application', 'application_name': 'Payroll'})
+    theirs = client.post('/api/monitoring/activities', headers={**bob, **key}, json={
+        'activity_type': 'application', 'application_name': 'Editor'})
+    assert ours.status_code == 201 and theirs.status_code == 201, theirs.get_data(as_text=True)
+    assert theirs.get_json()['session_id'] == bob_session and theirs.get_json()['application_name'] == 'Editor'
+
+    def upload(headers):
+        return client.post('/api/screenshots/upload', headers={**headers, 'Idempotency-Key': 'shared-key-2'}, data={
+            'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + headers['Authorization'][-16:].encode()), 'screenshot.png'),
+            'folder_name': 'testing'
+        })
+
+    ours = upload(alice).get_json()['screenshot']
+    with app.app_context():
+        db.session.get(Screenshot, ours['id']).extracted_text = 'salary figures'
+        db.session.commit()
+    theirs = upload(bob)
+    assert theirs.status_code == 201, theirs.get_data(as_text=True)
+    assert theirs.get_json()['screenshot']['session_id'] == bob_session
+    assert theirs.get_json()['screenshot']['extracted_text'] is None
+
+    # Each replay still finds the sender's own event
+    replay = client.post('/api/monitoring/activities', headers={**alice, **key}, json={'activity_type': 'application'})
+    assert replay.status_code == 200 and replay.get_json()['session_id'] == alice_session
+    assert upload(bob).get_json()['screenshot']['id'] == theirs.get_json()['screenshot']['id']
+    print("✓ Idempotency keys are scoped per employee")
+
+
+def test_invalid_timestamp_rejected(client, login):
+    headers = login('bad-timestamp@example.com', start=True).headers
+    response = client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'application', 'captured_at': 'yesterday-ish'
+    })
+    assert response.status_code == 400
+    print("✓ Invalid timestamp rejected")
+
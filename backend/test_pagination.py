@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test keyset pagination and time filters on screenshot and activity listings
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+from io import BytesIO
+
+
+def walk(client, url, headers, limit):
+    """Follow X-Next-Cursor from the first page to the last"""
+    pages, cursor = [], None
+    while True:
+        response = client.get(url + f'&limit={limit}' + (f'&cursor={cursor}' if cursor else ''), headers=headers)
+        assert response.status_code == 200, response.get_data(as_text=True)
+        pages.append(response.get_json())
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return pages
+
+
+def test_activity_pages_are_stable(client, login):
+    headers, _, session_id = login('activity-pages@example.com', start=True)
+    # Three activities share each second, so pages must break ties on id
+    for i in range(9):
+        client.post('/api/monitoring/activities', headers=headers, json={
+            'activity_type': 'application', 'application_name': f'app-{i}',
+            'captured_at': f'2024-01-01T09:00:0{i // 3}Z'
+        })
+    url = f'/api/monitoring/activities?session_id={session_id}'
+    everything = client.get(url, headers=headers).get_json()
+    assert [a['application_name'] for a in everything] == [f'app-{i}' for i in range(9)]
+
+    pages = walk(client, url, headers, limit=2)
+    assert [len(page) for page in pages] == [2, 2, 2, 2, 1]
+    assert [a['id'] for page in pages for a in page] == [a['id'] for a in everything]
+
+    # from is inclusive, to exclusive
+    window = client.get(url + '&from=2024-01-01T09:00:01Z&to=2024-01-01T09:00:02Z', headers=headers).get_json()
+    assert [a['application_name'] for a in window] == ['app-3', 'app-4', 'app-5']
+    print("✓ Activity pages follow (timestamp, id) without gaps or repeats")
+
+
+def test_screenshot_pages_and_bad_parameters(client, login):
+    headers, _, session_id = login('screenshot-pages@example.com', start=True)
+    for i in range(5):
+        client.post('/api/screenshots/upload', headers=headers, data={
+            'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + bytes([i]) * 64), 'screenshot.png'), 'folder_name': 'testing'
+        })
+    url = f'/api/screenshots/session/{session_id}?'
+    pages = walk(client, url, headers, limit=3)
+    assert [len(page) for page in pages] == [3, 2]
+    assert 'url' in pages[0][0]
+    assert 'X-Next-Cursor' not in client.get(url, headers=headers).headers
+
+    for query in ('limit=0', 'limit=abc', 'limit=5000', 'cursor=not-a-cursor', 'from=yesterday'):
+        response = client.get(url + query, headers=headers)
+        assert response.status_code == 400, query
+    print("✓ Screenshot listings page by cursor and reject malformed parameters")
+
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test monthly partition helpers and idempotency key purging
+Run with pytest (fixtures in conftest.py), no server needed
+(the partition DDL itself only runs on PostgreSQL)
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import db, IngestKey
+from partitions import add_months, month_start, partition_name, parse_partition_name, is_partitioned
+from maintain_partitions import purge_ingest_keys
+
+
+def test_month_arithmetic_and_names():
+    assert month_start(datetime(2026, 10, 19, 9, 30)) == date(2026, 10, 1)
+    assert add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partition_name('activities', date(2026, 3, 1)) == 'activities_p2026_03'
+    assert parse_partition_name('screenshots_p2026_03') == ('screenshots', date(2026, 3, 1))
+    assert parse_partition_name('screenshots_default') is None
+    print("✓ Partition names and month ranges")
+
+
+def test_sqlite_tables_are_not_partitioned(app):
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            pytest.skip('only SQLite tables are never partitioned')
+        with db.engine.connect() as conn:
+            assert not is_partitioned(conn, 'activities')
+    print("✓ SQLite tables stay plain")
+
+
+def test_purge_old_ingest_keys(app):
+    with app.app_context():
+        db.session.add(IngestKey(employee_id=1, key='old-key', kind='activity',
+                                 created_at=datetime.utcnow() - timedelta(days=30)))
+        db.session.add(IngestKey(employee_id=1, key='new-key', kind='activity'))
+        db.session.commit()
+
+        assert purge_ingest_keys(days=7, batch_size=1) == 1
+        assert db.session.get(IngestKey, (1, 'old-key')) is None
+        assert db.session.get(IngestKey, (1, 'new-key')) is not None
+    print("✓ Idempotency keys purged after the retry window")
+
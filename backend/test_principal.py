@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Test the cached request principal and its invalidation on role and manager changes
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import time
+
+from principal import Principal, PrincipalCache
+
+
+def test_principal_cached_and_invalidated(app, client, login, statements):
+    admin = login('principal-admin@example.com', 'Principal Org', role='super_admin').headers
+    user, employee, _ = login('principal-user@example.com', 'Principal Org')
+    employees_url = f"/api/organizations/{employee['organization_id']}/employees"
+    config_url = '/api/monitoring-config/'
+
+    assert client.get(employees_url, headers=user).status_code == 403
+    with statements('employees') as lookups:
+        for _ in range(3):
+            assert client.get(employees_url, headers=user).status_code == 403
+    assert lookups == []  # Served from the cache
+
+    # Promotion applies on the next request, not after the TTL
+    response = client.put(f"/api/employees/{employee['id']}", headers=admin, json={'role': 'admin'})
+    assert response.status_code == 200
+    assert client.get(employees_url, headers=user).status_code == 200
+    client.put(f"/api/employees/{employee['id']}", headers=admin, json={'role': 'employee'})
+    assert client.get(employees_url, headers=user).status_code == 403
+    assert client.get(config_url, headers=user).status_code == 200
+
+    # A manager assignment drops the cached entry too
+    admin_id = client.get('/api/auth/me', headers=admin).get_json()['id']
+    client.get(employees_url, headers=user)
+    client.put(f"/api/employees/{employee['id']}/assign-manager", headers=admin, json={'manager_id': admin_id})
+    with app.app_context():
+        assert app.extensions['principal_cache'].get(employee['id']) is None
+    print("✓ Principal cached across requests and dropped on role and manager changes")
+
+
+def test_cache_evicts_and_expires():
+    cache = PrincipalCache(ttl=60, max_size=2)
+    for employee_id in (1, 2):
+        cache.set(employee_id, Principal(employee_id, 'employee', 1, None, True))
+    cache.get(1)  # 2 is now least recently used
+    cache.set(3, Principal(3, 'employee', 1, None, True))
+    assert cache.get(2) is None and cache.get(1).id == 1 and cache.get(3).id == 3
+
+    cache = PrincipalCache(ttl=0.01)
+    cache.set(1, Principal(1, 'admin', 1, None, True))
+    time.sleep(0.02)
+    assert cache.get(1) is None
+    print("✓ Principal cache evicts least recently used entries and expires them")
+
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Test ?fields= and ?view= projections on list endpoints
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+from io import BytesIO
+
+from models import db, Screenshot
+
+
+def test_screenshot_projections_select_only_their_columns(app, client, login, statements):
+    headers, _, session_id = login('projections@example.com', start=True)
+    for i in range(3):
+        screenshot = client.post('/api/screenshots/upload', headers=headers, data={
+            'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + bytes([i]) * 64), 'screenshot.png'),
+            'folder_name': 'testing', 'activity_name': 'Testing'
+        }).get_json()['screenshot']
+        with app.app_context():
+            row = db.session.get(Screenshot, screenshot['id'])
+            row.extracted_text = 'OCR text ' * 500
+            row.extraction_data = {'app': 'Editor', 'details': 'x' * 2000}
+            row.is_processed = True
+            db.session.commit()
+    url = f'/api/screenshots/session/{session_id}'
+
+    full = client.get(url, headers=headers).get_json()
+    assert full[0]['extracted_text'] and full[0]['extraction_data'] and full[0]['thumb_url']
+
+    with statements('screenshots') as selects:
+        summary = client.get(url + '?view=summary', headers=headers).get_json()
+    assert set(summary[0]) == {'id', 'session_id', 'timestamp', 'folder_name', 'activity_name',
+                               'is_processed', 'thumb_url', 'url'}
+    assert summary[0]['folder_name'] == 'testing' and summary[0]['timestamp'] == full[0]['timestamp']
+    assert len(selects) == 1  # No lazy loads per row
+    assert 'extracted_text' not in selects[0] and 'extraction_data' not in selects[0]
+
+    picked = client.get(url + '?fields=id,activity_name&limit=2', headers=headers)
+    assert picked.get_json() == [{'id': s['id'], 'activity_name': 'Testing'} for s in full[:2]]
+    assert picked.headers.get('X-Next-Cursor')
+
+    assert client.get(url + '?fields=id,password', headers=headers).status_code == 400
+    assert client.get(url + '?view=tiny', headers=headers).status_code == 400
+    print("✓ Screenshot projections select only the columns they return")
+
+
+def test_session_and_activity_projections(client, login):
+    headers, _, session_id = login('session-projections@example.com', start=True)
+    client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'website', 'application_name': 'Browser', 'url': 'https://example.com',
+        'window_title': 'Example'
+    })
+
+    current = client.get('/api/monitoring/sessions/current', headers=headers).get_json()['session']
+    assert 'activities' in current and 'screenshots' in current
+    current = client.get('/api/monitoring/sessions/current?view=summary', headers=headers).get_json()['session']
+    assert current == {k: current[k] for k in ('id', 'employee_id', 'start_time', 'end_time',
+                                               'is_active', 'duration_seconds', 'summary')}
+    assert current['id'] == session_id and current['is_active']
+
+    sessions = client.get('/api/monitoring/sessions?fields=id,start_time', headers=headers).get_json()
+    assert sessions == [{'id': session_id, 'start_time': current['start_time']}]
+
+    activities = client.get(f'/api/monitoring/activities?session_id={session_id}&view=summary',
+                            headers=headers).get_json()
+    assert activities[0]['application_name'] == 'Browser' and 'window_title' not in activities[0]
+    print("✓ Session and activity listings honour view and fields")
+
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Test thumbnail/preview renditions: lazy rendering, backfill, deletion and retention
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from PIL import Image
+from models import db, MonitoringSession, Screenshot, ScreenshotBlob, SessionArchive
+from renditions import render_missing
+from deletion import delete_sessions
+from retention import run_retention
+from storage import get_storage, parse_ref, collect_garbage
+
+
+def screen_image():
+    """A full-HD PNG that doesn't compress away (noise)"""
+    out = BytesIO()
+    Image.effect_noise((1920, 1080), 40).save(out, 'PNG')
+    return out.getvalue()
+
+
+def upload(client, headers):
+    image = screen_image()
+    response = client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(image), 'screenshot.png'), 'folder_name': 'testing'
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['screenshot'], len(image)
+
+
+def ref_count(ref):
+    return db.session.get(ScreenshotBlob, parse_ref(ref)).ref_count
+
+
+def test_thumbnail_rendered_once_and_cached(app, client, login):
+    headers = login('thumbs@example.com', 'Rendition Org', start=True).headers
+    screenshot, original_size = upload(client, headers)
+    url = f"/api/screenshots/{screenshot['id']}/file"
+
+    response = client.get(url, headers=headers, query_string={'size': 'thumb'})
+    assert response.status_code == 200
+    assert response.mimetype == 'image/jpeg'
+    thumb = response.get_data()
+    assert len(thumb) * 50 < original_size
+    assert max(Image.open(BytesIO(thumb)).size) == 320
+
+    with app.app_context():
+        row = db.session.get(Screenshot, screenshot['id'])
+        thumb_ref = row.thumb_path
+        assert row.thumb_size == len(thumb) and ref_count(thumb_ref) == 1
+    # Served from storage the second time, without a new reference
+    assert client.get(url, headers=headers, query_string={'size': 'thumb'}).get_data() == thumb
+    with app.app_context():
+        assert db.session.get(Screenshot, screenshot['id']).thumb_path == thumb_ref
+        assert ref_count(thumb_ref) == 1
+
+    preview = client.get(url, headers=headers, query_string={'size': 'preview'}).get_data()
+    assert max(Image.open(BytesIO(preview)).size) == 1280
+    assert client.get(url, headers=headers, query_string={'size': 'huge'}).status_code == 400
+    assert client.get(url, headers=headers).mimetype == 'image/png'
+    print("✓ Thumbnails rendered on first request, then served from storage")
+
+
+def test_backfill_in_process_pool_and_delete(app, client, login):
+    headers = login('backfill@example.com', 'Rendition Org', start=True).headers
+    upload(client, headers)
+    upload(client, headers)
+    session_id = client.post('/api/monitoring/sessions/stop', headers=headers).get_json()['session']['id']
+
+    app.config['RENDITION_WORKERS'] = 1
+    try:
+        with app.app_context():
+            query = Screenshot.query.filter_by(session_id=session_id)
+            assert render_missing(query, 'thumb', batch_size=1) == 2
+            assert render_missing(query, 'thumb') == 0
+            thumb_refs = [row.thumb_path for row in query]
+            assert all(ref_count(ref) == 1 for ref in thumb_refs)
+
+            delete_sessions([session_id])
+            db.session.commit()
+            assert all(ref_count(ref) == 0 for ref in thumb_refs)
+    finally:
+        app.config['RENDITION_WORKERS'] = 0
+        app.extensions.pop('rendition_pool').shutdown()
+    print("✓ Backfill renders in the pool, deletes release renditions")
+
+
+def test_archive_keeps_thumbnails_until_thumbnail_days(app, client, login):
+    admin, me, _ = login('thumb-admin@example.com', 'Thumbnail Retention Org', role='admin')
+    org_id = me['organization_id']
+    client.put(f'/api/organizations/{org_id}/retention-policy', headers=admin,
+               json={'screenshot_days': 30, 'thumbnail_days': 365, 'activity_days': 730})
+    employee = login('thumb-employee@example.com', 'Thumbnail Retention Org', start=True).headers
+    screenshot, _ = upload(client, employee)
+    session_id = client.post('/api/monitoring/sessions/stop', headers=employee).get_json()['session']['id']
+    with app.app_context():
+        session = db.session.get(MonitoringSession, session_id)
+        session.end_time = datetime.utcnow() - timedelta(days=45)
+        db.session.commit()
+
+        # Archiving renders the missing thumbnail; the archive keeps it, the original goes
+        stats = run_retention(organization_id=org_id)
+        assert stats['sessions_archived'] == 1
+        archive = SessionArchive.query.filter_by(session_id=session_id).one()
+        assert archive.thumbnail_count == 1
+        collect_garbage(get_storage(), grace_seconds=-1)
+        assert db.session.get(ScreenshotBlob, parse_ref(screenshot['file_path'])) is None
+
+    client.post(f'/api/monitoring/sessions/{session_id}/restore', headers=admin)
+    url = f"/api/screenshots/{screenshot['id']}/file"  # Restored under its original id
+    assert client.get(url, headers=admin).status_code == 404
+    response = client.get(url, headers=admin, query_string={'size': 'thumb'})
+    assert response.status_code == 200 and response.mimetype == 'image/jpeg'
+
+    with app.app_context():
+        restored = Screenshot.query.filter_by(session_id=session_id).one()
+        thumb_ref = restored.thumb_path
+        assert ref_count(thumb_ref) == 2  # The restored row and the archive
+        assert restored.preview_path is None
+
+        later = datetime.utcnow() + timedelta(days=8)
+        assert run_retention(organization_id=org_id, now=later)['sessions_archived'] == 1
+        assert ref_count(thumb_ref) == 1
+
+        stats = run_retention(organization_id=org_id, now=datetime.utcnow() + timedelta(days=400))
+        assert stats['sessions_thumbnails_expired'] == 1 and stats['thumbnails'] == 1
+        assert ref_count(thumb_ref) == 0
+        assert SessionArchive.query.filter_by(session_id=session_id).one().thumbnails_expired_at is not None
+
+        stats = run_retention(organization_id=org_id, now=datetime.utcnow() + timedelta(days=800))
+        assert stats['sessions_expired'] == 1 and stats['sessions_thumbnails_expired'] == 0
+        collect_garbage(get_storage(), grace_seconds=-1)
+    print("✓ Archived sessions keep thumbnails until thumbnail_days")
+
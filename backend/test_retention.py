@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Test retention policies, session archiving, restore and expiry
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+from datetime import datetime, timedelta
+from io import BytesIO
+
+from models import db, MonitoringSession, Activity, Screenshot, ScreenshotBlob, SessionArchive
+from retention import run_retention, read_bundle, longest_activity_retention_days, EXPIRED_REF_PREFIX
+from storage import get_storage, parse_ref, collect_garbage
+from maintain_partitions import partition_drops_allowed
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'old session' * 500
+
+
+def recorded_session(app, client, headers, ended_days_ago, image=IMAGE):
+    """Start a session, log an activity and a screenshot, stop it and backdate it"""
+    client.post('/api/monitoring/sessions/start', headers=headers, json={})
+    client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'application', 'application_name': 'Editor', 'window_title': 'notes.txt'
+    })
+    client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(image), 'screenshot.png'), 'folder_name': 'testing'
+    })
+    session_id = client.post('/api/monitoring/sessions/stop', headers=headers).get_json()['session']['id']
+    with app.app_context():
+        session = db.session.get(MonitoringSession, session_id)
+        session.end_time = datetime.utcnow() - timedelta(days=ended_days_ago)
+        session.start_time = session.end_time - timedelta(hours=1)
+        db.session.commit()
+    return session_id
+
+
+def test_policy_defaults_and_validation(client, login):
+    admin, me, _ = login('policy-admin@example.com', 'Policy Org', role='admin')
+    org_id = me['organization_id']
+    url = f'/api/organizations/{org_id}/retention-policy'
+
+    policy = client.get(url, headers=admin).get_json()
+    assert policy['is_default'] and policy['activity_days'] is None
+
+    bad = client.put(url, headers=admin, json={'screenshot_days': 400, 'activity_days': 30})
+    assert bad.status_code == 400
+    assert client.put(url, headers=admin, json={'screenshot_days': 0}).status_code == 400
+
+    ok = client.put(url, headers=admin, json={'screenshot_days': 30, 'thumbnail_days': 365, 'activity_days': 730})
+    assert ok.status_code == 200, ok.get_json()
+    assert ok.get_json()['is_default'] is False
+    # Omitted fields keep their value, null keeps forever
+    policy = client.put(url, headers=admin, json={'activity_days': None}).get_json()
+    assert policy['screenshot_days'] == 30 and policy['activity_days'] is None
+
+    employee = login('policy-employee@example.com', 'Policy Org').headers
+    assert client.put(url, headers=employee, json={'screenshot_days': 1}).status_code == 403
+    print("✓ Retention policies validated and scoped to organization admins")
+
+
+def test_archive_restore_and_expire(app, client, login):
+    admin, me, _ = login('archive-admin@example.com', 'Archive Org', role='admin')
+    org_id = me['organization_id']
+    client.put(f'/api/organizations/{org_id}/retention-policy', headers=admin,
+               json={'screenshot_days': 30, 'thumbnail_days': 365, 'activity_days': 730})
+    employee = login('archive-employee@example.com', 'Archive Org').headers
+    old_id = recorded_session(app, client, employee, ended_days_ago=45)
+    recent_id = recorded_session(app, client, employee, ended_days_ago=1, image=IMAGE + b'recent')
+
+    with app.app_context():
+        digest = parse_ref(Screenshot.query.filter_by(session_id=old_id).one().file_path)
+        stats = run_retention(organization_id=org_id, batch_size=1)
+        assert stats['sessions_archived'] == 1
+        assert stats['activities'] == 1 and stats['screenshots'] == 1
+
+        old = db.session.get(MonitoringSession, old_id)
+        assert old.archived_at is not None
+        assert Activity.query.filter_by(session_id=old_id).count() == 0
+        assert Screenshot.query.filter_by(session_id=old_id).count() == 0
+        assert db.session.get(ScreenshotBlob, digest).ref_count == 0
+        assert Activity.query.filter_by(session_id=recent_id).count() == 1
+
+        archive = SessionArchive.query.filter_by(session_id=old_id).one()
+        records = list(read_bundle(get_storage(), archive))
+        assert [r['type'] for r in records] == ['session', 'activity', 'screenshot']
+        assert records[1]['row']['window_title'] == 'notes.txt'
+
+        # Running again finds nothing new
+        assert run_retention(organization_id=org_id)['sessions_archived'] == 0
+
+    # The image is still there (not collected yet), so the restored row gets it back
+    response = client.post(f'/api/monitoring/sessions/{old_id}/restore', headers=admin)
+    assert response.status_code == 200, response.get_json()
+    assert response.get_json()['restored'] == {'activities': 1, 'screenshots': 1}
+    assert client.post(f'/api/monitoring/sessions/{old_id}/restore', headers=admin).status_code == 400
+    assert client.post(f'/api/monitoring/sessions/{old_id}/restore', headers=employee).status_code == 403
+
+    with app.app_context():
+        screenshot = Screenshot.query.filter_by(session_id=old_id).one()
+        assert parse_ref(screenshot.file_path) == digest
+        assert db.session.get(ScreenshotBlob, digest).ref_count == 1
+        assert Activity.query.filter_by(session_id=old_id).one().window_title == 'notes.txt'
+
+        # Held hot for a while, then archived again from the same bundle
+        assert run_retention(organization_id=org_id)['sessions_archived'] == 0
+        later = datetime.utcnow() + timedelta(days=8)
+        assert run_retention(organization_id=org_id, now=later)['sessions_archived'] == 1
+        assert SessionArchive.query.filter_by(session_id=old_id).count() == 1
+        assert db.session.get(ScreenshotBlob, digest).ref_count == 0
+
+        # Once the image is collected, a restore brings back the metadata only
+        collect_garbage(get_storage(), grace_seconds=0)
+    client.post(f'/api/monitoring/sessions/{old_id}/restore', headers=admin)
+    with app.app_context():
+        screenshot = Screenshot.query.filter_by(session_id=old_id).one()
+        assert screenshot.file_path.startswith(EXPIRED_REF_PREFIX)
+        assert db.session.get(ScreenshotBlob, digest) is None
+    assert client.get(f'/api/screenshots/{screenshot.id}/file', headers=admin).status_code == 404
+
+    with app.app_context():
+        far = datetime.utcnow() + timedelta(days=800)
+        stats = run_retention(organization_id=org_id, now=far)
+        # The restored and the recent session are archived and expired in the same run
+        assert stats['sessions_archived'] == 2 and stats['sessions_expired'] == 2
+        assert db.session.get(MonitoringSession, old_id) is None
+        assert SessionArchive.query.filter_by(session_id=old_id).count() == 0
+        bundle_digest = parse_ref(archive.bundle_ref)
+        assert db.session.get(ScreenshotBlob, bundle_digest).ref_count == 0
+        collect_garbage(get_storage(), grace_seconds=-1)
+    print("✓ Sessions archived, restored on demand, re-archived and expired")
+
+
+def test_partition_drops_respect_policies(app):
+    with app.app_context():
+        longest = longest_activity_retention_days()
+        # Policy Org keeps activities forever
+        assert longest is None
+        assert not partition_drops_allowed(120)
+    print("✓ Partition drops wait for the longest retention policy")
+
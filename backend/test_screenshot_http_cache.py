@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test HTTP caching of screenshot downloads: ETags, 304s and range requests
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import tempfile
+from io import BytesIO
+
+from storage import parse_ref
+from storage.packfile import PackfileStorage
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 40
+
+
+def upload(client, headers, content):
+    response = client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(content), 'screenshot.png'), 'folder_name': 'testing'
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['screenshot']
+
+
+def test_etag_and_not_modified(app, client, login):
+    headers = login('etag@example.com', start=True).headers
+    screenshot = upload(client, headers, IMAGE)
+    digest = parse_ref(screenshot['file_path'])
+    url = f"/api/screenshots/{screenshot['id']}/file"
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200 and response.get_data() == IMAGE
+    assert response.headers['ETag'] == f'"{digest}"'
+    cache_control = response.cache_control
+    assert cache_control.private and cache_control.immutable
+    assert cache_control.max_age == app.config['SCREENSHOT_CACHE_MAX_AGE']
+
+    response = client.get(url, headers={**headers, 'If-None-Match': f'"{digest}"'})
+    assert response.status_code == 304 and response.get_data() == b''
+    assert response.headers['ETag'] == f'"{digest}"'
+
+    # A stale validator gets the full image; so does a stranger's request
+    response = client.get(url, headers={**headers, 'If-None-Match': '"other"'})
+    assert response.status_code == 200 and response.get_data() == IMAGE
+    stranger = login('etag-stranger@example.com', start=True).headers
+    assert client.get(url, headers={**stranger, 'If-None-Match': f'"{digest}"'}).status_code == 403
+    print("✓ Screenshots carry strong ETags and revalidate with 304")
+
+
+def test_range_requests(app, client, login):
+    headers = login('ranges@example.com', start=True).headers
+    screenshot = upload(client, headers, IMAGE + b'ranged')
+    url = f"/api/screenshots/{screenshot['id']}/file"
+
+    response = client.get(url, headers={**headers, 'Range': 'bytes=8-99'})
+    assert response.status_code == 206
+    assert response.get_data() == (IMAGE + b'ranged')[8:100]
+    assert response.headers['Content-Range'] == f'bytes 8-99/{len(IMAGE) + 6}'
+
+    # Same from a packfile segment
+    digest = parse_ref(screenshot['file_path'])
+    storage = PackfileStorage(tempfile.mkdtemp(prefix='packs_test_'))
+    temp_path, _, _ = storage.write_temp(BytesIO(IMAGE + b'ranged'))
+    storage.publish(temp_path, digest)
+    with app.test_request_context(headers={'Range': 'bytes=-6'}):
+        response = storage.send(digest, 'image/png')
+        assert response.status_code == 206
+        assert b''.join(response.response) == b'ranged'
+    with app.test_request_context(headers={'If-None-Match': f'"{digest}"'}):
+        assert storage.send(digest, 'image/png').status_code == 304
+    print("✓ Byte ranges served from local and packfile storage")
+
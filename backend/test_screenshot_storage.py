@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Test content-addressed screenshot storage, reference counting and backends
+Run with pytest (fixtures in conftest.py, moto for S3), no server needed
+"""
+import os
+import tempfile
+from io import BytesIO
+
+from models import db, Screenshot, ScreenshotBlob
+from storage import get_storage, parse_ref, release_screenshot_file, collect_garbage
+from storage.local import LocalStorage
+from storage.packfile import PackfileStorage
+from datetime import datetime, timedelta
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + b'lock screen' * 1000
+
+
+def upload(client, headers, content):
+    response = client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(content), 'screenshot.png'),
+        'folder_name': 'testing'
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+    return response.get_json()['screenshot']
+
+
+def test_identical_uploads_share_one_blob(app, client, login):
+    headers = login('dedupe@example.com', start=True).headers
+    first = upload(client, headers, IMAGE)
+    second = upload(client, headers, IMAGE)
+
+    assert first['id'] != second['id']
+    assert first['file_path'] == second['file_path']
+    digest = parse_ref(first['file_path'])
+    assert digest
+
+    with app.app_context():
+        store = get_storage()
+        assert store.exists(digest)
+        assert ScreenshotBlob.query.get(digest).ref_count == 2
+        with open(store.path_for(digest), 'rb') as f:
+            assert f.read() == IMAGE
+        # Nothing left behind in the temp area
+        assert os.listdir(store.tmp_dir) == []
+
+    download = client.get(f"/api/screenshots/{first['id']}/file", headers=headers)
+    assert download.status_code == 200
+    assert download.data == IMAGE
+    print("✓ Identical uploads share one blob")
+
+
+def test_release_and_garbage_collection(app, client, login):
+    headers = login('release@example.com', start=True).headers
+    content = IMAGE + b'unique'
+    first = upload(client, headers, content)
+    second = upload(client, headers, content)
+    digest = parse_ref(first['file_path'])
+
+    with app.app_context():
+        store = get_storage()
+        for screenshot_id in (first['id'], second['id']):
+            screenshot = Screenshot.query.get(screenshot_id)
+            release_screenshot_file(screenshot.file_path)
+            db.session.delete(screenshot)
+            db.session.commit()
+
+        assert ScreenshotBlob.query.get(digest).ref_count == 0
+        # Still inside the grace period
+        assert collect_garbage(store, grace_seconds=3600) == 0
+        assert store.exists(digest)
+
+        assert collect_garbage(store, grace_seconds=-1) == 1
+        assert not store.exists(digest)
+        assert ScreenshotBlob.query.get(digest) is None
+    print("✓ Released blobs are garbage collected")
+
+
+def test_local_layout_is_sharded():
+    with tempfile.TemporaryDirectory() as root:
+        store = LocalStorage(root)
+        temp_path, digest, size = store.write_temp(BytesIO(IMAGE))
+        store.publish(temp_path, digest)
+        assert store.path_for(digest) == os.path.join(root, digest[:2], digest[2:4], digest)
+        assert size == len(IMAGE)
+    print("✓ Local layout is hash-sharded")
+
+
+def test_s3_backend():
+    try:
+        import boto3
+        from moto import mock_aws
+    except ImportError:
+        print("⊘ Skipping S3 backend test (boto3/moto not installed)")
+        return
+
+    from storage.s3 import S3Storage
+
+    with mock_aws(), tempfile.TemporaryDirectory() as tmp_dir:
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket='screenshots-test')
+        store = S3Storage('screenshots-test', tmp_dir, client=client)
+
+        temp_path, digest, _ = store.write_temp(BytesIO(IMAGE))
+        assert not store.exists(digest)
+        store.publish(temp_path, digest)
+        assert not os.path.exists(temp_path)
+        assert store.exists(digest)
+        assert store.local_path(digest) is None
+        assert store.open(digest).read() == IMAGE
+
+        key = client.list_objects_v2(Bucket='screenshots-test')['Contents'][0]['Key']
+        assert key == f"screenshots/{digest[:2]}/{digest[2:4]}/{digest}"
+
+        store.delete(digest)
+        assert not store.exists(digest)
+    print("✓ S3 backend round trip")
+
+
+def test_packfile_backend():
+    with tempfile.TemporaryDirectory() as root:
+        writer = PackfileStorage(root)
+        reader = PackfileStorage(root)  # a second worker process sharing the store
+        yesterday = datetime.utcnow() - timedelta(days=2)
+
+        digests = []
+        for i in range(3):
+            content = IMAGE + str(i).encode()
+            temp_path, digest, _ = writer.write_temp(BytesIO(content))
+            writer.publish(temp_path, digest, day=yesterday)
+            digests.append((digest, content))
+
+        # Re-publishing identical content doesn't append again
+        segment = writer.segments_in(writer.day_dir(yesterday))[0]
+        size = os.path.getsize(segment)
+        temp_path, digest, _ = writer.write_temp(BytesIO(digests[0][1]))
+        writer.publish(temp_path, digest, day=yesterday)
+        assert os.path.getsize(segment) == size
+
+        for digest, content in digests:
+            assert reader.exists(digest)
+            assert bytes(reader.view(digest)) == content
+            assert reader.open(digest).read() == content
+
+        # Deleted entries are tombstoned, then reclaimed by compaction
+        writer.delete(digests[0][0])
+        writer.delete(digests[1][0])
+        assert not writer.exists(digests[0][0])
+        reader.refresh()
+        assert not reader.exists(digests[1][0])
+        rewritten, reclaimed = writer.compact(older_than_days=1)
+        assert rewritten == 1 and reclaimed == len(digests[0][1]) + len(digests[1][1])
+        assert not os.path.exists(segment)
+        assert bytes(reader.view(digests[2][0])) == digests[2][1]
+    print("✓ Packfile backend append, mmap read and compaction")
+
+
+def test_packfile_segments_are_never_reused():
+    with tempfile.TemporaryDirectory() as root:
+        writer = PackfileStorage(root)
+        reader = PackfileStorage(root)
+        day = datetime.utcnow() - timedelta(days=2)
+        blobs = []
+        for i in range(2):
+            temp_path, digest, _ = writer.write_temp(BytesIO(IMAGE + str(i).encode()))
+            writer.publish(temp_path, digest, day=day)
+            blobs.append(digest)
+        assert reader.exists(blobs[0])
+
+        # The reader's index still points at the compacted segment; its tombstone follows the blob
+        writer.delete(blobs[1])
+        writer.compact(older_than_days=1)
+        reader.delete(blobs[0])
+        writer.refresh()
+        assert not writer.exists(blobs[0])
+
+        # Compacting the last segment away doesn't free its number for a new one
+        writer.compact(older_than_days=1, min_garbage_ratio=0.5)
+        assert writer.segments_in(writer.day_dir(day)) == []
+        temp_path, digest, _ = writer.write_temp(BytesIO(IMAGE + b'new'))
+        writer.publish(temp_path, digest, day=day)
+        assert [os.path.basename(path) for path in writer.segments_in(writer.day_dir(day))] == ['segment-000003.pack']
+        assert bytes(reader.view(digest)) == IMAGE + b'new'
+    print("✓ Packfile tombstones survive compaction and segment names are never reused")
+
+
+def test_packfile_miss_reads_only_recent_and_new_index_files():
+    with tempfile.TemporaryDirectory() as root:
+        writer = PackfileStorage(root)
+        reader = PackfileStorage(root)
+        now = datetime.utcnow()
+        for days_ago in (0, 3, 4, 5):
+            temp_path, digest, _ = writer.write_temp(BytesIO(IMAGE + str(days_ago).encode()))
+            writer.publish(temp_path, digest, day=now - timedelta(days=days_ago))
+        settled = datetime.utcnow().timestamp() - 60
+        for dirpath, _, _ in os.walk(root):
+            os.utime(dirpath, (settled, settled))
+        reader.refresh()
+
+        read = []
+        read_new_records = reader._read_new_records
+        reader._read_new_records = lambda idx_path: (read.append(idx_path), read_new_records(idx_path))
+        assert reader.lookup('0' * 64) is None
+        assert read == [reader.idx_path_for(reader.segments_in(reader.day_dir(now))[0])]
+
+        # Appends to today's segment and new segments on older days are both found on a miss
+        temp_path, today, _ = writer.write_temp(BytesIO(IMAGE + b'today'))
+        writer.publish(temp_path, today)
+        old_day = now - timedelta(days=8)
+        temp_path, old, _ = writer.write_temp(BytesIO(IMAGE + b'old'))
+        writer.publish(temp_path, old, day=old_day)
+        assert reader.exists(today) and reader.exists(old)
+    print("✓ Packfile lookup misses skip unchanged index files")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test the cached active-session resolver and the one-active-session-per-employee index
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import os
+from io import BytesIO
+
+from models import db, MonitoringSession
+from session_cache import get_session_cache
+from sqlalchemy.exc import IntegrityError
+
+
+def log_activity(client, headers):
+    return client.post('/api/monitoring/activities', headers=headers, json={'activity_type': 'application'})
+
+
+def test_cache_follows_start_and_stop(app, client, login):
+    headers = login('cache@example.com').headers
+    assert log_activity(client, headers).status_code == 400
+
+    session = client.post('/api/monitoring/sessions/start', headers=headers, json={}).get_json()['session']
+    assert log_activity(client, headers).status_code == 201
+    with app.app_context():
+        assert get_session_cache().get(session['employee_id']) == session['id']
+
+    client.post('/api/monitoring/sessions/stop', headers=headers, json={})
+    with app.app_context():
+        assert get_session_cache().get(session['employee_id']) is None
+    assert log_activity(client, headers).status_code == 400
+
+    restarted = client.post('/api/monitoring/sessions/start', headers=headers, json={}).get_json()['session']
+    response = log_activity(client, headers)
+    assert response.status_code == 201
+    assert response.get_json()['session_id'] == restarted['id']
+    print("✓ Cached active session follows start/stop")
+
+
+def test_one_active_session_per_employee(app, login):
+    employee = login('unique@example.com').employee
+    with app.app_context():
+        db.session.add(MonitoringSession(employee_id=employee['id']))
+        db.session.commit()
+
+        db.session.add(MonitoringSession(employee_id=employee['id']))
+        try:
+            db.session.commit()
+            assert False, "second active session was accepted"
+        except IntegrityError:
+            db.session.rollback()
+
+        # Any number of inactive sessions is fine
+        for _ in range(2):
+            db.session.add(MonitoringSession(employee_id=employee['id'], is_active=False))
+        db.session.commit()
+    print("✓ Database allows one active session per employee")
+
+
+def test_deleted_cached_session_is_resolved_again(app, client, login):
+    headers, employee, deleted_id = login('cache-deleted@example.com', start=True)
+    assert log_activity(client, headers).status_code == 201  # Cached
+
+    # Another worker stops and deletes the session and a new one starts; this worker's cache isn't told
+    with app.app_context():
+        db.session.get(MonitoringSession, deleted_id).is_active = False
+        db.session.add(MonitoringSession(employee_id=employee['id']))
+        db.session.commit()
+        db.session.query(MonitoringSession).filter_by(id=deleted_id).delete()
+        db.session.commit()
+        get_session_cache().set(employee['id'], deleted_id)
+    response = log_activity(client, headers)
+    assert response.status_code == 201
+    current_id = response.get_json()['session_id']
+    assert current_id != deleted_id
+
+    with app.app_context():
+        get_session_cache().set(employee['id'], deleted_id)
+    response = client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(32)), 'screenshot.png'), 'folder_name': 'coding'
+    })
+    assert response.status_code == 201 and response.get_json()['screenshot']['session_id'] == current_id
+
+    # Nothing to resolve to: the agent is told there is no session instead of a 500
+    with app.app_context():
+        db.session.query(MonitoringSession).filter_by(employee_id=employee['id']).update({'is_active': False})
+        db.session.commit()
+        get_session_cache().set(employee['id'], deleted_id)
+    assert log_activity(client, headers).status_code == 400
+    print("✓ A deleted cached session is dropped and resolved again")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test session summaries: computed at stop, refreshed for active sessions, listed without extra queries
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import os
+from datetime import timedelta
+from io import BytesIO
+
+import session_summaries
+from models import db, MonitoringSession, SessionSummary
+from session_summaries import summarize_session, summarize_sessions
+
+
+def record(client, headers, application, seconds, screenshots=0, folder='coding'):
+    client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'application', 'application_name': application, 'window_title': application,
+        'duration_seconds': seconds
+    })
+    for i in range(screenshots):
+        client.post('/api/screenshots/upload', headers=headers, data={
+            'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(32)), 'screenshot.png'),
+            'folder_name': folder, 'activity_name': application
+        })
+
+
+def test_summary_computed_at_stop_and_listed_in_one_query(client, login, statements):
+    headers, _, session_id = login('summary-stop@example.com', start=True)
+    record(client, headers, 'Editor', 120, screenshots=2)
+    record(client, headers, 'Browser', 30, screenshots=1, folder='research')
+    record(client, headers, 'Editor', 60)
+    client.post('/api/monitoring/sessions/stop', headers=headers)
+
+    with statements() as executed:
+        sessions = client.get('/api/monitoring/sessions?view=summary', headers=headers).get_json()
+    assert not [s for s in executed if 'FROM activities' in s or 'FROM screenshots' in s]
+    # Joined into the session query, plus the check for stale active summaries on the page
+    assert len([s for s in executed if 'session_summaries' in s]) == 2
+    summary = sessions[0]['summary']
+    assert summary['is_final'] and summary['activity_count'] == 3 and summary['screenshot_count'] == 3
+    assert summary['active_seconds'] == 210
+    assert summary['top_applications'][0] == {'name': 'Editor', 'duration_seconds': 180, 'count': 2}
+    assert {f['name']: f['screenshot_count'] for f in summary['folders']} == {'coding': 2, 'research': 1}
+
+    full = client.get('/api/monitoring/sessions', headers=headers).get_json()
+    assert full[0]['summary'] == summary and full[0]['id'] == session_id
+    print("✓ Stopping a session materializes its summary, listed without counting rows")
+
+
+def test_refresh_and_backfill(app, client, login, statements):
+    headers, _, session_id = login('summary-active@example.com', start=True)
+    record(client, headers, 'Terminal', 40, screenshots=1)
+    with app.app_context():
+        summarize_sessions(MonitoringSession.query.filter_by(id=session_id))
+        first = db.session.get(SessionSummary, session_id)
+        assert first.activity_count == 1 and not first.is_final
+
+    # Terminal drops out of the tracked applications, then comes back with all of its time
+    tracked = session_summaries.TRACKED_APPLICATIONS
+    session_summaries.TRACKED_APPLICATIONS = 1
+    try:
+        record(client, headers, 'Mail', 50)
+        with app.app_context():
+            summarize_session(db.session.get(MonitoringSession, session_id))
+            db.session.commit()
+            assert list(db.session.get(SessionSummary, session_id).applications) == ['Mail']
+
+        record(client, headers, 'Terminal', 20, screenshots=2)
+        with app.app_context():
+            session = db.session.get(MonitoringSession, session_id)
+            with statements('activities', 'screenshots') as aggregated:
+                summary = summarize_session(session)
+                db.session.commit()
+            assert len(aggregated) == 2 and all('GROUP BY' in s for s in aggregated)
+            refreshed = summary.to_dict()
+    finally:
+        session_summaries.TRACKED_APPLICATIONS = tracked
+    assert refreshed['activity_count'] == 3 and refreshed['screenshot_count'] == 3
+    assert refreshed['top_applications'] == [{'name': 'Terminal', 'duration_seconds': 60, 'count': 2}]
+
+    # Sessions closed without a stop (or before summaries existed) are picked up by the backfill
+    with app.app_context():
+        session = db.session.get(MonitoringSession, session_id)
+        session.is_active = False
+        db.session.delete(db.session.get(SessionSummary, session_id))
+        db.session.commit()
+        query = MonitoringSession.query.outerjoin(SessionSummary).filter(
+            MonitoringSession.id == session_id, SessionSummary.is_final.isnot(True))
+        assert summarize_sessions(query) == 1
+        assert db.session.get(SessionSummary, session_id).is_final
+        assert summarize_sessions(query) == 0
+    print("✓ Active sessions are recomputed on refresh and the backfill finalizes closed ones")
+
+
+
+def test_listing_refreshes_stale_active_summaries(app, client, login, statements):
+    headers, _, session_id = login('summary-listed@example.com', start=True)
+    record(client, headers, 'Editor', 30, screenshots=1)
+    summary = client.get('/api/monitoring/sessions?view=summary', headers=headers).get_json()[0]['summary']
+    assert summary['activity_count'] == 1 and summary['screenshot_count'] == 1 and not summary['is_final']
+
+    # Fresh summaries are listed as they are
+    record(client, headers, 'Editor', 30)
+    with statements('activities', 'screenshots') as aggregated:
+        summary = client.get('/api/monitoring/sessions?view=summary', headers=headers).get_json()[0]['summary']
+    assert not aggregated and summary['activity_count'] == 1
+
+    # Once older than SESSION_SUMMARY_MAX_AGE the next listing recomputes them
+    with app.app_context():
+        db.session.get(SessionSummary, session_id).updated_at -= timedelta(
+            seconds=app.config['SESSION_SUMMARY_MAX_AGE'] + 1)
+        db.session.commit()
+    with statements('activities', 'screenshots') as aggregated:
+        summary = client.get('/api/monitoring/sessions', headers=headers).get_json()[0]['summary']
+    assert len(aggregated) == 2 and summary['activity_count'] == 2 and summary['active_seconds'] == 60
+    print("✓ Listing sessions recomputes active summaries once they are stale")
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test signed screenshot URLs and the nginx X-Accel-Redirect handoff
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import time
+from io import BytesIO
+from urllib.parse import urlsplit, parse_qs
+
+from PIL import Image
+from signed_urls import verify_signature
+from storage import get_storage, parse_ref
+
+
+def png(size=(640, 400)):
+    out = BytesIO()
+    Image.new('RGB', size, (12, 34, 56)).save(out, 'PNG')
+    return out.getvalue()
+
+
+IMAGE = png()
+
+
+def listed_screenshot(client, headers):
+    upload = client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(IMAGE), 'screenshot.png'), 'folder_name': 'testing'
+    }).get_json()['screenshot']
+    listed = client.get(f"/api/screenshots/session/{upload['session_id']}", headers=headers).get_json()
+    return next(s for s in listed if s['id'] == upload['id'])
+
+
+def path_of(url):
+    parts = urlsplit(url)
+    return f'{parts.path}?{parts.query}'
+
+
+def test_signed_urls_work_without_token(app, client, login):
+    screenshot = listed_screenshot(client, login('signed@example.com', start=True).headers)
+    assert screenshot['url'].startswith('http://localhost/api/screenshots/')
+
+    response = client.get(path_of(screenshot['url']))
+    assert response.status_code == 200 and response.get_data() == IMAGE
+    assert response.cache_control.immutable
+    thumb = client.get(path_of(screenshot['thumb_url']))
+    assert thumb.status_code == 200 and thumb.mimetype == 'image/jpeg'
+
+    # Another size, another screenshot or a changed expiry invalidates the signature
+    query = parse_qs(urlsplit(screenshot['url']).query)
+    forged = path_of(screenshot['url']).replace('/signed/original', '/signed/preview')
+    assert client.get(forged).status_code == 403
+    forged = path_of(screenshot['url']).replace(f"expires={query['expires'][0]}",
+                                                f"expires={int(query['expires'][0]) + 3600}")
+    assert client.get(forged).status_code == 403
+    assert client.get(path_of(screenshot['url']).split('&sig=')[0]).status_code == 403
+
+    with app.test_request_context():
+        later = int(query['expires'][0]) + 1
+        assert not verify_signature(screenshot['id'], 'original', query['expires'][0], query['sig'][0], now=later)
+        # Valid for at least the TTL; the rounded expiry keeps the URL stable between list calls
+        assert int(query['expires'][0]) > time.time() + app.config['SCREENSHOT_URL_TTL']
+    print("✓ Signed URLs serve screenshots without a token and reject tampering")
+
+
+def test_accel_redirect_handoff(app, client, login):
+    screenshot = listed_screenshot(client, login('accel@example.com', start=True).headers)
+    digest = parse_ref(screenshot['file_path'])
+    with app.app_context():
+        storage = get_storage()
+    storage.accel_redirect = '/_screenshot_blobs/'
+    try:
+        response = client.get(path_of(screenshot['url']))
+    finally:
+        storage.accel_redirect = None
+
+    assert response.status_code == 200 and response.get_data() == b''
+    assert response.headers['X-Accel-Redirect'] == f'/_screenshot_blobs/{digest[:2]}/{digest[2:4]}/{digest}'
+    assert response.headers['ETag'] == f'"{digest}"'
+    assert response.mimetype == 'image/png' and response.cache_control.private
+    print("✓ Blob bytes handed to nginx with X-Accel-Redirect")
+
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test streamed JSON responses: same bodies as before, rows read while the body is written
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, insert
+from models import db, Activity
+import streaming
+from streaming import JsonArray, iter_json
+
+ACTIVITIES = 3000
+
+
+def test_iter_json_matches_json():
+    value = {'a': [1, {'b': JsonArray(iter(range(3)), lambda n: {'n': n})}], 'c': JsonArray([]), 'd': 'é'}
+    expected = {'a': [1, {'b': [{'n': 0}, {'n': 1}, {'n': 2}]}], 'c': [], 'd': 'é'}
+    assert json.loads(b''.join(iter_json(value))) == expected
+    encoder, streaming.orjson = streaming.orjson, None  # Without the optional encoder
+    try:
+        value['a'][1]['b'].rows = iter(range(3))
+        assert json.loads(b''.join(iter_json(value))) == expected
+    finally:
+        streaming.orjson = encoder
+    print("✓ Streamed JSON decodes to the same value")
+
+
+def test_listings_stream_rows_as_they_are_read(app, client, login):
+    headers, _, session_id = login('streaming@example.com', start=True)
+    start = datetime.utcnow() - timedelta(hours=1)
+    with app.app_context():
+        db.session.execute(insert(Activity), [
+            {'session_id': session_id, 'timestamp': start + timedelta(seconds=i), 'activity_type': 'application',
+             'application_name': f'App {i % 7}', 'window_title': 'Window ' * 20, 'duration_seconds': 5}
+            for i in range(ACTIVITIES)
+        ])
+        db.session.commit()
+
+    loaded = []
+
+    def count_load(target, context):
+        loaded.append(target.id)
+
+    event.listen(Activity, 'load', count_load)
+    try:
+        response = client.get(f'/api/monitoring/activities?session_id={session_id}', headers=headers,
+                              buffered=False)
+        assert response.status_code == 200 and response.is_streamed
+        body = iter(response.response)
+        first = next(body)
+        assert first.startswith(b'[{') and len(loaded) < ACTIVITIES  # Sent before every row was read
+        activities = json.loads(first + b''.join(body))
+        response.close()
+    finally:
+        event.remove(Activity, 'load', count_load)
+    assert len(activities) == ACTIVITIES and activities[0]['application_name'] == 'App 0'
+    assert [a['id'] for a in activities] == sorted(a['id'] for a in activities)
+
+    current = client.get('/api/monitoring/sessions/current', headers=headers).get_json()['session']
+    assert current['id'] == session_id and len(current['activities']) == ACTIVITIES
+    assert current['screenshots'] == [] and current['activities'][-1]['duration_seconds'] == 5
+
+    paged = client.get(f'/api/monitoring/activities?session_id={session_id}&limit=10', headers=headers)
+    assert len(paged.get_json()) == 10 and paged.headers.get('X-Next-Cursor')
+    print("✓ Activity and current-session listings stream their rows")
+
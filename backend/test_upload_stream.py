@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Test streaming screenshot uploads: size limit enforcement and dimension sniffing
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import os
+from io import BytesIO
+
+from models import Screenshot
+from storage import get_storage
+from upload_stream import image_dimensions
+from PIL import Image
+
+
+def encode(size, fmt, **params):
+    buffer = BytesIO()
+    Image.new('RGB', size, (30, 60, 90)).save(buffer, format=fmt, **params)
+    return buffer.getvalue()
+
+
+def upload(client, headers, content, name='screenshot.png'):
+    return client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(content), name),
+        'folder_name': 'testing'
+    })
+
+
+def test_image_dimensions():
+    assert image_dimensions(encode((37, 21), 'PNG')) == (37, 21)
+    assert image_dimensions(encode((640, 480), 'JPEG', exif=b'Exif\x00\x00' + b'\x00' * 2000)) == (640, 480)
+    assert image_dimensions(encode((12, 8), 'GIF')) == (12, 8)
+    assert image_dimensions(b'not an image') == (None, None)
+    print("✓ Dimensions sniffed from PNG, JPEG and GIF headers")
+
+
+def test_upload_records_dimensions(app, client, login):
+    headers = login('dimensions@example.com', start=True).headers
+    response = upload(client, headers, encode((320, 200), 'PNG'))
+    assert response.status_code == 201, response.get_data(as_text=True)
+    screenshot = response.get_json()['screenshot']
+    assert (screenshot['width'], screenshot['height']) == (320, 200)
+
+    with app.app_context():
+        assert os.listdir(get_storage().tmp_dir) == []
+    print("✓ Upload records width/height and leaves no temp files")
+
+
+def test_large_upload_with_line_breaks_accepted(client, login):
+    # Line breaks at chunk ends make the parser carry bytes over into the next read
+    headers = login('line-breaks@example.com', start=True).headers
+    response = upload(client, headers, b'\x89PNG\r\n\x1a\n' + b'\r\n' * 400_000)
+    assert response.status_code == 201, response.get_data(as_text=True)
+    print("✓ Multi-chunk upload accepted")
+
+
+def test_oversized_upload_rejected(app, client, login):
+    headers = login('oversized@example.com', start=True).headers
+    limit = app.config['MAX_SCREENSHOT_SIZE']
+    app.config['MAX_SCREENSHOT_SIZE'] = 50_000
+    try:
+        with app.app_context():
+            before = Screenshot.query.count()
+        response = upload(client, headers, b'\x89PNG\r\n\x1a\n' + os.urandom(100_000))
+    finally:
+        app.config['MAX_SCREENSHOT_SIZE'] = limit
+
+    assert response.status_code == 413
+    assert 'error' in response.get_json()
+    with app.app_context():
+        assert Screenshot.query.count() == before
+        assert os.listdir(get_storage().tmp_dir) == []
+    print("✓ Oversized upload rejected with 413 and temp file removed")
+
+
+def test_upload_limit_only_applies_to_uploads(app, client, login):
+    headers = login('large-json@example.com', start=True).headers
+    padding = 'x' * (app.config['MAX_SCREENSHOT_SIZE'] + 2 * 1024 * 1024)
+    response = client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'application', 'application_name': 'Editor', 'padding': padding})
+    assert response.status_code in (200, 201, 202), response.status_code
+    print("✓ Screenshot size limit doesn't cap other request bodies")
+
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Test the daily usage rollups: incremental, idempotent updates and the analytics endpoint
+Run with pytest (fixtures in conftest.py), no server needed
+"""
+import os
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import usage_rollups
+from models import db, Activity, MonitoringSession
+from retention import archive_session, restore_session
+from storage import get_storage
+from usage_rollups import update_rollups
+
+TODAY = datetime.utcnow().replace(hour=12, minute=0, second=0, microsecond=0)
+YESTERDAY = TODAY - timedelta(days=1)
+
+
+def activity(client, headers, application, seconds, at, url=None):
+    client.post('/api/monitoring/activities', headers=headers, json={
+        'activity_type': 'website' if url else 'application', 'application_name': application, 'url': url,
+        'window_title': application, 'duration_seconds': seconds, 'captured_at': at.isoformat() + 'Z'
+    })
+
+
+def screenshot(client, headers, folder):
+    client.post('/api/screenshots/upload', headers=headers, data={
+        'file': (BytesIO(b'\x89PNG\r\n\x1a\n' + os.urandom(32)), 'screenshot.png'), 'folder_name': folder
+    })
+
+
+def usage(client, headers, **params):
+    params.setdefault('from', YESTERDAY.date().isoformat())
+    response = client.get('/api/analytics/usage', headers=headers, query_string=params)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['usage']
+
+
+def rollup(app):
+    with app.app_context():
+        return update_rollups(batch_size=2)
+
+
+def test_rollups_update_incrementally_and_idempotently(app, client, login, statements):
+    admin = login('rollup-admin@example.com', 'Rollup Org', role='admin').headers
+    alice, alice_employee, _ = login('rollup-alice@example.com', 'Rollup Org', start=True)
+    bob, bob_employee, _ = login('rollup-bob@example.com', 'Rollup Org', start=True)
+    outsider = login('rollup-outsider@example.com', 'Other Rollup Org', start=True).headers
+    activity(client, alice, 'Editor', 100, YESTERDAY)
+    activity(client, alice, 'Browser', 30, YESTERDAY, url='docs.example.com')
+    activity(client, alice, 'Editor', 50, TODAY)
+    activity(client, bob, 'Editor', 20, TODAY)
+    activity(client, outsider, 'Editor', 999, TODAY)
+    screenshot(client, alice, 'coding')
+    screenshot(client, alice, 'coding')
+
+    counted = rollup(app)
+    assert counted['activities'] >= 5 and counted['screenshots'] >= 2
+    with statements('activities', 'screenshots') as raw_event_reads:
+        org_usage = usage(client, admin)
+    assert not raw_event_reads  # Served from the rollups alone
+    editor = org_usage[0]
+    assert editor == {'name': 'Editor', 'total_seconds': 170, 'switch_count': 3, 'screenshot_count': 0}
+
+    by_day = usage(client, admin, group_by='day,employee', employee_id=alice_employee['id'])
+    assert {(u['day'], u['name']): u['total_seconds'] for u in by_day} == {
+        (YESTERDAY.date().isoformat(), 'Editor'): 100, (YESTERDAY.date().isoformat(), 'Browser'): 30,
+        (TODAY.date().isoformat(), 'Editor'): 50}
+    assert usage(client, admin, dimension='url') == [
+        {'name': 'docs.example.com', 'total_seconds': 30, 'switch_count': 1, 'screenshot_count': 0}]
+    folders = usage(client, alice, dimension='folder')
+    assert folders[0]['name'] == 'coding' and folders[0]['screenshot_count'] == 2
+
+    # Re-running counts nothing twice; new rows are added on top
+    assert rollup(app)['activities'] == 0
+    assert usage(client, admin)[0] == editor
+    activity(client, bob, 'Editor', 10, TODAY)
+    assert rollup(app)['activities'] == 1
+    assert usage(client, admin)[0]['total_seconds'] == 180
+
+    # Employees only see their own usage
+    assert usage(client, bob, employee_id=alice_employee['id']) == [
+        {'name': 'Editor', 'total_seconds': 30, 'switch_count': 2, 'screenshot_count': 0}]
+    print("✓ Usage rollups update incrementally, idempotently and per organization")
+
+
+def test_rollups_stop_below_unsettled_ids(app, client, login):
+    carol, carol_employee, _ = login('rollup-carol@example.com', 'Settle Org', start=True)
+    rollup(app)
+    activity(client, carol, 'Editor', 10, TODAY)
+    activity(client, carol, 'Editor', 20, TODAY)
+    with app.app_context():
+        first, second = [row.id for row in Activity.query.join(MonitoringSession).filter(
+            MonitoringSession.employee_id == carol_employee['id']).order_by(Activity.id)]
+
+    # Rows past the settled id wait for a later run
+    settled_id = usage_rollups._settled_id
+    usage_rollups._settled_id = lambda model, timeout: first if model is Activity else settled_id(model, timeout)
+    try:
+        assert rollup(app)['activities'] == 1
+    finally:
+        usage_rollups._settled_id = settled_id
+    assert usage(client, carol)[0]['total_seconds'] == 10
+    assert rollup(app)['activities'] == 1
+    assert usage(client, carol)[0]['total_seconds'] == 30
+
+    with app.app_context():
+        if db.engine.dialect.name == 'postgresql':
+            # An insert still in flight on another connection holds the watermark back
+            with db.engine.connect() as other:
+                session_id = db.session.query(MonitoringSession.id).filter_by(
+                    employee_id=carol_employee['id']).scalar()
+                other.execute(Activity.__table__.insert(), {'session_id': session_id, 'activity_type': 'application'})
+                assert usage_rollups._settled_id(Activity, timeout=0.2) is None
+                other.rollback()
+            assert usage_rollups._settled_id(Activity, timeout=0.2) is not None
+    print("✓ Usage rollups only count ids no transaction in flight can still take")
+
+
+def test_restored_sessions_are_not_counted_again(app, client, login):
+    dave, dave_employee, _ = login('rollup-dave@example.com', 'Restore Rollup Org', start=True)
+    activity(client, dave, 'Editor', 40, TODAY)
+    screenshot(client, dave, 'coding')
+    client.post('/api/monitoring/sessions/stop', headers=dave)
+    rollup(app)
+    counted = usage(client, dave) + usage(client, dave, dimension='folder')
+    assert counted
+
+    with app.app_context():
+        session = MonitoringSession.query.filter_by(employee_id=dave_employee['id']).one()
+        ids = [row.id for row in Activity.query.filter_by(session_id=session.id)]
+        archive_session(session, get_storage())
+    # Rows added meanwhile take the next ids, so restored rows can't get theirs by chance
+    erin = login('rollup-erin@example.com', 'Restore Rollup Org', start=True).headers
+    activity(client, erin, 'Terminal', 5, TODAY)
+    screenshot(client, erin, 'shell')
+    rollup(app)
+    assert usage(client, dave) + usage(client, dave, dimension='folder') == counted
+
+    with app.app_context():
+        session = MonitoringSession.query.filter_by(employee_id=dave_employee['id']).one()
+        restore_session(session)
+        assert [row.id for row in Activity.query.filter_by(session_id=session.id)] == ids
+    rollup(app)
+    assert usage(client, dave) + usage(client, dave, dimension='folder') == counted
+    print("✓ Archiving and restoring a session leaves its rollups as they were")
+
+
+def test_usage_parameters_are_validated(client, login):
+    admin = login('rollup-params@example.com', 'Rollup Org', role='admin').headers
+    for params in ({'dimension': 'keyboard'}, {'group_by': 'month'}, {'from': 'yesterday'}):
+        assert client.get('/api/analytics/usage', headers=admin, query_string=params).status_code == 400
+    print("✓ Usage parameters are validated")
+
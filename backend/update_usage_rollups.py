@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+"""
+Usage Rollup Update
+Counts the activities and screenshots added since the last run into the daily
+usage_rollups (see usage_rollups.py). Run it from cron, e.g. every 15 minutes;
+re-running or resuming after an interruption never counts a row twice.
+"""
+
+import argparse
+from app import create_app
+from usage_rollups import SOURCES, update_rollups
+
+def main():
+    parser = argparse.ArgumentParser(description='Update the daily usage rollups')
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES))
+    parser.add_argument('--batch-size', type=int, default=5000, help='events per transaction')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        counted = update_rollups(batch_size=args.batch_size, sources=args.sources)
+        for source in args.sources:
+            print(f"✓ Counted {counted[source]} new {source}")
+        print(f"✓ Updated {counted['rollups']} rollup row(s)")
+
+if __name__ == '__main__':
+    main()
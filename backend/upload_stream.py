@@ -0,0 +1,144 @@
+"""
+Streaming Upload Handling
+Parses multipart uploads straight into a temp file in the storage backend's temp
+directory, enforcing the size limit while reading and computing the SHA-256,
+byte size and image dimensions in the same single pass over the bytes.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+from contextlib import contextmanager
+from flask import request
+from werkzeug.exceptions import BadRequest, RequestEntityTooLarge
+from werkzeug.formparser import parse_form_data
+
+HEADER_BYTES = 64 * 1024  # enough to find a JPEG SOF marker behind typical EXIF data
+# Also caps werkzeug's parse buffer, which holds a 64KB read chunk plus any partial
+# boundary left from the previous one, so it must stay well above the chunk size
+MAX_FORM_FIELDS_SIZE = 128 * 1024
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def image_dimensions(header):
+    """(width, height) from the first bytes of a PNG, JPEG or GIF, else (None, None)"""
+    if header[:8] == b'\x89PNG\r\n\x1a\n' and header[12:16] == b'IHDR' and len(header) >= 24:
+        return struct.unpack('>II', header[16:24])
+
+    if header[:6] in (b'GIF87a', b'GIF89a') and len(header) >= 10:
+        return struct.unpack('<HH', header[6:10])
+
+    if header[:2] == b'\xff\xd8':
+        i = 2
+        while i + 9 <= len(header):
+            if header[i] != 0xFF:
+                i += 1
+                continue
+            marker = header[i + 1]
+            if marker in JPEG_SOF_MARKERS:
+                height, width = struct.unpack('>HH', header[i + 5:i + 9])
+                return width, height
+            if marker == 0xFF:
+                i += 1  # fill byte
+            elif marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+                i += 2  # markers without a length
+            else:
+                i += 2 + struct.unpack('>H', header[i + 2:i + 4])[0]
+
+    return None, None
+
+
+class HashingUploadFile:
+    """
+    Write target handed to the multipart parser for each uploaded file
+
+    Every chunk is size-checked, hashed and written to a temp file as it
+    arrives, so nothing is buffered in memory and nothing is re-read.
+    """
+
+    def __init__(self, tmp_dir, max_size):
+        self.max_size = max_size
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.header = bytearray()
+        self.digest = None
+        self.width = None
+        self.height = None
+        fd, self.path = tempfile.mkstemp(dir=tmp_dir, suffix='.part')
+        self.file = os.fdopen(fd, 'w+b')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            raise RequestEntityTooLarge(f"Screenshot exceeds {self.max_size} bytes")
+        if len(self.header) < HEADER_BYTES:
+            self.header += data[:HEADER_BYTES - len(self.header)]
+        self.hasher.update(data)
+        self.file.write(data)
+        return len(data)
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def tell(self):
+        return self.file.tell()
+
+    def read(self, *args):
+        return self.file.read(*args)
+
+    def finish(self):
+        """Close the temp file and record digest and dimensions"""
+        if not self.file.closed:
+            self.file.close()
+        self.digest = self.hasher.hexdigest()
+        self.width, self.height = image_dimensions(bytes(self.header))
+
+    def detach(self):
+        """Hand the temp file over to the caller; discard() then leaves it alone"""
+        path, self.path = self.path, None
+        return path
+
+    def discard(self):
+        if not self.file.closed:
+            self.file.close()
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+@contextmanager
+def receive_upload(tmp_dir, max_size):
+    """
+    Parse the current multipart request, streaming files into tmp_dir
+
+    Yields (form, files); each file's .stream is a finished HashingUploadFile.
+    Temp files that weren't moved elsewhere are removed on exit.
+    Raises RequestEntityTooLarge past max_size and BadRequest on a malformed body.
+    """
+    uploads = []
+
+    def stream_factory(total_content_length, content_type, filename=None, content_length=None):
+        if content_length and content_length > max_size:
+            raise RequestEntityTooLarge(f"Screenshot exceeds {max_size} bytes")
+        upload = HashingUploadFile(tmp_dir, max_size)
+        uploads.append(upload)
+        return upload
+
+    try:
+        try:
+            _, form, files = parse_form_data(
+                request.environ,
+                stream_factory=stream_factory,
+                max_form_memory_size=MAX_FORM_FIELDS_SIZE,
+                # The body limit of this request only; other endpoints keep Flask's default
+                max_content_length=max_size + MAX_FORM_FIELDS_SIZE,
+                silent=False
+            )
+        except ValueError as e:
+            raise BadRequest(f"Malformed upload: {e}")
+        for upload in uploads:
+            upload.finish()
+        yield form, files
+    finally:
+        for upload in uploads:
+            upload.discard()
@@ -0,0 +1,206 @@
+"""
+Daily Usage Rollups
+usage_rollups holds one row per (employee, UTC day, dimension, name) with the
+organization it was counted under:
+
+    application   activities by application_name: seconds and switches to it
+    url           website activities by url: seconds and switches to it
+    folder        screenshots by folder_name: count and seconds at the capture interval
+
+so a month of organization-wide usage is a range scan over a few thousand rollup
+rows instead of millions of activities and screenshots. The agent logs one
+activity per window switch, so switch_count is the number of activity events.
+
+update_rollups() (update_usage_rollups.py, e.g. from cron) only aggregates rows
+past each table's watermark in rollup_watermarks, a batch at a time: the batch's
+rollup increments and the new watermark commit together, so an interrupted or
+repeated run never counts a row twice. Rollups outlive archived and deleted
+sessions; deleting an employee deletes their rollups.
+
+Ids are taken when a row is inserted, not when it commits, so on PostgreSQL a
+transaction still in flight (another worker, the async batch writer) can hold a
+lower id than rows that are already visible. Each run therefore only counts up to
+the highest id visible once every transaction that was running at that moment has
+finished (pg_current_snapshot's xmin passes a transaction id taken right after);
+a later run picks up the rest. On SQLite writers
+take turns, so every visible id is settled.
+"""
+
+import logging
+import time
+from collections import Counter
+from datetime import date, datetime
+from sqlalchemy import func, text
+from models import db, Activity, Employee, MonitoringSession, Organization, RollupWatermark, Screenshot, UsageRollup
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ('application', 'url', 'folder')
+SETTLE_TIMEOUT = 30  # Seconds to wait for in-flight inserts before skipping a source
+
+
+def _day(value):
+    # func.date() is a date on PostgreSQL and a 'YYYY-MM-DD' string on SQLite
+    return value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+
+
+def _watermark(source):
+    """The source's watermark row, locked for the rest of the transaction"""
+    mark = RollupWatermark.query.filter_by(source=source).with_for_update().first()
+    if mark is None:
+        mark = RollupWatermark(source=source, last_id=0)
+        db.session.add(mark)
+        db.session.flush()
+    return mark
+
+
+def _settled_id(model, timeout=SETTLE_TIMEOUT):
+    """
+    Highest id of model below which no row can still appear, None if transactions
+    in flight didn't finish within timeout
+
+    Commits first: a transaction of our own would hold the snapshot back.
+    """
+    db.session.commit()
+    last_id = db.session.query(func.max(model.id)).scalar() or 0
+    if db.session.get_bind().dialect.name != 'postgresql':
+        db.session.commit()
+        return last_id
+    # Every id up to last_id was taken by a transaction numbered below this (committed) one
+    xid = db.session.execute(text('SELECT pg_current_xact_id()::text')).scalar()
+    db.session.commit()
+    deadline = time.monotonic() + timeout
+    while not db.session.execute(text('SELECT pg_snapshot_xmin(pg_current_snapshot()) > CAST(:xid AS xid8)'),
+                                 {'xid': xid}).scalar():
+        if time.monotonic() > deadline:
+            return None
+        time.sleep(0.05)
+    return last_id
+
+
+def _batch_end(model, last_id, settled_id, batch_size):
+    """Id of the last row of the next batch past last_id, None if there are no new settled rows"""
+    ids = db.session.query(model.id).filter(model.id > last_id, model.id <= settled_id) \
+        .order_by(model.id).limit(batch_size).subquery()
+    return db.session.query(func.max(ids.c.id)).scalar()
+
+
+def _owned(query, model):
+    return query.select_from(model).join(MonitoringSession, MonitoringSession.id == model.session_id).join(
+        Employee, Employee.id == MonitoringSession.employee_id)
+
+
+def _activity_groups(first_id, last_id):
+    """((employee_id, day, dimension, name), organization_id, seconds, switches, screenshots) of an id range"""
+    day = func.date(Activity.timestamp)
+    for dimension, name in (('application', func.coalesce(Activity.application_name, 'Unknown')),
+                            ('url', Activity.url)):
+        query = _owned(db.session.query(
+            Employee.organization_id, MonitoringSession.employee_id, day, name,
+            func.coalesce(func.sum(Activity.duration_seconds), 0), func.count(Activity.id)
+        ), Activity).filter(Activity.id > first_id, Activity.id <= last_id, Activity.timestamp.isnot(None))
+        if dimension == 'url':
+            query = query.filter(Activity.url.isnot(None))
+        for organization_id, employee_id, event_day, event_name, seconds, count in query.group_by(
+                Employee.organization_id, MonitoringSession.employee_id, day, name):
+            yield (employee_id, _day(event_day), dimension, event_name[:1000]), organization_id, int(seconds), count, 0
+
+
+def _screenshot_groups(first_id, last_id):
+    day = func.date(Screenshot.timestamp)
+    folder = func.coalesce(Screenshot.folder_name, '')
+    interval = func.coalesce(Organization.screenshot_interval, 10)
+    query = _owned(db.session.query(
+        Employee.organization_id, MonitoringSession.employee_id, day, folder, interval, func.count(Screenshot.id)
+    ), Screenshot).outerjoin(Organization, Organization.id == Employee.organization_id).filter(
+        Screenshot.id > first_id, Screenshot.id <= last_id, Screenshot.timestamp.isnot(None))
+    for organization_id, employee_id, event_day, name, seconds, count in query.group_by(
+            Employee.organization_id, MonitoringSession.employee_id, day, folder, interval):
+        yield (employee_id, _day(event_day), 'folder', name), organization_id, seconds * count, 0, count
+
+
+SOURCES = {
+    'activities': (Activity, _activity_groups),
+    'screenshots': (Screenshot, _screenshot_groups),
+}
+
+
+def _add(groups):
+    """Add grouped increments to their rollup rows (created as needed); returns the rows touched"""
+    increments = {}
+    for key, organization_id, seconds, switches, screenshots in groups:
+        entry = increments.setdefault(key, [organization_id, 0, 0, 0])
+        entry[1] += seconds
+        entry[2] += switches
+        entry[3] += screenshots
+    if not increments:
+        return 0
+
+    existing = {
+        (row.employee_id, row.day, row.dimension, row.name): row
+        for row in UsageRollup.query.filter(
+            UsageRollup.employee_id.in_({key[0] for key in increments}),
+            UsageRollup.day.in_({key[1] for key in increments})
+        )
+    }
+    for key, (organization_id, seconds, switches, screenshots) in increments.items():
+        row = existing.get(key)
+        if row is None:
+            employee_id, day, dimension, name = key
+            row = UsageRollup(organization_id=organization_id, employee_id=employee_id, day=day,
+                              dimension=dimension, name=name, total_seconds=0, switch_count=0, screenshot_count=0)
+            db.session.add(row)
+        row.total_seconds += seconds
+        row.switch_count += switches
+        row.screenshot_count += screenshots
+    return len(increments)
+
+
+def update_rollups(batch_size=5000, sources=tuple(SOURCES), settle_timeout=SETTLE_TIMEOUT):
+    """
+    Count the rows added since the last run into usage_rollups
+
+    Commits once per batch of at most batch_size rows. Returns a Counter of the
+    rows counted per source and of the rollup rows touched ('rollups').
+    """
+    counted = Counter()
+    for source in sources:
+        model, groups = SOURCES[source]
+        started = datetime.utcnow()
+        settled_id = _settled_id(model, settle_timeout)
+        if settled_id is None:
+            logger.warning("Skipping %s rollups: inserts still in flight after %ss", source, settle_timeout)
+            continue
+        while True:
+            mark = _watermark(source)
+            batch_end = _batch_end(model, mark.last_id, settled_id, batch_size)
+            if batch_end is None:
+                mark.updated_at = started  # Up to date as of the settled snapshot
+                db.session.commit()
+                break
+            counted[source] += db.session.query(func.count(model.id)).filter(
+                model.id > mark.last_id, model.id <= batch_end).scalar()
+            counted['rollups'] += _add(groups(mark.last_id, batch_end))
+            mark.last_id = batch_end
+            db.session.commit()
+    return counted
+
+
+def usage_query(dimension, start, end, group_by=()):
+    """
+    Summed rollups of one dimension over [start, end), by name plus any of
+    'day' and 'employee' in group_by, busiest first (filter it before running)
+    """
+    columns = [UsageRollup.name]
+    if 'day' in group_by:
+        columns.append(UsageRollup.day)
+    if 'employee' in group_by:
+        columns.append(UsageRollup.employee_id)
+    total_seconds = func.sum(UsageRollup.total_seconds).label('total_seconds')
+    return db.session.query(
+        *columns, total_seconds,
+        func.sum(UsageRollup.switch_count).label('switch_count'),
+        func.sum(UsageRollup.screenshot_count).label('screenshot_count')
+    ).filter(
+        UsageRollup.dimension == dimension, UsageRollup.day >= start, UsageRollup.day < end
+    ).group_by(*columns).order_by(total_seconds.desc(), *columns)
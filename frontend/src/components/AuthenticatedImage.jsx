@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { Image as ImageIcon } from 'lucide-react';
 import api from '../services/api';
 
-const AuthenticatedImage = ({ url, alt, className, onClick }) => {
+const AuthenticatedImage = ({ url, size, alt, className, onClick }) => {
   const [imageSrc, setImageSrc] = useState(null);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState(false);
@@ -13,7 +13,8 @@ const AuthenticatedImage = ({ url, alt, className, onClick }) => {
     const fetchImage = async () => {
       try {
         setLoading(true);
-        const response = await api.get(url, { responseType: 'blob' });
+        // size: 'thumb' or 'preview' asks the backend for a downsized JPEG
+        const response = await api.get(url, { responseType: 'blob', params: size ? { size } : undefined });
         
         if (isMounted) {
           const objectUrl = URL.createObjectURL(response.data);
@@ -39,7 +40,7 @@ const AuthenticatedImage = ({ url, alt, className, onClick }) => {
         URL.revokeObjectURL(imageSrc);
       }
     };
-  }, [url]);
+  }, [url, size]);
 
   if (loading) {
     return (
@@ -333,9 +333,10 @@ const ProcessMiningModal = ({ sessionId, onClose, apiUrl, token }) => {
                             {activityDetails.screenshots.slice(0, 6).map((screenshot) => (
                               <div key={screenshot.id} className="screenshot-thumb">
                                 <img 
-                                  src={`${apiUrl}/screenshots/${screenshot.id}/file?token=${token}`}
+                                  src={screenshot.thumb_url}
                                   alt={`Screenshot at ${new Date(screenshot.timestamp).toLocaleTimeString()}`}
-                                  onClick={() => window.open(`${apiUrl}/screenshots/${screenshot.id}/file?token=${token}`, '_blank')}
+                                  loading="lazy"
+                                  onClick={() => window.open(screenshot.url, '_blank')}
                                 />
                                 <span className="screenshot-time">
                                   {new Date(screenshot.timestamp).toLocaleTimeString()}
@@ -3,7 +3,6 @@ import React, { useState, useEffect } from 'react';
 import { useAuth } from '../context/AuthContext';
 import { monitoringAPI, screenshotAPI, workflowAPI } from '../services/api';
 import { Play, Square, RefreshCw, Clock, Image, Activity, Download, FileText, Layers, TrendingUp, LogOut } from 'lucide-react';
-import AuthenticatedImage from '../components/AuthenticatedImage';
 
 import ProcessMiningModal from '../components/ProcessMiningModal';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell, LineChart, Line } from 'recharts';
@@ -11,12 +10,18 @@ import './EmployeeDashboard.css';
 import { formatToIST, formatTimeToIST } from '../utils/dateUtils';
 import BackgroundAnimation from '../components/BackgroundAnimation';
 
+// Screenshots per gallery page; the rest load on demand
+const SCREENSHOT_PAGE_SIZE = 60;
+// Only what the gallery shows, not the full extraction JSON
+const SCREENSHOT_FIELDS = 'id,timestamp,is_processed,extracted_text,thumb_url,url';
+
 const EmployeeDashboard = () => {
   const { user, logout } = useAuth();
   const [sessions, setSessions] = useState([]);
   const [currentSession, setCurrentSession] = useState(null);
   const [selectedSession, setSelectedSession] = useState(null);
   const [screenshots, setScreenshots] = useState([]);
+  const [screenshotsCursor, setScreenshotsCursor] = useState(null);
   const [activities, setActivities] = useState([]);
   const [loading, setLoading] = useState(true);
   const [processing, setProcessing] = useState(false);
@@ -65,16 +70,31 @@ const EmployeeDashboard = () => {
     setSelectedSession(session);
     try {
       const [screenshotsRes, activitiesRes] = await Promise.all([
-        screenshotAPI.getSessionScreenshots(session.id),
+        screenshotAPI.getSessionScreenshots(session.id, { limit: SCREENSHOT_PAGE_SIZE, fields: SCREENSHOT_FIELDS }),
         monitoringAPI.getActivities(session.id),
       ]);
       setScreenshots(screenshotsRes.data);
+      setScreenshotsCursor(screenshotsRes.headers['x-next-cursor'] || null);
       setActivities(activitiesRes.data);
     } catch (error) {
       console.error('Failed to load session details:', error);
     }
   };
 
+  const loadMoreScreenshots = async () => {
+    try {
+      const res = await screenshotAPI.getSessionScreenshots(selectedSession.id, {
+        limit: SCREENSHOT_PAGE_SIZE,
+        cursor: screenshotsCursor,
+        fields: SCREENSHOT_FIELDS,
+      });
+      setScreenshots((loaded) => [...loaded, ...res.data]);
+      setScreenshotsCursor(res.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Failed to load more screenshots:', error);
+    }
+  };
+
   const downloadScreenshot = async (screenshotId) => {
     try {
       const response = await screenshotAPI.getFile(screenshotId);
@@ -111,8 +131,12 @@ const EmployeeDashboard = () => {
       await screenshotAPI.extractBatch(screenshotIds);
       
       // Refresh screenshots to get updated data
-      const screenshotsRes = await screenshotAPI.getSessionScreenshots(selectedSession.id);
+      const screenshotsRes = await screenshotAPI.getSessionScreenshots(selectedSession.id, {
+        limit: Math.min(Math.max(screenshots.length, SCREENSHOT_PAGE_SIZE), 1000),
+        fields: SCREENSHOT_FIELDS,
+      });
       setScreenshots(screenshotsRes.data);
+      setScreenshotsCursor(screenshotsRes.headers['x-next-cursor'] || null);
       
       alert(`Successfully processed ${screenshotIds.length} screenshots!`);
       
@@ -301,6 +325,8 @@ const EmployeeDashboard = () => {
                   <th>Start Time</th>
                   <th>End Time</th>
                   <th>Duration</th>
+                  <th>Screenshots</th>
+                  <th>Top App</th>
                   <th>Status</th>
                   <th>Actions</th>
                 </tr>
@@ -311,6 +337,8 @@ const EmployeeDashboard = () => {
                     <td>{formatToIST(session.start_time)}</td>
                     <td>{formatToIST(session.end_time)}</td>
                     <td>{session.duration_seconds ? `${Math.round(session.duration_seconds / 60)} min` : '-'}</td>
+                    <td>{session.summary ? session.summary.screenshot_count : '-'}</td>
+                    <td>{session.summary?.top_applications[0]?.name || '-'}</td>
                     <td>
                       <span className={`badge badge-${session.is_active ? 'success' : 'danger'}`}>
                         {session.is_active ? 'Active' : 'Ended'}
@@ -381,11 +409,12 @@ const EmployeeDashboard = () => {
                 {screenshots.map((screenshot) => (
                   <div key={screenshot.id} className="screenshot-card">
                     <div className="screenshot-image-container">
-                      <AuthenticatedImage 
-                        url={`/screenshots/${screenshot.id}/file`}
+                      <img 
+                        src={screenshot.thumb_url}
                         alt={`Screenshot ${screenshot.id}`}
                         className="screenshot-image"
-                        onClick={() => window.open(`${import.meta.env.VITE_API_URL || 'http://localhost:5001/api'}/screenshots/${screenshot.id}/file?token=${localStorage.getItem('token')}`, '_blank')}
+                        loading="lazy"
+                        onClick={() => window.open(screenshot.url, '_blank')}
                       />
                     </div>
                     <div className="screenshot-info">
@@ -408,6 +437,13 @@ const EmployeeDashboard = () => {
                   </div>
                 ))}
               </div>
+              {screenshotsCursor && (
+                <div style={{ textAlign: 'center', marginTop: '16px' }}>
+                  <button onClick={loadMoreScreenshots} className="btn btn-secondary">
+                    Load more screenshots
+                  </button>
+                </div>
+              )}
             </div>
 
             {/* Activities */}
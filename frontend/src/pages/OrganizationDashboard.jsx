@@ -4,13 +4,17 @@ import { organizationAPI, employeeAPI, monitoringAPI, screenshotAPI, workflowAPI
 import { Users, Settings, Activity, Image, LogOut, Download, Eye, FileText, Play, Layers, TrendingUp } from 'lucide-react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, PieChart, Pie, Cell } from 'recharts';
 import './OrganizationDashboard.css';
-import AuthenticatedImage from '../components/AuthenticatedImage';
 import { formatToIST, formatTimeToIST } from '../utils/dateUtils';
 import WorkflowModal from '../components/WorkflowModal';
 import MonitoringConfigManager from '../components/MonitoringConfigManager';
 import ProcessMiningModal from '../components/ProcessMiningModal';
 import BackgroundAnimation from '../components/BackgroundAnimation';
 
+// Screenshots per gallery page; the rest load on demand
+const SCREENSHOT_PAGE_SIZE = 60;
+// Only what the gallery shows, not the full extraction JSON
+const SCREENSHOT_FIELDS = 'id,timestamp,is_processed,extracted_text,thumb_url,url';
+
 const OrganizationDashboard = () => {
   const { user, logout } = useAuth();
   const [organization, setOrganization] = useState(null);
@@ -19,6 +23,7 @@ const OrganizationDashboard = () => {
   const [selectedEmployee, setSelectedEmployee] = useState(null);
   const [selectedSession, setSelectedSession] = useState(null);
   const [screenshots, setScreenshots] = useState([]);
+  const [screenshotsCursor, setScreenshotsCursor] = useState(null);
   const [activities, setActivities] = useState([]);
   const [loading, setLoading] = useState(true);
   const [screenshotInterval, setScreenshotInterval] = useState(10);
@@ -99,10 +104,11 @@ const OrganizationDashboard = () => {
     setSelectedSession(session);
     try {
       const [screenshotsRes, activitiesRes] = await Promise.all([
-        screenshotAPI.getSessionScreenshots(session.id),
+        screenshotAPI.getSessionScreenshots(session.id, { limit: SCREENSHOT_PAGE_SIZE, fields: SCREENSHOT_FIELDS }),
         monitoringAPI.getActivities(session.id),
       ]);
       setScreenshots(screenshotsRes.data);
+      setScreenshotsCursor(screenshotsRes.headers['x-next-cursor'] || null);
       setActivities(activitiesRes.data);
     } catch (error) {
       console.error('Failed to load session details:', error);
@@ -110,6 +116,20 @@ const OrganizationDashboard = () => {
     }
   };
 
+  const loadMoreScreenshots = async () => {
+    try {
+      const res = await screenshotAPI.getSessionScreenshots(selectedSession.id, {
+        limit: SCREENSHOT_PAGE_SIZE,
+        cursor: screenshotsCursor,
+        fields: SCREENSHOT_FIELDS,
+      });
+      setScreenshots((loaded) => [...loaded, ...res.data]);
+      setScreenshotsCursor(res.headers['x-next-cursor'] || null);
+    } catch (error) {
+      console.error('Failed to load more screenshots:', error);
+    }
+  };
+
   const downloadScreenshot = async (screenshotId) => {
     try {
       const response = await screenshotAPI.getFile(screenshotId);
@@ -129,8 +149,12 @@ const OrganizationDashboard = () => {
     try {
       await screenshotAPI.extractData(screenshotId);
       // Refresh screenshots
-      const res = await screenshotAPI.getSessionScreenshots(selectedSession.id);
+      const res = await screenshotAPI.getSessionScreenshots(selectedSession.id, {
+        limit: Math.min(Math.max(screenshots.length, SCREENSHOT_PAGE_SIZE), 1000),
+        fields: SCREENSHOT_FIELDS,
+      });
       setScreenshots(res.data);
+      setScreenshotsCursor(res.headers['x-next-cursor'] || null);
     } catch (error) {
       console.error('Failed to extract screenshot data:', error);
       alert('Failed to extract screenshot data');
@@ -479,6 +503,8 @@ const OrganizationDashboard = () => {
                     <th>Start Time</th>
                     <th>End Time</th>
                     <th>Duration</th>
+                    <th>Screenshots</th>
+                    <th>Top App</th>
                     <th>Status</th>
                     <th>Actions</th>
                   </tr>
@@ -489,6 +515,8 @@ const OrganizationDashboard = () => {
                       <td>{formatToIST(session.start_time)}</td>
                       <td>{formatToIST(session.end_time)}</td>
                       <td>{session.duration_seconds ? `${Math.round(session.duration_seconds / 60)} min` : '-'}</td>
+                      <td>{session.summary ? session.summary.screenshot_count : '-'}</td>
+                      <td>{session.summary?.top_applications[0]?.name || '-'}</td>
                       <td>
                         <span className={`badge badge-${session.is_active ? 'success' : 'danger'}`}>
                           {session.is_active ? 'Active' : 'Ended'}
@@ -585,11 +613,12 @@ const OrganizationDashboard = () => {
                   {screenshots.map((screenshot) => (
                     <div key={screenshot.id} className="screenshot-card">
                       <div className="screenshot-image-container">
-                        <AuthenticatedImage 
-                          url={`/screenshots/${screenshot.id}/file`}
+                        <img 
+                          src={screenshot.thumb_url}
                           alt={`Screenshot ${screenshot.id}`}
                           className="screenshot-image"
-                          onClick={() => window.open(`${import.meta.env.VITE_API_URL || 'http://localhost:5001/api'}/screenshots/${screenshot.id}/file?token=${localStorage.getItem('token')}`, '_blank')}
+                          loading="lazy"
+                          onClick={() => window.open(screenshot.url, '_blank')}
                         />
                       </div>
                       <div className="screenshot-info">
@@ -624,6 +653,13 @@ const OrganizationDashboard = () => {
                   ))}
                 </div>
               )}
+              {screenshotsCursor && (
+                <div style={{ textAlign: 'center', marginTop: '16px' }}>
+                  <button onClick={loadMoreScreenshots} className="btn btn-secondary">
+                    Load more screenshots
+                  </button>
+                </div>
+              )}
             </div>
 
             {/* Activities List */}
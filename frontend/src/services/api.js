@@ -65,7 +65,8 @@ export const monitoringAPI = {
   getCurrentSession: () => api.get('/monitoring/sessions/current'),
   getSessions: (params) => api.get('/monitoring/sessions', { params }),
   logActivity: (data) => api.post('/monitoring/activities', data),
-  getActivities: (sessionId) => api.get('/monitoring/activities', { params: { session_id: sessionId } }),
+  // params: { limit, cursor, from, to }; the next page's cursor comes back in the X-Next-Cursor header
+  getActivities: (sessionId, params = {}) => api.get('/monitoring/activities', { params: { session_id: sessionId, ...params } }),
   getAgentCredentials: () => api.get('/monitoring/agent/credentials'),
   updateAgentCredentials: (credentials) => api.put('/monitoring/agent/credentials', credentials),
   getCredentialsStatus: () => api.get('/monitoring/agent/credentials/status'),
@@ -84,7 +85,7 @@ export const screenshotAPI = {
   getFile: (id) => api.get(`/screenshots/${id}/file`, { responseType: 'blob' }),
   extractData: (id) => api.post(`/screenshots/${id}/extract`),
   extractBatch: (screenshot_ids) => api.post('/screenshots/extract/batch', { screenshot_ids }),
-  getSessionScreenshots: (sessionId) => api.get(`/screenshots/session/${sessionId}`),
+  getSessionScreenshots: (sessionId, params = {}) => api.get(`/screenshots/session/${sessionId}`, { params }),
 };
 
 // Workflow API
@@ -101,4 +102,9 @@ export const workflowAPI = {
     }),
 };
 
+// Analytics API
+export const analyticsAPI = {
+  getUsage: (params = {}) => api.get('/analytics/usage', { params }),
+};
+
 export default api;